@@ -0,0 +1,113 @@
+import hmac
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from models.schemas import ProfileRequest, TaskStatus
+from services.profiler import Profiler
+from services.whisper_service import whisper_service
+from api.routes.transcription import transcription_store
+from core.config import settings
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow only requests carrying ADMIN_TOKEN; hide the routes when unset."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# Samples nothing and holds no threads until a session starts
+profiler = Profiler(settings.PROFILE_DIR)
+
+
+@router.post("/profiles")
+async def start_profile(request: ProfileRequest):
+    """
+    Start sampling CPU stacks, and optionally allocations, for a window.
+
+    With ``task_id`` only the event loop and the worker thread running
+    that task are sampled, and the session ends when the task finishes.
+    """
+    seconds = request.seconds or settings.PROFILE_DEFAULT_SECONDS
+    if request.task_id:
+        # Long enough to cover the task, still bounded
+        seconds = request.seconds or settings.PROFILE_MAX_SECONDS
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be between 0 and {settings.PROFILE_MAX_SECONDS}"
+        )
+    interval_ms = request.interval_ms or settings.PROFILE_INTERVAL_MS
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+
+    threads = until = None
+    task_id = request.task_id
+    if task_id:
+        result = transcription_store.get(task_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if result.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+            raise HTTPException(status_code=400, detail=f"Task already {result.status.value}")
+        loop_thread = threading.get_ident()
+
+        def threads():
+            return whisper_service.task_threads(task_id) | {loop_thread}
+
+        def until():
+            current = transcription_store.get(task_id)
+            finished = current is None or current.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING)
+            return finished and not whisper_service.is_active(task_id)
+
+    try:
+        session = profiler.start(
+            seconds=seconds,
+            interval=interval_ms / 1000,
+            memory=request.memory,
+            task_id=task_id,
+            threads=threads,
+            until=until
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.info()
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List profiling sessions, newest last."""
+    return {"profiles": profiler.list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Get a profiling session's status and output files."""
+    info = profiler.get(profile_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return info
+
+
+@router.post("/profiles/{profile_id}/stop")
+async def stop_profile(profile_id: str):
+    """End a running session early; its output is still written."""
+    session = profiler.current
+    if session is None or session.profile_id != profile_id or session.status != "running":
+        raise HTTPException(status_code=404, detail="No running profile with that id")
+    profiler.stop()
+    return session.info()
+
+
+@router.get("/profiles/{profile_id}/files/{name}")
+async def download_profile_file(profile_id: str, name: str):
+    """Download one output file (cpu.collapsed, memory.txt, ...)."""
+    path = profiler.file(profile_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path, filename=f"{profile_id}-{name}")
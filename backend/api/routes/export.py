@@ -1,29 +1,37 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import PlainTextResponse
 from api.routes.transcription import transcription_store, TaskStatus
+from core import metrics
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
 
 def format_timestamp_srt(seconds: float) -> str:
     """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds - int(seconds)) * 1000)
+    # Work in whole milliseconds so float32 segment times don't round down
+    total_ms = int(round(seconds * 1000))
+    hours, rem = divmod(total_ms, 3600000)
+    minutes, rem = divmod(rem, 60000)
+    secs, millis = divmod(rem, 1000)
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
 
 def format_timestamp_vtt(seconds: float) -> str:
     """Convert seconds to WebVTT timestamp format (HH:MM:SS.mmm)."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds - int(seconds)) * 1000)
+    total_ms = int(round(seconds * 1000))
+    hours, rem = divmod(total_ms, 3600000)
+    minutes, rem = divmod(rem, 60000)
+    secs, millis = divmod(rem, 1000)
     return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
 
 
+def escape_vtt(text: str) -> str:
+    """Escape cue text so players don't read it as WebVTT markup."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
 @router.get("/txt/{task_id}")
+@metrics.STAGE_SECONDS.timed(stage="export")
 async def export_txt(task_id: str):
     """Export transcript as plain text."""
     if task_id not in transcription_store:
@@ -34,7 +42,7 @@ async def export_txt(task_id: str):
         raise HTTPException(status_code=400, detail="Transcription not complete")
 
     return PlainTextResponse(
-        content=result.full_text or "",
+        content=result.segments.full_text,
         media_type="text/plain",
         headers={
             "Content-Disposition": f'attachment; filename="transcript_{task_id}.txt"'
@@ -43,6 +51,7 @@ async def export_txt(task_id: str):
 
 
 @router.get("/srt/{task_id}")
+@metrics.STAGE_SECONDS.timed(stage="export")
 async def export_srt(task_id: str):
     """Export transcript as SRT subtitles."""
     if task_id not in transcription_store:
@@ -53,12 +62,12 @@ async def export_srt(task_id: str):
         raise HTTPException(status_code=400, detail="Transcription not complete")
 
     srt_content = []
-    for i, segment in enumerate(result.segments, 1):
-        start_time = format_timestamp_srt(segment.start)
-        end_time = format_timestamp_srt(segment.end)
+    for i, (start, end, text) in enumerate(result.segments, 1):
+        start_time = format_timestamp_srt(start)
+        end_time = format_timestamp_srt(end)
         srt_content.append(f"{i}")
         srt_content.append(f"{start_time} --> {end_time}")
-        srt_content.append(segment.text)
+        srt_content.append(text)
         srt_content.append("")
 
     return PlainTextResponse(
@@ -71,21 +80,39 @@ async def export_srt(task_id: str):
 
 
 @router.get("/vtt/{task_id}")
-async def export_vtt(task_id: str):
-    """Export transcript as WebVTT subtitles."""
+@metrics.STAGE_SECONDS.timed(stage="export")
+async def export_vtt(task_id: str, words: bool = False):
+    """
+    Export transcript as WebVTT subtitles.
+
+    With ``words=true`` each cue carries inline word timestamps
+    (karaoke-style); the task must have been transcribed with word
+    timestamps.
+    """
     if task_id not in transcription_store:
         raise HTTPException(status_code=404, detail="Task not found")
 
     result = transcription_store[task_id]
     if result.status != TaskStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Transcription not complete")
+    if words and not result.segments.has_words:
+        raise HTTPException(
+            status_code=400,
+            detail="Transcript has no word timestamps. Upload with word_timestamps enabled."
+        )
 
     vtt_content = ["WEBVTT", ""]
-    for segment in result.segments:
-        start_time = format_timestamp_vtt(segment.start)
-        end_time = format_timestamp_vtt(segment.end)
+    for i, (start, end, text) in enumerate(result.segments):
+        start_time = format_timestamp_vtt(start)
+        end_time = format_timestamp_vtt(end)
         vtt_content.append(f"{start_time} --> {end_time}")
-        vtt_content.append(segment.text)
+        if words:
+            vtt_content.append(" ".join(
+                f"<{format_timestamp_vtt(word_start)}><c>{escape_vtt(word)}</c>"
+                for word_start, _, word, _ in result.segments.words(i)
+            ))
+        else:
+            vtt_content.append(escape_vtt(text))
         vtt_content.append("")
 
     return PlainTextResponse(
@@ -98,6 +125,7 @@ async def export_vtt(task_id: str):
 
 
 @router.get("/json/{task_id}")
+@metrics.STAGE_SECONDS.timed(stage="export")
 async def export_json(task_id: str):
     """Export full transcript data as JSON."""
     if task_id not in transcription_store:
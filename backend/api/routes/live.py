@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from models.schemas import TranscriptionResult, TaskStatus
+from services.whisper_service import whisper_service
+from services.audio_pipeline import LiveAudioDecoder
+from services.audio_processor import audio_processor
+from api.routes.transcription import transcription_store, notify_change
+from core.config import settings
+
+router = APIRouter(tags=["live"])
+
+# Number of open live sessions (only touched from the event loop)
+active_sessions = 0
+
+
+async def send_updates(websocket: WebSocket, session, finalized, provisional):
+    """Send finalized segments, then the current provisional caption."""
+    table = session.segments
+    for segment_id in finalized:
+        await websocket.send_json({
+            "type": "final",
+            "id": segment_id,
+            "start": round(table.start(segment_id), 2),
+            "end": round(table.end(segment_id), 2),
+            "text": table.text(segment_id)
+        })
+    await websocket.send_json({
+        "type": "provisional",
+        "start": round(provisional[0], 2) if provisional else None,
+        "end": round(provisional[1], 2) if provisional else None,
+        "text": provisional[2] if provisional else ""
+    })
+
+
+def is_stop(text: str) -> bool:
+    """Whether a text frame asks to end the session."""
+    if text.strip() == "stop":
+        return True
+    try:
+        return json.loads(text).get("type") == "stop"
+    except (ValueError, AttributeError):
+        return False
+
+
+@router.websocket("/ws/live")
+async def live_transcription(websocket: WebSocket):
+    """
+    Live captions from streamed microphone audio.
+
+    The client first sends a JSON config such as
+    ``{"format": "pcm_s16le", "sample_rate": 16000, "channels": 1,
+    "language": "en"}`` (format may also be ``pcm_f32le`` or ``opus``),
+    then binary audio frames, then ``{"type": "stop"}``. The server
+    replies with ``started`` (carrying the task id), ``final`` and
+    ``provisional`` messages, and ``done`` once the transcript is stored
+    as a normal, exportable task.
+    """
+    global active_sessions
+    await websocket.accept()
+    if active_sessions >= settings.LIVE_MAX_SESSIONS:
+        await websocket.send_json({"type": "error", "message": "Too many live sessions"})
+        await websocket.close(code=1013)
+        return
+
+    try:
+        config = await websocket.receive_json()
+        decoder = LiveAudioDecoder(
+            config.get("format", "pcm_s16le"),
+            config.get("sample_rate", 16000),
+            config.get("channels", 1)
+        )
+        language = whisper_service.resolve_language(config.get("language"))
+    except (ValueError, AttributeError, TypeError) as e:
+        await websocket.send_json({"type": "error", "message": f"Invalid config: {e}"})
+        await websocket.close(code=1003)
+        return
+
+    active_sessions += 1
+    session = whisper_service.live_session(language)
+    task_id = audio_processor.generate_task_id()
+    transcription_store[task_id] = TranscriptionResult(
+        task_id=task_id,
+        status=TaskStatus.PROCESSING,
+        message="Live session in progress",
+        segments=session.segments,
+        profile=settings.LIVE_PROFILE,
+        decode_mode="live"
+    )
+    await websocket.send_json({"type": "started", "task_id": task_id})
+
+    loop = asyncio.get_event_loop()
+    connected = True
+    try:
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    connected = False
+                    break
+                if message.get("bytes") is not None:
+                    session.insert_audio(decoder.decode(message["bytes"]))
+                    if session.ready:
+                        # Decode off the event loop; frames queue up meanwhile
+                        finalized, provisional = await loop.run_in_executor(None, session.process)
+                        await send_updates(websocket, session, finalized, provisional)
+                elif message.get("text") and is_stop(message["text"]):
+                    break
+        except WebSocketDisconnect:
+            connected = False
+
+        # Without a client there is nobody to wait for a last decode
+        finalized = await loop.run_in_executor(None, session.finish, connected)
+        result = transcription_store[task_id]
+        result.status = TaskStatus.COMPLETED
+        result.progress = 100.0
+        result.message = "Live session complete"
+        result.language = session.language
+        result.duration = round(session.duration, 2)
+        result.processing_time = round(session.busy_seconds, 3)
+        result.real_time_factor = (
+            round(session.busy_seconds / session.duration, 4) if session.duration else None
+        )
+        notify_change(task_id)
+        if connected:
+            await send_updates(websocket, session, finalized, None)
+            await websocket.send_json({"type": "done", "task_id": task_id})
+            await websocket.close()
+
+    except Exception as e:
+        result = transcription_store.get(task_id)
+        if result is not None and result.status == TaskStatus.PROCESSING:
+            result.status = TaskStatus.FAILED
+            result.message = f"Live session failed: {str(e)}"
+            notify_change(task_id)
+
+    finally:
+        active_sessions -= 1
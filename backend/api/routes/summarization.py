@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from models.schemas import SummaryRequest, SummaryResponse
 from services.ollama_service import ollama_service
 from api.routes.transcription import transcription_store, TaskStatus
+from core import metrics
 
 router = APIRouter(prefix="/api", tags=["summarization"])
 
@@ -23,7 +24,7 @@ async def generate_summary(request: SummaryRequest):
         )
 
     # Check if we have text to summarize
-    if not result.full_text:
+    if not result.segments:
         raise HTTPException(
             status_code=400,
             detail="No transcript text available"
@@ -31,10 +32,12 @@ async def generate_summary(request: SummaryRequest):
 
     # Generate summary using Ollama
     try:
-        summary = await ollama_service.generate_summary(
-            result.full_text,
-            request.style
-        )
+        with metrics.STAGE_SECONDS.time(stage="summarize"):
+            summary = await ollama_service.generate_summary(
+                result.segments.full_text,
+                request.style
+            )
+        metrics.SUMMARIES.inc(outcome="success")
 
         return SummaryResponse(
             task_id=request.task_id,
@@ -42,6 +45,7 @@ async def generate_summary(request: SummaryRequest):
             style=request.style
         )
     except Exception as e:
+        metrics.SUMMARIES.inc(outcome="error")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate summary: {str(e)}"
@@ -1,65 +1,336 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
-from typing import Dict
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
+from typing import Callable, Dict, List, Optional
 import asyncio
+import time
 
 from models.schemas import (
-    UploadResponse, TranscriptionResult, TaskStatus, ProgressUpdate
+    UploadResponse, TranscriptionResult, TaskStatus, ProgressUpdate,
+    RetranscribeRequest, RetranscribeResponse, TaskTimings,
+    StatusBatchRequest, StatusBatchResponse
 )
 from services.whisper_service import whisper_service
 from services.audio_processor import audio_processor
-from core.websocket import manager
+from services.timing_log import TimingLog
+from models.segments import SegmentTable
+from core.websocket import manager, subscriptions
+from core.changes import task_changes
 from core.config import settings
+from core import metrics
 
 router = APIRouter(prefix="/api", tags=["transcription"])
 
 # In-memory storage for transcription results
 transcription_store: Dict[str, TranscriptionResult] = {}
 
+
+def _task_counts() -> dict:
+    counts = {(status.value,): 0 for status in TaskStatus}
+    for result in list(transcription_store.values()):
+        counts[(result.status.value,)] += 1
+    return counts
+
+
+# Finished tasks' timing breakdowns, kept beyond the store
+timing_log = (
+    TimingLog(settings.TIMINGS_LOG_FILE, keep=settings.TIMINGS_RECENT)
+    if settings.TIMINGS_LOG_ENABLED else None
+)
+
+metrics.TASKS.set_function(_task_counts)
+metrics.STORE_BYTES.set_function(
+    lambda: sum(result.segments.nbytes for result in list(transcription_store.values()))
+)
+
+def _task_states() -> dict:
+    """What /ws/tasks subscribers see of every task."""
+    return {
+        task_id: {
+            "status": result.status.value,
+            "progress": result.progress,
+            "message": result.message,
+            "transcript_stage": result.transcript_stage
+        }
+        for task_id, result in list(transcription_store.items())
+    }
+
+
+subscriptions.set_source(_task_states)
+
+def notify_change(task_id: str):
+    """
+    Announce a task's new state: wake long-polls and push it to the task's
+    /ws/progress subscribers. Safe to call from worker threads.
+    """
+    task_changes.notify(task_id)
+    result = transcription_store.get(task_id)
+    if result is not None:
+        manager.publish(task_id, result.progress, result.message, result.status.value)
+
+
 def progress_callback(task_id: str, progress: float, message: str, current_segment: int = None):
     """Callback to update progress (runs in sync context)."""
     if task_id in transcription_store:
         transcription_store[task_id].progress = progress
         transcription_store[task_id].message = message
+        notify_change(task_id)
+
+def cancel_transcription(task_id: str) -> bool:
+    """Cancel a pending or processing task; False if it already finished."""
+    result = transcription_store.get(task_id)
+    if result is None or result.status not in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+        return False
+    whisper_service.cancel(task_id)
+    result.status = TaskStatus.CANCELLED
+    result.message = "Transcription cancelled"
+    notify_change(task_id)
+    return True
 
-async def run_transcription(task_id: str, file_path: str):
-    """Background task to run transcription."""
+async def run_transcription(
+    task_id: str,
+    file_path: Optional[str],
+    profile: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    language: Optional[str] = None,
+    word_timestamps: bool = False,
+    priority: Optional[str] = None,
+    duration: Optional[float] = None,
+    resume_segments: Optional[SegmentTable] = None,
+    two_pass: bool = False,
+    adaptive: bool = False
+):
+    """
+    Background task to run transcription.
+
+    With ``two_pass`` the draft is stored as a completed result as soon as
+    it is ready, then refined in the background. With ``adaptive`` only
+    low-confidence segments are decoded a second time.
+    """
+    keep_upload = False
     try:
+        # Cancelled before it was queued
+        pending = transcription_store[task_id]
+        if pending.status == TaskStatus.CANCELLED:
+            return
+
         # Update status to processing
         transcription_store[task_id].status = TaskStatus.PROCESSING
         transcription_store[task_id].message = "Starting transcription..."
+        notify_change(task_id)
 
         # Simple sync callback that updates the store (works in thread pool)
         def sync_progress(task_id: str, progress: float, message: str, current_segment: int = None):
             if task_id in transcription_store:
                 transcription_store[task_id].progress = progress
                 transcription_store[task_id].message = message
+                notify_change(task_id)
 
         # Run transcription with sync callback
         result = await whisper_service.transcribe(
             file_path,
             task_id,
-            sync_progress
+            sync_progress,
+            profile,
+            content_hash,
+            language,
+            word_timestamps,
+            priority,
+            duration,
+            resume_segments,
+            draft=two_pass,
+            adaptive=adaptive
         )
 
-        # Store result
+        if task_id not in transcription_store:
+            return  # Deleted while running; don't bring it back
+
+        # Store result; the task was created (and ingested) at upload
+        store_started = time.perf_counter()
+        result.content_hash = content_hash
+        result.created_at = pending.created_at
+        result.timings = {**pending.timings, **result.timings}
+        if two_pass and result.status == TaskStatus.COMPLETED:
+            result.transcript_stage = "draft"
+            result.final_segments = 0
+            result.refined_until = 0.0
+            result.message = "Draft ready, refining..."
         transcription_store[task_id] = result
+        notify_change(task_id)
+        result.timings["store"] = round(time.perf_counter() - store_started, 6)
+        metrics.STAGE_SECONDS.observe(result.timings["store"], stage="store")
+        if two_pass and result.status == TaskStatus.COMPLETED:
+            await refine_transcription(task_id, file_path, result, word_timestamps, duration, sync_progress)
+        await record_timings(task_id)
+
+    except asyncio.CancelledError:
+        # Shutdown; keep the upload so the task can resume on restart
+        keep_upload = True
+        raise
 
     except Exception as e:
         if task_id in transcription_store:
             transcription_store[task_id].status = TaskStatus.FAILED
             transcription_store[task_id].message = str(e)
+            notify_change(task_id)
+            await record_timings(task_id)
 
     finally:
-        # Cleanup uploaded file
-        audio_processor.cleanup_file(file_path)
+        manager.clear_idle(task_id)
+        # Cleanup uploaded file (decoded PCM may live on in the PCM cache)
+        if file_path and not keep_upload:
+            audio_processor.cleanup_file(file_path)
+
+
+async def refine_transcription(
+    task_id: str,
+    file_path: Optional[str],
+    draft: TranscriptionResult,
+    word_timestamps: bool,
+    duration: Optional[float],
+    progress: Callable
+):
+    """Second pass of two-pass mode; swaps refined segments into the store."""
+    def publish(segments: SegmentTable, final_segments: int, refined_until: float):
+        # Replace the stored result in one assignment so readers see
+        # either the previous or the new segments, never a mix
+        current = transcription_store.get(task_id)
+        if current is None or current.status != TaskStatus.COMPLETED:
+            return
+        transcription_store[task_id] = current.model_copy(update={
+            "segments": segments,
+            "transcript_stage": "refining",
+            "final_segments": final_segments,
+            "refined_until": refined_until
+        })
+        notify_change(task_id)
+
+    result = await whisper_service.refine(
+        file_path,
+        task_id,
+        draft.segments,
+        publish,
+        progress,
+        draft.content_hash,
+        draft.language,
+        word_timestamps,
+        duration
+    )
+    if task_id not in transcription_store:
+        return  # Deleted while refining
+    if result.status == TaskStatus.COMPLETED:
+        result.content_hash = draft.content_hash
+        result.language_probability = draft.language_probability
+        result.transcript_stage = "final"
+        result.final_segments = len(result.segments)
+        result.refined_until = result.duration
+        # The task's timeline runs from the draft's upload to the last window
+        result.created_at = draft.created_at
+        result.enqueued_at = draft.enqueued_at
+        result.started_at = draft.started_at
+        result.first_segment_at = draft.first_segment_at
+        result.timings = {
+            **draft.timings,
+            **{f"refine_{stage}": seconds for stage, seconds in result.timings.items()}
+        }
+        transcription_store[task_id] = result
+    else:
+        # Keep whatever was refined; the rest stays draft
+        current = transcription_store[task_id]
+        current.progress = 100.0
+        current.message = result.message
+    notify_change(task_id)
+
+
+async def record_timings(task_id: str):
+    """Retain a finished task's timing breakdown for aggregate analysis."""
+    result = transcription_store.get(task_id)
+    if timing_log is None or result is None:
+        return
+    if result.status in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+        return
+    timings = TaskTimings.from_result(result).model_dump(mode="json")
+    # File I/O stays off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, timing_log.record, timings)
+
+
+# Resumed tasks, referenced so they aren't garbage collected mid-run
+resumed_tasks = set()
+
+
+def resume_interrupted() -> int:
+    """
+    Re-queue tasks whose journal survived a crash or restart.
+
+    Each continues from its last journaled segment. Returns the number of
+    tasks resumed; must be called from the running event loop.
+    """
+    journal = whisper_service.journal
+    if journal is None:
+        return 0
+    resumed = 0
+    for header, segments in journal.interrupted():
+        task_id = header["task_id"]
+        file_path = header.get("audio_path")
+        content_hash = header.get("content_hash")
+        if file_path is None and content_hash is None:
+            journal.finish(task_id)
+            continue
+        transcription_store[task_id] = TranscriptionResult(
+            task_id=task_id,
+            status=TaskStatus.PROCESSING,
+            message="Resuming after restart...",
+            segments=segments
+        )
+        task = asyncio.create_task(run_transcription(
+            task_id,
+            file_path,
+            header.get("profile"),
+            content_hash,
+            header.get("language"),
+            header.get("word_timestamps", False),
+            header.get("priority"),
+            header.get("duration"),
+            resume_segments=segments,
+            two_pass=header.get("draft", False),
+            adaptive=header.get("adaptive", False)
+        ))
+        resumed_tasks.add(task)
+        task.add_done_callback(resumed_tasks.discard)
+        resumed += 1
+    return resumed
 
 
 @router.post("/upload", response_model=UploadResponse)
 async def upload_audio(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    profile: Optional[str] = Form(None),
+    language: Optional[str] = Form(None),
+    word_timestamps: bool = Form(False),
+    cancel_on_disconnect: bool = Form(False),
+    priority: Optional[str] = Form(None),
+    two_pass: bool = Form(False),
+    adaptive: bool = Form(False)
 ):
-    """Upload an audio file for transcription."""
+    """
+    Upload an audio file for transcription.
+
+    ``two_pass`` publishes a quick draft first and refines it afterwards;
+    ``adaptive`` decodes cheaply and re-decodes only low-confidence
+    segments. Either mode picks decode profiles from its own settings.
+    """
+    ingest_started = time.perf_counter()
+    # Validate decode profile, language hint and priority class
+    try:
+        profile = whisper_service.resolve_profile(profile)
+        language = whisper_service.resolve_language(language)
+        priority = whisper_service.resolve_priority(priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if two_pass:
+        profile = settings.TWO_PASS_DRAFT_PROFILE
+    elif adaptive:
+        profile = settings.ADAPTIVE_DRAFT_PROFILE
+
     # Validate file extension
     if not audio_processor.is_valid_extension(file.filename):
         raise HTTPException(
@@ -81,16 +352,38 @@ async def upload_audio(
     # Generate task ID and save file
     task_id = audio_processor.generate_task_id()
     file_path = await audio_processor.save_upload(content, task_id, file.filename)
+    loop = asyncio.get_event_loop()
+    content_hash = await loop.run_in_executor(None, audio_processor.content_hash, content)
+    # Header-only probe; orders the queue and feeds wait estimates
+    duration = await loop.run_in_executor(None, audio_processor.probe_duration, file_path)
+
+    ingest = round(time.perf_counter() - ingest_started, 3)
+    metrics.UPLOADS.inc()
+    metrics.UPLOAD_BYTES.observe(len(content))
+    if duration is not None:
+        metrics.UPLOAD_AUDIO_SECONDS.observe(duration)
+    metrics.STAGE_SECONDS.observe(ingest, stage="ingest")
 
     # Initialize transcription result
     transcription_store[task_id] = TranscriptionResult(
         task_id=task_id,
         status=TaskStatus.PENDING,
-        message="File uploaded, waiting to start..."
+        message="File uploaded, waiting to start...",
+        content_hash=content_hash,
+        language=language,
+        profile=profile,
+        timings={"ingest": ingest}
     )
 
+    # Cancel once every progress WebSocket for the task has gone away
+    if cancel_on_disconnect:
+        manager.on_idle(task_id, cancel_transcription)
+
     # Start transcription in background
-    background_tasks.add_task(run_transcription, task_id, file_path)
+    background_tasks.add_task(
+        run_transcription, task_id, file_path, profile, content_hash, language,
+        word_timestamps, priority, duration, two_pass=two_pass, adaptive=adaptive
+    )
 
     return UploadResponse(
         task_id=task_id,
@@ -99,18 +392,104 @@ async def upload_audio(
     )
 
 
-@router.get("/status/{task_id}", response_model=ProgressUpdate)
-async def get_status(task_id: str):
-    """Get transcription progress status."""
-    if task_id not in transcription_store:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    result = transcription_store[task_id]
+def _progress_update(task_id: str) -> Optional[ProgressUpdate]:
+    result = transcription_store.get(task_id)
+    if result is None:
+        return None
+    # Progress counts in STATUS_PROGRESS_STEP steps, so a long-poll isn't
+    # answered for every decoded segment; the message follows progress
+    version = task_changes.observe(task_id, (
+        result.status, int(result.progress // settings.STATUS_PROGRESS_STEP),
+        result.transcript_stage, result.final_segments
+    ))
+    estimate = None
+    if result.status in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+        estimate = whisper_service.estimate(task_id)
     return ProgressUpdate(
         task_id=task_id,
         status=result.status,
         progress=result.progress,
-        message=result.message
+        message=result.message,
+        estimated_wait=estimate[0] if estimate else None,
+        estimated_completion=estimate[1] if estimate else None,
+        transcript_stage=result.transcript_stage,
+        final_segments=result.final_segments,
+        refined_until=result.refined_until,
+        version=version
+    )
+
+
+async def _wait_for_change(
+    task_ids: List[str],
+    since: Dict[str, int],
+    wait: float
+) -> Dict[str, Optional[ProgressUpdate]]:
+    """
+    Current status of each task (None if unknown), returned once any task's
+    version differs from ``since`` or ``wait`` seconds have passed.
+
+    A task missing from ``since`` counts as changed; an unknown task has
+    version 0.
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), settings.STATUS_MAX_WAIT_S)
+    while True:
+        # Listen before reading so a change in between still wakes us
+        listening = [(task_id, task_changes.listen(task_id)) for task_id in task_ids]
+        try:
+            updates = {task_id: _progress_update(task_id) for task_id in task_ids}
+            remaining = deadline - time.monotonic()
+            changed = any(
+                since.get(task_id) != (update.version if update else 0)
+                for task_id, update in updates.items()
+            )
+            if changed or remaining <= 0 or not task_ids:
+                return updates
+            await asyncio.wait(
+                [future for _, future in listening],
+                timeout=min(remaining, settings.STATUS_RECHECK_S),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task_id, future in listening:
+                task_changes.discard(task_id, future)
+
+
+@router.get("/status/{task_id}", response_model=ProgressUpdate)
+async def get_status(task_id: str, since: Optional[int] = None, wait: float = 0.0):
+    """
+    Get transcription progress status.
+
+    With ``since`` (a previous response's version) and ``wait``, the
+    request is held up to ``wait`` seconds until the task changes.
+    """
+    if task_id not in transcription_store:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    since_versions = {task_id: since} if since is not None else {}
+    update = (await _wait_for_change([task_id], since_versions, wait))[task_id]
+    if update is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return update
+
+
+@router.post("/status/batch", response_model=StatusBatchResponse)
+async def get_status_batch(request: StatusBatchRequest):
+    """
+    Get the status of many tasks in one request.
+
+    With ``since`` and ``wait`` the request is held until any listed task
+    changes, as for ``GET /status/{task_id}``.
+    """
+    task_ids = list(dict.fromkeys(request.task_ids))
+    if len(task_ids) > settings.STATUS_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.STATUS_BATCH_MAX} task ids per batch"
+        )
+    updates = await _wait_for_change(task_ids, request.since, request.wait)
+    return StatusBatchResponse(
+        tasks=[update for update in updates.values() if update is not None],
+        missing=[task_id for task_id, update in updates.items() if update is None]
     )
 
 
@@ -128,3 +507,108 @@ async def get_result(task_id: str):
         )
 
     return result
+
+
+@router.get("/tasks/{task_id}/timings", response_model=TaskTimings)
+async def get_timings(task_id: str):
+    """
+    Get a task's timing breakdown: upload, queue, decode and finish times,
+    per-stage durations, audio duration and real-time factor.
+
+    Finished tasks stay available here for a while after being deleted.
+    """
+    if task_id in transcription_store:
+        return TaskTimings.from_result(transcription_store[task_id])
+    record = timing_log.get(task_id) if timing_log else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return TaskTimings(**record)
+
+
+@router.delete("/task/{task_id}")
+async def delete_task(task_id: str):
+    """Cancel a queued or running task, or delete a finished one."""
+    if task_id not in transcription_store:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if cancel_transcription(task_id):
+        return {
+            "task_id": task_id,
+            "status": TaskStatus.CANCELLED,
+            "message": "Transcription cancelled"
+        }
+
+    result = transcription_store.pop(task_id)
+    task_changes.forget(task_id)
+    # Stop a two-pass refinement still running for the task
+    whisper_service.cancel(task_id)
+    return {
+        "task_id": task_id,
+        "status": result.status,
+        "message": "Task deleted"
+    }
+
+
+@router.post("/retranscribe/{task_id}", response_model=RetranscribeResponse)
+async def retranscribe(
+    task_id: str,
+    background_tasks: BackgroundTasks,
+    request: Optional[RetranscribeRequest] = None
+):
+    """Transcribe a previous task's audio again from the decoded-PCM cache."""
+    if task_id not in transcription_store:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    cache = whisper_service.pcm_cache
+    if cache is None:
+        raise HTTPException(status_code=400, detail="Decoded-PCM cache is disabled")
+
+    source = transcription_store[task_id]
+    if not source.content_hash or source.content_hash not in cache:
+        raise HTTPException(
+            status_code=410,
+            detail="Decoded audio is no longer cached. Please upload the file again."
+        )
+
+    try:
+        profile = whisper_service.resolve_profile(request.profile if request else None)
+        language = whisper_service.resolve_language(request.language if request else None)
+        priority = whisper_service.resolve_priority(request.priority if request else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    new_task_id = audio_processor.generate_task_id()
+    transcription_store[new_task_id] = TranscriptionResult(
+        task_id=new_task_id,
+        status=TaskStatus.PENDING,
+        message="Re-transcription queued...",
+        content_hash=source.content_hash,
+        language=language,
+        profile=profile
+    )
+    background_tasks.add_task(
+        run_transcription, new_task_id, None, profile, source.content_hash, language,
+        request.word_timestamps if request else False, priority, source.duration
+    )
+
+    return RetranscribeResponse(
+        task_id=new_task_id,
+        source_task_id=task_id,
+        profile=profile,
+        message="Re-transcription started from cached audio."
+    )
+
+
+@router.get("/throughput")
+async def get_throughput():
+    """Get decode throughput since startup (audio seconds per wall second)."""
+    return whisper_service.throughput_stats()
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List the available decode profiles."""
+    return {
+        "default": settings.DEFAULT_DECODE_PROFILE,
+        "profiles": settings.DECODE_PROFILES
+    }
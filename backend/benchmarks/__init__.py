@@ -0,0 +1,7 @@
+"""
+End-to-end performance benchmarks for the Audtext backend.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+"""
@@ -0,0 +1,262 @@
+"""
+Local stand-in for the Ollama HTTP API, for summarization load tests.
+
+Implements ``/api/generate`` (streaming and non-streaming) and
+``/api/tags`` with simulated prompt-evaluation and generation rates, a cap
+on parallel generations, and injected errors and stalls. Run it on
+Ollama's port and point OLLAMA_BASE_URL at it:
+
+    python -m benchmarks.fake_ollama --port 11434 --token-rate 40 \\
+        --error-rate 0.05 --timeout-rate 0.01
+
+``GET /_stats`` reports request counts and peak concurrency;
+``POST /_config`` changes any setting while the server runs.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS = (
+    "the speakers discussed the project timeline budget risks and next steps "
+    "agreeing to review progress weekly while the team focuses on testing "
+    "customer feedback and documentation before the release"
+).split()
+
+
+@dataclass
+class FakeOllamaConfig:
+    models: List[str] = field(default_factory=lambda: ["llama3.1:8b"])
+    # Tokens per second; 0 means instant
+    prompt_eval_rate: float = 1000.0
+    token_rate: float = 50.0
+    # Tokens generated when the request sets no num_predict
+    response_tokens: int = 120
+    # Generations served at once; more requests wait (OLLAMA_NUM_PARALLEL)
+    parallel: int = 4
+    # Seconds before the first request is served (model load)
+    load_seconds: float = 0.0
+    # Failure injection: a fraction of requests (seeded), or every Nth
+    error_rate: float = 0.0
+    error_every: int = 0
+    error_status: int = 500
+    # Fraction of requests that stall for stall_seconds before answering
+    timeout_rate: float = 0.0
+    stall_seconds: float = 600.0
+    seed: int = 0
+
+
+def _count_tokens(text: str) -> int:
+    # Roughly four characters per token, like most BPE vocabularies
+    return max(1, len(text) // 4)
+
+
+def _response_words(prompt: str, count: int) -> List[str]:
+    # Deterministic per prompt
+    offset = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8], 16)
+    return [_WORDS[(offset + 5 * i) % len(_WORDS)] for i in range(count)]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _State:
+    def __init__(self, config: FakeOllamaConfig):
+        self.configure(config)
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.stalls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def configure(self, config: FakeOllamaConfig) -> None:
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.slots = asyncio.Semaphore(max(1, config.parallel))
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "stalls": self.stalls,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight
+        }
+
+
+def create_app(config: Optional[FakeOllamaConfig] = None) -> FastAPI:
+    """Build the stand-in server's app."""
+    app = FastAPI(title="Fake Ollama")
+    state = _State(config or FakeOllamaConfig())
+    app.state.fake = state
+
+    @app.get("/api/tags")
+    async def tags():
+        return {
+            "models": [
+                {"name": name, "model": name, "modified_at": _now(), "size": 0}
+                for name in state.config.models
+            ]
+        }
+
+    @app.get("/_stats")
+    async def stats():
+        return state.stats()
+
+    @app.post("/_config")
+    async def configure(changes: dict):
+        known = {f.name for f in fields(FakeOllamaConfig)}
+        unknown = set(changes) - known
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown settings: {', '.join(sorted(unknown))}")
+        state.configure(FakeOllamaConfig(**{**asdict(state.config), **changes}))
+        return asdict(state.config)
+
+    @app.post("/api/generate")
+    async def generate(request: dict):
+        config = state.config
+        state.requests += 1
+        number = state.requests
+        model = request.get("model", "")
+        if model not in config.models:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+
+        # Draw both outcomes up front so one seed gives one sequence
+        fail = state.random.random() < config.error_rate
+        stall = state.random.random() < config.timeout_rate
+        if fail or (config.error_every and number % config.error_every == 0):
+            state.errors += 1
+            return JSONResponse({"error": "injected failure"}, status_code=config.error_status)
+        if stall:
+            state.stalls += 1
+            await asyncio.sleep(config.stall_seconds)
+
+        prompt = request.get("prompt", "")
+        options = request.get("options") or {}
+        prompt_tokens = _count_tokens(prompt)
+        eval_tokens = int(options.get("num_predict") or config.response_tokens)
+        words = _response_words(prompt, eval_tokens)
+        stream = request.get("stream", True)
+
+        async def run(emit=None) -> dict:
+            slots = state.slots  # /_config may swap it meanwhile
+            await slots.acquire()
+            state.in_flight += 1
+            state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+            try:
+                started = time.perf_counter()
+                load = max(0.0, config.load_seconds - (time.monotonic() - state.started))
+                await asyncio.sleep(load)
+                if config.prompt_eval_rate:
+                    await asyncio.sleep(prompt_tokens / config.prompt_eval_rate)
+                prompt_done = time.perf_counter()
+                for i, word in enumerate(words):
+                    if config.token_rate:
+                        await asyncio.sleep(1 / config.token_rate)
+                    if emit:
+                        await emit(("" if i == 0 else " ") + word)
+                finished = time.perf_counter()
+            finally:
+                state.in_flight -= 1
+                slots.release()
+            return {
+                "model": model,
+                "created_at": _now(),
+                "done": True,
+                "done_reason": "length" if options.get("num_predict") else "stop",
+                "total_duration": int((finished - started) * 1e9),
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int((prompt_done - started - load) * 1e9),
+                "eval_count": len(words),
+                "eval_duration": int((finished - prompt_done) * 1e9)
+            }
+
+        if not stream:
+            final = await run()
+            return {**final, "response": " ".join(words)}
+
+        async def chunks():
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def emit(token):
+                await queue.put({"model": model, "created_at": _now(), "response": token, "done": False})
+
+            task = asyncio.ensure_future(run(emit))
+            while not (task.done() and queue.empty()):
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield json.dumps(getter.result()) + "\n"
+                else:
+                    getter.cancel()
+            yield json.dumps({**task.result(), "response": ""}) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(app: FastAPI, port: int = 0) -> Iterator[str]:
+    """Run an app with uvicorn in a background thread; yields its base URL."""
+    import uvicorn
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Fake Ollama failed to start on port {port}")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    defaults = FakeOllamaConfig()
+    parser = argparse.ArgumentParser(description="Run a local Ollama stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", default=",".join(defaults.models), help="comma-separated model names")
+    for item in fields(FakeOllamaConfig):
+        if item.name == "models":
+            continue
+        parser.add_argument(
+            f"--{item.name.replace('_', '-')}",
+            type=type(getattr(defaults, item.name)),
+            default=getattr(defaults, item.name)
+        )
+    args = vars(parser.parse_args(argv))
+    host, port = args.pop("host"), args.pop("port")
+    args["models"] = [m.strip() for m in args["models"].split(",") if m.strip()]
+    uvicorn.run(create_app(FakeOllamaConfig(**args)), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
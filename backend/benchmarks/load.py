@@ -0,0 +1,236 @@
+"""
+Load test: concurrent users uploading, polling, subscribing and exporting.
+
+Each virtual user repeats a journey until the stage ends: upload a
+synthetic file, optionally hold a ``/ws/progress`` subscription open
+(pinging it) while polling ``/api/status``, fetch the result, run some
+exports and sometimes a summary. Every call's latency and outcome is
+recorded per endpoint.
+
+    python -m benchmarks.load [--users 10,25,50] [--duration 30]
+                              [--ws-fraction 0.5] [--exports 2]
+                              [--summarize-fraction 0.1] [--url URL]
+
+Without ``--url`` the app is started in-process on the fake ASR engine
+(``--rtf`` seconds per audio second) with the fake Ollama behind it.
+Stages run one after another, one per ``--users`` value, so the report
+shows where p99 starts to climb.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List, Optional
+
+EXPORT_FORMATS = ("txt", "srt", "vtt", "json")
+TERMINAL = ("completed", "failed", "cancelled")
+
+
+class EndpointStats:
+    """Latencies and failures of one endpoint."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(pct: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 2)
+
+        count = len(ordered)
+        return {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "p50_ms": percentile(50) if count else None,
+            "p95_ms": percentile(95) if count else None,
+            "p99_ms": percentile(99) if count else None
+        }
+
+
+class LoadTest:
+    """One stage: ``users`` concurrent journeys for ``duration`` seconds."""
+
+    def __init__(self, base_url: str, args: argparse.Namespace, audio: bytes, rng: random.Random):
+        self.base_url = base_url.rstrip("/")
+        self.ws_url = "ws" + self.base_url[len("http"):]
+        self.args = args
+        self.audio = audio
+        self.rng = rng
+        self.stats: Dict[str, EndpointStats] = {}
+
+    def _record(self, name: str, started: float, ok: bool) -> None:
+        self.stats.setdefault(name, EndpointStats()).record(time.perf_counter() - started, ok)
+
+    async def _call(self, client, name: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, self.base_url + path, **kwargs)
+        except Exception:
+            self._record(name, started, False)
+            return None
+        self._record(name, started, response.status_code < 400)
+        return response
+
+    async def _subscribe(self, task_id: str, stop: asyncio.Event) -> None:
+        import websockets
+
+        started = ping = time.perf_counter()
+        connected = False
+        try:
+            async with websockets.connect(f"{self.ws_url}/ws/progress/{task_id}") as ws:
+                self._record("ws_connect", started, True)
+                connected = True
+                while not stop.is_set():
+                    ping = time.perf_counter()
+                    await ws.send("ping")
+                    # Progress pushes may arrive before the pong
+                    while await asyncio.wait_for(ws.recv(), timeout=10) != "pong":
+                        pass
+                    self._record("ws_ping", ping, True)
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=self.args.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        except Exception:
+            if connected:
+                self._record("ws_ping", ping, False)
+            else:
+                self._record("ws_connect", started, False)
+
+    async def _journey(self, client) -> None:
+        started = time.perf_counter()
+        response = await self._call(
+            client, "upload", "POST", "/api/upload",
+            files={"file": ("load.wav", self.audio, "audio/wav")}
+        )
+        if response is None or response.status_code >= 400:
+            return
+        task_id = response.json()["task_id"]
+
+        stop = asyncio.Event()
+        subscription = None
+        if self.rng.random() < self.args.ws_fraction:
+            subscription = asyncio.create_task(self._subscribe(task_id, stop))
+        try:
+            status = None
+            deadline = time.monotonic() + self.args.task_timeout
+            while time.monotonic() < deadline:
+                response = await self._call(client, "status", "GET", f"/api/status/{task_id}")
+                if response is not None and response.status_code == 200:
+                    status = response.json()["status"]
+                    if status in TERMINAL:
+                        break
+                await asyncio.sleep(self.args.poll_interval)
+        finally:
+            stop.set()
+            if subscription:
+                await subscription
+        self._record("task_end_to_end", started, status == "completed")
+        if status != "completed":
+            return
+
+        await self._call(client, "result", "GET", f"/api/result/{task_id}")
+        for _ in range(self.args.exports):
+            fmt = self.rng.choice(EXPORT_FORMATS)
+            await self._call(client, f"export_{fmt}", "GET", f"/api/export/{fmt}/{task_id}")
+        if self.rng.random() < self.args.summarize_fraction:
+            await self._call(client, "summarize", "POST", "/api/summarize", json={"task_id": task_id})
+        await self._call(client, "delete", "DELETE", f"/api/task/{task_id}")
+
+    async def _user(self, client, until: float) -> None:
+        while time.monotonic() < until:
+            await self._journey(client)
+
+    async def run(self, users: int) -> dict:
+        import httpx
+
+        limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+        async with httpx.AsyncClient(timeout=self.args.request_timeout, limits=limits) as client:
+            started = time.perf_counter()
+            until = time.monotonic() + self.args.duration
+            await asyncio.gather(*(self._user(client, until) for _ in range(users)))
+            elapsed = time.perf_counter() - started
+        return {
+            "users": users,
+            "elapsed_seconds": round(elapsed, 2),
+            "endpoints": {name: stats.summary(elapsed) for name, stats in sorted(self.stats.items())}
+        }
+
+
+def print_report(stage: dict) -> None:
+    print(f"\n{stage['users']} users, {stage['elapsed_seconds']}s")
+    print(f"{'endpoint':<18} {'requests':>8} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in stage["endpoints"].items():
+        print(
+            f"{name:<18} {row['requests']:>8} {row['throughput_rps']:>8} "
+            f"{row['error_rate']:>7.2%} {row['p50_ms'] or '-':>9} {row['p95_ms'] or '-':>9} {row['p99_ms'] or '-':>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the Audtext API.")
+    parser.add_argument("--users", default="10", help="comma-separated concurrency stages, e.g. 10,25,50")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per stage")
+    parser.add_argument("--audio-seconds", type=float, default=20.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--ws-fraction", type=float, default=0.5, help="journeys that subscribe to progress")
+    parser.add_argument("--exports", type=int, default=2, help="exports per completed task")
+    parser.add_argument("--summarize-fraction", type=float, default=0.1)
+    parser.add_argument("--task-timeout", type=float, default=120.0)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--rtf", type=float, default=0.05, help="fake engine seconds per audio second")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="fake Ollama tokens per second")
+    parser.add_argument("--url", help="test a running server instead of an in-process one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args(argv)
+    stages = [int(n) for n in args.users.split(",") if n.strip()]
+
+    with ExitStack() as stack:
+        base_url = args.url
+        if base_url is None:
+            # Configure the app before anything imports the settings
+            os.environ["ASR_ENGINE"] = "fake"
+            os.environ["FAKE_ENGINE_RTF"] = str(args.rtf)
+            from benchmarks.fake_ollama import FakeOllamaConfig, create_app, serve
+            from services.ollama_service import ollama_service
+            from main import app
+
+            ollama_config = FakeOllamaConfig(
+                models=[ollama_service.model], prompt_eval_rate=0, token_rate=args.token_rate
+            )
+            stack.callback(setattr, ollama_service, "base_url", ollama_service.base_url)
+            ollama_service.base_url = stack.enter_context(serve(create_app(ollama_config)))
+            base_url = stack.enter_context(serve(app))
+
+        from benchmarks.workloads import synthetic_wav
+
+        audio = synthetic_wav(args.audio_seconds, rate=16000, channels=1)
+        report = {"url": args.url or "in-process", "settings": vars(args) | {"output": None}, "stages": []}
+        for users in stages:
+            test = LoadTest(base_url, args, audio, random.Random(args.seed))
+            stage = asyncio.run(test.run(users))
+            print_report(stage)
+            report["stages"].append(stage)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
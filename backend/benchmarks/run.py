@@ -0,0 +1,303 @@
+"""
+Run the benchmark suite, write machine-readable results and compare them
+to a saved baseline.
+
+    python -m benchmarks.run [--quick] [--only export,memory]
+                             [--output results.json]
+                             [--baseline benchmarks/baseline.json]
+                             [--save-baseline] [--tolerance 0.25]
+
+Decode numbers come from whichever ASR_ENGINE is configured; use
+``ASR_ENGINE=fake`` to measure pipeline overhead without model compute.
+Exits with status 1 when a metric regressed past the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from unittest.mock import AsyncMock, patch
+
+from core.config import settings
+
+# metric name -> {"value", "unit", "better"}; better is "lower" or "higher"
+Results = Dict[str, dict]
+
+BENCHMARKS: Dict[str, Callable[[bool], Results]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark; it takes ``quick`` and returns its metrics."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+@benchmark("ingest")
+def bench_ingest(quick: bool) -> Results:
+    """Upload endpoint throughput: save, hash and probe, transcription stubbed out."""
+    from fastapi.testclient import TestClient
+    from main import app
+    from api.routes import transcription
+    from services.audio_processor import audio_processor
+    from benchmarks.workloads import synthetic_wav
+
+    content = synthetic_wav(60 if quick else 600)
+    uploads = 3 if quick else 5
+    client = TestClient(app)
+    with patch.object(transcription, 'run_transcription', AsyncMock()) as mock_run:
+        started = time.perf_counter()
+        for _ in range(uploads):
+            response = client.post("/api/upload", files={"file": ("bench.wav", content, "audio/wav")})
+            response.raise_for_status()
+        elapsed = time.perf_counter() - started
+    for call in mock_run.call_args_list:
+        audio_processor.cleanup_file(call.args[1])
+        transcription.transcription_store.pop(call.args[0], None)
+
+    megabytes = len(content) * uploads / (1024 * 1024)
+    return {"upload_ingest_mb_per_s": metric(megabytes / elapsed, "MB/s", "higher")}
+
+
+@benchmark("queue")
+def bench_queue(quick: bool) -> Results:
+    """Dispatch latency of an idle queue, and time to drain a burst of jobs."""
+    from services.job_queue import JobQueue, TranscriptionJob
+
+    entered = {}
+
+    def handler(jobs):
+        now = time.perf_counter()
+        for job in jobs:
+            entered[job.task_id] = now
+        return [None] * len(jobs)
+
+    queue = JobQueue(handler, workers=1)
+    latencies = []
+    for i in range(200 if quick else 1000):
+        job = TranscriptionJob(task_id=f"idle-{i}", audio_path=None, duration=float(i % 60))
+        submitted = time.perf_counter()
+        queue.submit(job).result()
+        latencies.append((entered[job.task_id] - submitted) * 1000)
+
+    burst = 1000 if quick else 5000
+    jobs = [
+        TranscriptionJob(task_id=f"burst-{i}", audio_path=None, duration=float(i % 600))
+        for i in range(burst)
+    ]
+    started = time.perf_counter()
+    futures = [queue.submit(job) for job in jobs]
+    for future in futures:
+        future.result()
+    drain = (time.perf_counter() - started) * 1000
+
+    return {
+        "queue_dispatch_p50_ms": metric(statistics.median(latencies), "ms"),
+        "queue_dispatch_p95_ms": metric(percentile(latencies, 95), "ms"),
+        f"queue_drain_{burst}_ms": metric(drain, "ms")
+    }
+
+
+@benchmark("decode")
+def bench_decode(quick: bool) -> Results:
+    """Real-time factor of a full transcription per decode profile."""
+    from services.whisper_service import whisper_service
+    from benchmarks.workloads import synthetic_wav
+
+    seconds = 30 if quick else 120
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.wav"
+        path.write_bytes(synthetic_wav(seconds))
+        for profile in settings.DECODE_PROFILES:
+            result = asyncio.run(whisper_service.transcribe(
+                str(path), f"bench-{profile}", profile=profile, language="en", duration=seconds
+            ))
+            if result.real_time_factor is None:
+                raise RuntimeError(f"Decode failed for profile {profile}: {result.message}")
+            results[f"decode_rtf_{profile}"] = metric(result.real_time_factor, "x")
+    return results
+
+
+@benchmark("export")
+def bench_export(quick: bool) -> Results:
+    """
+    Time to serve every export format for large transcripts, including
+    rendering the response body (the JSON route returns a model that
+    FastAPI serializes afterwards).
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+    from api.routes import transcription
+    from models.schemas import TaskStatus, TranscriptionResult
+    from benchmarks.workloads import synthetic_segments
+
+    client = TestClient(app)
+    results = {}
+    for count in ((10_000,) if quick else (10_000, 100_000)):
+        task_id = f"bench-export-{count}"
+        transcription.transcription_store[task_id] = TranscriptionResult(
+            task_id=task_id, status=TaskStatus.COMPLETED, segments=synthetic_segments(count)
+        )
+        try:
+            for name in ("txt", "srt", "vtt", "json"):
+                started = time.perf_counter()
+                response = client.get(f"/api/export/{name}/{task_id}")
+                response.raise_for_status()
+                elapsed = (time.perf_counter() - started) * 1000
+                results[f"export_{name}_{count // 1000}k_ms"] = metric(elapsed, "ms")
+        finally:
+            transcription.transcription_store.pop(task_id, None)
+    return results
+
+
+@benchmark("memory")
+def bench_memory(quick: bool) -> Results:
+    """Memory held by one stored task, with and without word timestamps."""
+    from models.schemas import TaskStatus, TranscriptionResult
+    from benchmarks.workloads import synthetic_segments
+
+    count = 10_000
+    results = {}
+    for label, words in (("", False), ("_words", True)):
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = TranscriptionResult(
+            task_id="bench-memory", status=TaskStatus.COMPLETED,
+            segments=synthetic_segments(count, words=words)
+        )
+        held = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        del result
+        results[f"store_bytes_per_segment{label}"] = metric(held / count, "B")
+    return results
+
+
+@benchmark("summarize")
+def bench_summarize(quick: bool) -> Results:
+    """Summarization latency against a local fake Ollama server."""
+    from services.ollama_service import OllamaService
+    from benchmarks.fake_ollama import FakeOllamaConfig, create_app, serve
+    from benchmarks.workloads import synthetic_segments
+
+    transcript = synthetic_segments(2_000).full_text
+    service = OllamaService()
+    latencies = []
+    # Instant model: measures our request path, not generation speed
+    config = FakeOllamaConfig(models=[service.model], prompt_eval_rate=0, token_rate=0)
+    with serve(create_app(config)) as base_url:
+        service.base_url = base_url
+
+        async def run(count: int):
+            for _ in range(count):
+                started = time.perf_counter()
+                await service.generate_summary(transcript)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        asyncio.run(run(10 if quick else 50))
+    return {
+        "summarize_p50_ms": metric(statistics.median(latencies), "ms"),
+        "summarize_p95_ms": metric(percentile(latencies, 95), "ms")
+    }
+
+
+def run_benchmarks(names: List[str], quick: bool) -> dict:
+    results: Results = {}
+    for name in names:
+        print(f"Running {name}...")
+        results.update(BENCHMARKS[name](quick))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "engine": settings.ASR_ENGINE,
+            "model": settings.WHISPER_MODEL,
+            "quick": quick
+        },
+        "results": results
+    }
+
+
+def compare(current: Results, baseline: Results, tolerance: float) -> List[dict]:
+    """
+    Compare metrics present in both runs.
+
+    A metric regresses when it is worse than the baseline by more than
+    ``tolerance`` (a fraction of the baseline value).
+    """
+    rows = []
+    for name, entry in current.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["value"], entry["value"]
+        change = (new - old) / old if old else 0.0
+        worse = change if entry["better"] == "lower" else -change
+        rows.append({
+            "metric": name,
+            "baseline": old,
+            "current": new,
+            "change": round(change, 4),
+            "regressed": worse > tolerance
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the Audtext benchmark suite.")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--baseline", type=Path, default=Path(__file__).parent / "baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    report = run_benchmarks(names, args.quick)
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["comparison"] = compare(report["results"], baseline["results"], args.tolerance)
+
+    args.output.write_text(json.dumps(report, indent=2))
+    for name, entry in report["results"].items():
+        print(f"{name:<36} {entry['value']:>12} {entry['unit']}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+
+    regressions = [row for row in report.get("comparison", []) if row["regressed"]]
+    for row in regressions:
+        print(
+            f"REGRESSION {row['metric']}: {row['baseline']} -> {row['current']} "
+            f"({row['change']:+.0%})"
+        )
+    print(f"Results written to {args.output}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Reproducible synthetic workloads: audio files and transcripts.
+"""
+import io
+import wave
+
+import numpy as np
+
+from models.segments import SegmentTable
+from services.audio_pipeline import SAMPLE_RATE
+from services.autotune import synthetic_clip
+
+_VOCABULARY = (
+    "we reviewed the quarterly numbers and agreed that the new onboarding "
+    "flow should ship next week after one more round of testing with the "
+    "support team who raised several questions about billing and refunds"
+).split()
+
+
+def synthetic_wav(seconds: float, rate: int = 44100, channels: int = 2, seed: int = 0) -> bytes:
+    """A 16-bit PCM WAV file of speech-like audio, as a browser would upload."""
+    clip = synthetic_clip(seconds, seed=seed)
+    # Resample from 16 kHz so the decode stage has real work to do
+    positions = np.arange(int(seconds * rate)) * (SAMPLE_RATE / rate)
+    samples = np.interp(positions, np.arange(len(clip)), clip)
+    pcm = (np.repeat(samples[:, None], channels, axis=1) * 32767).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def synthetic_segments(count: int, words: bool = False, seed: int = 0) -> SegmentTable:
+    """A transcript of ``count`` segments with varied, deterministic text."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(6, 24, size=count)
+    picks = rng.integers(0, len(_VOCABULARY), size=int(lengths.sum()))
+    table = SegmentTable()
+    start = 0.0
+    cursor = 0
+    for length in lengths:
+        text_words = [_VOCABULARY[i] for i in picks[cursor:cursor + length]]
+        cursor += length
+        end = start + length * 0.4
+        rows = None
+        if words:
+            rows = [
+                (start + k * 0.4, start + (k + 1) * 0.4, word, 0.9)
+                for k, word in enumerate(text_words)
+            ]
+        table.append(round(start, 2), round(end, 2), " ".join(text_words).capitalize() + ".", rows)
+        start = end + 0.2
+    return table
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from typing import Dict, Hashable, List, Tuple
+
+
+class TaskChanges:
+    """
+    Per-task change versions and wake-ups for long-polling readers.
+
+    A task's version goes up each time it is observed with a different
+    state than last time, so ``since=<version>`` means "the state I was
+    given". Writers call ``notify`` (from any thread) after changing a
+    task; readers wait on ``listen`` and re-observe. Callers should also
+    re-check periodically, since not every write notifies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # task_id -> (version, state it was given for)
+        self._versions: Dict[str, Tuple[int, Hashable]] = {}
+        # task_id -> futures of waiting readers, with their loops
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+
+    def observe(self, task_id: str, state: Hashable) -> int:
+        """The version of ``state``, bumped if it differs from the last one."""
+        with self._lock:
+            version, last = self._versions.get(task_id, (0, None))
+            if state != last:
+                version += 1
+                self._versions[task_id] = (version, state)
+            return version
+
+    def listen(self, task_id: str) -> asyncio.Future:
+        """A future resolved on the task's next ``notify``."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters.setdefault(task_id, []).append((loop, future))
+        return future
+
+    def discard(self, task_id: str, future: asyncio.Future) -> None:
+        """Stop listening, e.g. after a timeout."""
+        with self._lock:
+            waiters = self._waiters.get(task_id)
+            if waiters is None:
+                return
+            waiters[:] = [w for w in waiters if w[1] is not future]
+            if not waiters:
+                del self._waiters[task_id]
+
+    def notify(self, task_id: str) -> None:
+        """Wake every reader waiting on the task; safe from worker threads."""
+        with self._lock:
+            waiters = self._waiters.pop(task_id, [])
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def forget(self, task_id: str) -> None:
+        """Drop a deleted task's version and wake its readers."""
+        with self._lock:
+            self._versions.pop(task_id, None)
+        self.notify(task_id)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# Global change registry for transcription tasks
+task_changes = TaskChanges()
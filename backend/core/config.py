@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
+import json
 import os
 
 class Settings(BaseSettings):
@@ -17,6 +19,209 @@ class Settings(BaseSettings):
     WHISPER_COMPUTE_TYPE: str = "int8"
     WHISPER_CPU_THREADS: int = 4
 
+    # ASR engine - "faster-whisper", or "fake" for deterministic synthetic
+    # segments produced at FAKE_ENGINE_RTF seconds per audio second, to
+    # measure the pipeline (queueing, storage, progress, export) without
+    # model compute
+    ASR_ENGINE: str = "faster-whisper"
+    FAKE_ENGINE_RTF: float = 0.0
+    FAKE_ENGINE_SEGMENT_SECONDS: float = 5.0
+    FAKE_ENGINE_LANGUAGE: str = "en"
+
+    # Transcription queue - jobs are served by dedicated worker threads
+    TRANSCRIPTION_WORKERS: int = 1
+
+    # Autotuning - `python -m services.autotune` benchmarks thread, worker
+    # and compute-type combinations and saves the best to AUTOTUNE_FILE,
+    # which later starts use for whichever of those settings aren't set
+    # explicitly. AUTOTUNE_ON_STARTUP runs it when no saved result exists.
+    AUTOTUNE_FILE: Path = BASE_DIR / "autotune.json"
+    AUTOTUNE_ON_STARTUP: bool = False
+    AUTOTUNE_OBJECTIVE: str = "throughput"  # throughput or latency
+    AUTOTUNE_CLIP_SECONDS: float = 20.0
+
+    # Scheduling - shortest job first within priority classes. A class's
+    # value is its penalty in seconds of audio; every second spent waiting
+    # takes SCHEDULER_AGING_RATE seconds off a job's score so batch work is
+    # never starved. Jobs whose duration can't be probed count as
+    # SCHEDULER_UNKNOWN_DURATION_S. ESTIMATE_DEFAULT_RTF is used for wait
+    # estimates until a real-time factor has been measured.
+    PRIORITY_CLASSES: dict = {"interactive": 0.0, "batch": 1800.0}
+    DEFAULT_PRIORITY: str = "interactive"
+    SCHEDULER_AGING_RATE: float = 1.0
+    SCHEDULER_UNKNOWN_DURATION_S: float = 600.0
+    ESTIMATE_DEFAULT_RTF: float = 0.5
+
+    # Uploads may ask to be cancelled once every progress WebSocket for the
+    # task has been closed for this long
+    CANCEL_ON_DISCONNECT_GRACE_S: float = 10.0
+
+    # Progress WebSockets - each connection has its own outbound queue of
+    # at most WEBSOCKET_SEND_QUEUE messages; when it fills, older progress
+    # is dropped for the newest. A send stalled for WEBSOCKET_SEND_TIMEOUT_S
+    # closes the connection.
+    WEBSOCKET_SEND_QUEUE: int = 8
+    WEBSOCKET_SEND_TIMEOUT_S: float = 10.0
+
+    # Multiplexed task subscriptions (/ws/tasks) - changed task states are
+    # batched and sent every WEBSOCKET_TICK_MS; one connection may watch up
+    # to WEBSOCKET_MAX_SUBSCRIPTIONS task ids (or every task)
+    WEBSOCKET_TICK_MS: int = 250
+    WEBSOCKET_MAX_SUBSCRIPTIONS: int = 1000
+
+    # Task journal - decoded segments are appended to a per-task file as
+    # they are produced; tasks interrupted by a crash or restart resume
+    # from their last journaled segment on startup.
+    JOURNAL_ENABLED: bool = True
+    JOURNAL_DIR: Path = BASE_DIR / "journal"
+
+    # Decode stage - a separate thread decodes/resamples uploads into
+    # float32 PCM blocks ahead of inference. DECODE_BUFFER_SECONDS caps how
+    # much decoded audio may be buffered across all jobs.
+    DECODE_BLOCK_SECONDS: int = 30
+    DECODE_BUFFER_SECONDS: int = 1800
+
+    # Decoded-PCM cache - keeps 16 kHz mono float32 audio on disk, keyed by
+    # upload content hash, so tasks can be re-transcribed without the
+    # original file. Least recently used entries are evicted past the cap.
+    PCM_CACHE_ENABLED: bool = False
+    PCM_CACHE_DIR: Path = BASE_DIR / "pcm_cache"
+    PCM_CACHE_MAX_MB: int = 2048
+
+    # Language identification - without an upload language hint, up to
+    # LANGUAGE_DETECTION_WINDOWS 30-second VAD speech windows are scored
+    # once per file; results are cached by upload content hash.
+    LANGUAGE_DETECTION_WINDOWS: int = 3
+    LANGUAGE_CACHE_SIZE: int = 1024
+
+    # Repetition-loop detection - segments are checked as they are decoded;
+    # an n-gram repeated REPETITION_MAX_REPEATS times within the last
+    # REPETITION_WINDOW_WORDS words, or window text compressing better than
+    # REPETITION_COMPRESSION_RATIO, restarts decoding past the loop without
+    # conditioning on previous text (at most REPETITION_MAX_RESTARTS times).
+    REPETITION_DETECTION: bool = True
+    REPETITION_NGRAM_SIZE: int = 4
+    REPETITION_MAX_REPEATS: int = 4
+    REPETITION_WINDOW_WORDS: int = 80
+    REPETITION_COMPRESSION_RATIO: float = 3.0
+    REPETITION_MAX_RESTARTS: int = 5
+
+    # Live transcription (/ws/live) - the window is re-decoded every
+    # LIVE_MIN_CHUNK_SECONDS of new audio and trimmed past agreed words
+    # once it grows beyond LIVE_BUFFER_SECONDS.
+    LIVE_MAX_SESSIONS: int = 2
+    LIVE_PROFILE: str = "fast"
+    LIVE_MIN_CHUNK_SECONDS: float = 1.0
+    LIVE_BUFFER_SECONDS: float = 15.0
+    LIVE_MAX_SEGMENT_SECONDS: float = 10.0
+
+    # Two-pass mode - a draft from a small model with greedy decoding is
+    # published first, then the main model refines it window by window in
+    # the background, replacing draft segments as each window finishes.
+    TWO_PASS_DRAFT_MODEL: str = "tiny"
+    TWO_PASS_DRAFT_PROFILE: str = "fast"
+    TWO_PASS_REFINE_PROFILE: str = "accurate"
+    TWO_PASS_REFINE_PRIORITY: str = "batch"
+    TWO_PASS_WINDOW_SECONDS: float = 30.0
+
+    # Adaptive mode - decode with the cheap ADAPTIVE_DRAFT_PROFILE, then
+    # re-decode only segments below these confidence limits with
+    # ADAPTIVE_REDECODE_PROFILE. ADAPTIVE_PAD_SECONDS of context is added
+    # around each low-confidence stretch.
+    ADAPTIVE_DRAFT_PROFILE: str = "fast"
+    ADAPTIVE_REDECODE_PROFILE: str = "accurate"
+    ADAPTIVE_MIN_AVG_LOGPROB: float = -0.7
+    ADAPTIVE_MAX_NO_SPEECH_PROB: float = 0.6
+    ADAPTIVE_MAX_COMPRESSION_RATIO: float = 2.2
+    ADAPTIVE_PAD_SECONDS: float = 0.5
+
+    # Throughput mode - batched inference over VAD speech chunks.
+    # Files shorter than WHISPER_BATCH_MIN_DURATION_S use the sequential
+    # decoder; up to WHISPER_MAX_JOBS_PER_BATCH queued jobs with the same
+    # profile and language can share one batched pass.
+    WHISPER_THROUGHPUT_MODE: bool = False
+    WHISPER_BATCH_SIZE: int = 8
+    WHISPER_BATCH_MIN_DURATION_S: float = 60.0
+    WHISPER_MAX_JOBS_PER_BATCH: int = 4
+
+    # Decode profiles - named transcribe() settings selectable per upload.
+    # Each profile tunes beam search, temperature fallback, VAD and
+    # conditioning on previous text.
+    DEFAULT_DECODE_PROFILE: str = "balanced"
+    DECODE_PROFILES: dict = {
+        "fast": {
+            "beam_size": 1,
+            "best_of": 1,
+            "temperature": [0.0, 0.4, 0.8],
+            "condition_on_previous_text": False,
+            "vad_parameters": {
+                "threshold": 0.6,
+                "min_speech_duration_ms": 250,
+                "min_silence_duration_ms": 300,
+                "speech_pad_ms": 200,
+            },
+        },
+        "balanced": {
+            "beam_size": 5,
+            "best_of": 5,
+            "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+            "condition_on_previous_text": True,
+            "vad_parameters": {
+                "threshold": 0.5,
+                "min_speech_duration_ms": 250,
+                "min_silence_duration_ms": 500,
+                "speech_pad_ms": 400,
+            },
+        },
+        "accurate": {
+            "beam_size": 10,
+            "best_of": 10,
+            "patience": 2.0,
+            "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+            "condition_on_previous_text": True,
+            "vad_parameters": {
+                "threshold": 0.4,
+                "min_speech_duration_ms": 150,
+                "min_silence_duration_ms": 700,
+                "speech_pad_ms": 500,
+            },
+        },
+    }
+
+    # Prometheus text metrics at /metrics
+    METRICS_ENABLED: bool = True
+
+    # Admin endpoints (/api/admin) need this in the X-Admin-Token header;
+    # they are disabled while it is empty
+    ADMIN_TOKEN: str = ""
+
+    # On-demand profiling (POST /api/admin/profiles) - samples thread
+    # stacks every PROFILE_INTERVAL_MS and optionally traces allocations,
+    # for at most PROFILE_MAX_SECONDS; output goes to PROFILE_DIR
+    PROFILE_DIR: Path = BASE_DIR / "profiles"
+    PROFILE_DEFAULT_SECONDS: float = 30.0
+    PROFILE_MAX_SECONDS: float = 600.0
+    PROFILE_INTERVAL_MS: float = 10.0
+
+    # Task timings - every finished task's timing breakdown is appended to
+    # TIMINGS_LOG_FILE for aggregate analysis (`python -m
+    # services.timing_log`); the last TIMINGS_RECENT stay queryable after
+    # their task is deleted.
+    TIMINGS_LOG_ENABLED: bool = True
+    TIMINGS_LOG_FILE: Path = BASE_DIR / "timings.jsonl"
+    TIMINGS_RECENT: int = 1000
+
+    # Status long-polling - `GET /api/status/{id}?since=&wait=` and
+    # `POST /api/status/batch` hold a request for at most STATUS_MAX_WAIT_S
+    # until a task changes status or stage or its progress crosses a
+    # STATUS_PROGRESS_STEP percent step, re-checking every STATUS_RECHECK_S
+    # for changes nothing announced; a batch covers at most STATUS_BATCH_MAX
+    # tasks.
+    STATUS_MAX_WAIT_S: float = 60.0
+    STATUS_PROGRESS_STEP: float = 5.0
+    STATUS_RECHECK_S: float = 1.0
+    STATUS_BATCH_MAX: int = 500
+
     # Ollama settings
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.1:8b"
@@ -28,7 +233,35 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
+# Settings an autotune result may provide
+AUTOTUNED_SETTINGS = ("WHISPER_CPU_THREADS", "TRANSCRIPTION_WORKERS", "WHISPER_COMPUTE_TYPE")
+
+
+def apply_autotune(settings: Settings) -> Optional[dict]:
+    """
+    Apply a saved autotune result to settings that weren't set explicitly.
+
+    The result is only used if it was measured for the configured model on
+    a machine with the same CPU count. Returns the result, or None.
+    """
+    path = settings.AUTOTUNE_FILE
+    if not path.exists():
+        return None
+    try:
+        tuned = json.loads(path.read_text())
+    except (OSError, ValueError):
+        print(f"Ignoring unreadable autotune file {path}")
+        return None
+    if tuned.get("model") != settings.WHISPER_MODEL or tuned.get("cpu_count") != os.cpu_count():
+        return None
+    for key in AUTOTUNED_SETTINGS:
+        if key in tuned.get("config", {}) and key not in settings.model_fields_set:
+            setattr(settings, key, tuned["config"][key])
+    return tuned
+
+
 settings = Settings()
+apply_autotune(settings)
 
 # Ensure upload directory exists
 settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
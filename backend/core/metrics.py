@@ -0,0 +1,271 @@
+"""
+Prometheus-compatible metrics, served as text from ``/metrics``.
+
+A small registry of counters, gauges and histograms with keyword labels.
+Updates take one lock and a dict lookup; instrument per job or per
+request, never per decoded segment. Gauges and counters whose value
+already lives elsewhere (queue depth, cache hits) read it at scrape time
+through ``set_function``.
+"""
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; pipeline stages range from milliseconds to long decodes
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0, 120.0, 300.0, 600.0, 1800.0
+)
+
+REGISTRY: List["_Metric"] = []
+
+# (name suffix, label names and values, value)
+Sample = Tuple[str, Sequence[Tuple[str, str]], float]
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+        self._function: Optional[Callable] = None
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: Callable) -> None:
+        """
+        Read values at scrape time instead of storing them.
+
+        ``function()`` returns a number for an unlabelled metric, or a dict
+        of label-value tuples to numbers.
+        """
+        self._function = function
+
+    def _items(self) -> List[Tuple[tuple, float]]:
+        if self._function is not None:
+            values = self._function()
+            if not isinstance(values, dict):
+                values = {(): values}
+            return [(tuple(str(v) for v in key), value) for key, value in values.items()]
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._items():
+            yield "", tuple(zip(self.labelnames, key)), value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum."""
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [count per bucket..., count in +Inf, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time spent in a ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels):
+        """Decorator observing each call's wall time; async functions too."""
+        def decorate(func):
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.time(**labels):
+                        return await func(*args, **kwargs)
+            else:
+                @wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.time(**labels):
+                        return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in series.items():
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                yield "_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield "_count", labels, cumulative
+            yield "_sum", labels, values[-1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, labels, value in metric.samples():
+            label_text = ",".join(f'{name}="{_escape(v)}"' for name, v in labels)
+            label_text = "{" + label_text + "}" if label_text else ""
+            lines.append(f"{metric.name}{suffix}{label_text} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Uploads
+UPLOADS = Counter("audtext_uploads_total", "Accepted file uploads.")
+UPLOAD_BYTES = Histogram(
+    "audtext_upload_bytes", "Size of accepted uploads in bytes.",
+    buckets=[2 ** n for n in range(16, 34, 2)]
+)
+UPLOAD_AUDIO_SECONDS = Histogram(
+    "audtext_upload_audio_seconds", "Probed audio duration of accepted uploads.",
+    buckets=(10, 30, 60, 300, 600, 1800, 3600, 7200, 14400)
+)
+
+# Jobs
+JOBS = Counter(
+    "audtext_jobs_total", "Finished transcription jobs by kind and final status.",
+    ["kind", "status"]
+)
+TASKS = Gauge("audtext_tasks", "Stored tasks by status.", ["status"])
+QUEUE_PENDING = Gauge("audtext_queue_pending_jobs", "Jobs waiting in the transcription queue.")
+QUEUE_RUNNING = Gauge("audtext_queue_running_jobs", "Jobs being decoded right now.")
+STAGE_SECONDS = Histogram(
+    "audtext_stage_seconds",
+    "Latency of pipeline stages (ingest, queue_wait, decode, language_detection, "
+    "inference, redecode, cleanup, store, export, summarize).",
+    ["stage"]
+)
+REAL_TIME_FACTOR = Histogram(
+    "audtext_real_time_factor", "Wall seconds per audio second of completed transcriptions.",
+    ["decode_mode"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+)
+AUDIO_SECONDS = Counter("audtext_audio_seconds_total", "Audio seconds transcribed.")
+
+# Caches
+CACHE_REQUESTS = Counter(
+    "audtext_cache_requests_total", "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"]
+)
+PCM_CACHE_BYTES = Gauge("audtext_pcm_cache_bytes", "Bytes held by the decoded-PCM cache.")
+
+# Model and memory
+MODEL_LOAD_SECONDS = Gauge(
+    "audtext_model_load_seconds", "Time taken to load each ASR model.", ["engine", "model"]
+)
+STORE_BYTES = Gauge(
+    "audtext_transcription_store_bytes", "Approximate memory held by stored transcripts."
+)
+
+# Summaries and connections
+SUMMARIES = Counter("audtext_summaries_total", "Summary requests by outcome.", ["outcome"])
+WEBSOCKETS = Gauge("audtext_websocket_connections", "Open WebSocket connections by kind.", ["kind"])
+WEBSOCKET_DROPPED = Counter(
+    "audtext_websocket_messages_dropped_total",
+    "Outbound WebSocket messages dropped: superseded by newer progress, "
+    "or discarded when a slow or broken connection was closed.",
+    ["reason"]
+)
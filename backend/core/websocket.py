@@ -1,26 +1,177 @@
-from typing import Dict, Set
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Set, Tuple
 from fastapi import WebSocket
 import json
 import asyncio
 
+from core.config import settings
+from core import metrics
+
+
+class ConnectionSender:
+    """
+    Bounded outbound queue and writer task for one WebSocket.
+
+    Broadcasters only enqueue, so a slow client never delays the others.
+    When the queue is full, queued progress messages are dropped in favour
+    of the newest one (they supersede each other); a client whose send
+    stalls past ``send_timeout`` is closed and reported through
+    ``on_dead``.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_dead: Callable[[WebSocket], None],
+        max_queue: int,
+        send_timeout: float
+    ):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.max_queue = max(1, max_queue)
+        self.send_timeout = send_timeout
+        # (text, droppable); progress is droppable, replies such as pong are not
+        self.queue: Deque[Tuple[str, bool]] = deque()
+        self.dropped = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    def offer(self, text: str, droppable: bool = True) -> None:
+        """Queue a message without waiting for the socket."""
+        if self.closed:
+            return
+        if len(self.queue) >= self.max_queue:
+            kept = deque(item for item in self.queue if not item[1])
+            dropped = len(self.queue) - len(kept)
+            self.queue = kept
+            self.dropped += dropped
+            metrics.WEBSOCKET_DROPPED.inc(dropped, reason="superseded")
+            if len(self.queue) >= self.max_queue:
+                # Not even the undroppable replies are being read
+                self._fail("queue_full")
+                return
+        self.queue.append((text, droppable))
+        self._ready.set()
+
+    async def _run(self) -> None:
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.queue and not self.closed:
+                    text, _ = self.queue.popleft()
+                    await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            self._fail("slow")
+        except Exception:
+            self._fail("error")
+
+    def _fail(self, reason: str) -> None:
+        if self.closed:
+            return
+        metrics.WEBSOCKET_DROPPED.inc(len(self.queue) + 1, reason=reason)
+        self.close()
+        self.on_dead(self.websocket)
+        # Close off the broadcaster's path; the client may be gone already
+        asyncio.ensure_future(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1011), self.send_timeout)
+        except Exception:
+            pass
+
+    @property
+    def idle(self) -> bool:
+        """Nothing is waiting to be sent."""
+        return not self.queue
+
+    def close(self) -> None:
+        """Stop the writer; queued messages are discarded."""
+        self.closed = True
+        self.queue.clear()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+
 class ConnectionManager:
     def __init__(self):
         # task_id -> set of websocket connections
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # task_id -> callback run once the task's last client is gone
+        self.idle_callbacks: Dict[str, Callable[[str], None]] = {}
+        # websocket -> its outbound queue and writer
+        self.senders: Dict[WebSocket, ConnectionSender] = {}
+        # Loop the connections live on; publish() hands updates to it
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def on_idle(self, task_id: str, callback: Callable[[str], None]):
+        """Run ``callback(task_id)`` when every client of a task has left."""
+        self.idle_callbacks[task_id] = callback
+
+    def clear_idle(self, task_id: str):
+        """Forget a task's idle callback."""
+        self.idle_callbacks.pop(task_id, None)
+
+    def _check_idle(self, task_id: str):
+        # Runs after a grace period so a page reload doesn't count as leaving
+        if task_id in self.active_connections:
+            return
+        callback = self.idle_callbacks.pop(task_id, None)
+        if callback:
+            callback(task_id)
+
+    def _schedule_idle_check(self, task_id: str):
+        if task_id not in self.idle_callbacks:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._check_idle(task_id)
+            return
+        loop.call_later(settings.CANCEL_ON_DISCONNECT_GRACE_S, self._check_idle, task_id)
 
     async def connect(self, websocket: WebSocket, task_id: str):
         """Accept WebSocket connection and register it for a task."""
         await websocket.accept()
+        self._loop = asyncio.get_running_loop()
         if task_id not in self.active_connections:
             self.active_connections[task_id] = set()
         self.active_connections[task_id].add(websocket)
+        self._sender(websocket, task_id)
+
+    def _sender(self, websocket: WebSocket, task_id: str) -> ConnectionSender:
+        sender = self.senders.get(websocket)
+        if sender is None:
+            sender = self.senders[websocket] = ConnectionSender(
+                websocket,
+                lambda ws: self.disconnect(ws, task_id),
+                max_queue=settings.WEBSOCKET_SEND_QUEUE,
+                send_timeout=settings.WEBSOCKET_SEND_TIMEOUT_S
+            )
+        return sender
+
+    def send_text(self, websocket: WebSocket, task_id: str, text: str):
+        """Queue a reply (e.g. pong) that must not be dropped for progress."""
+        self._sender(websocket, task_id).offer(text, droppable=False)
+
+    def connection_count(self) -> int:
+        """Open progress connections across all tasks."""
+        return sum(len(connections) for connections in self.active_connections.values())
 
     def disconnect(self, websocket: WebSocket, task_id: str):
         """Remove WebSocket connection."""
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            sender.close()
         if task_id in self.active_connections:
             self.active_connections[task_id].discard(websocket)
             if not self.active_connections[task_id]:
                 del self.active_connections[task_id]
+                self._schedule_idle_check(task_id)
 
     async def send_progress(
         self,
@@ -30,26 +181,184 @@ class ConnectionManager:
         status: str = "processing",
         current_segment: int = None
     ):
-        """Send progress update to all connections for a task."""
-        if task_id in self.active_connections:
-            data = {
-                "task_id": task_id,
-                "status": status,
-                "progress": progress,
-                "message": message,
-                "current_segment": current_segment
-            }
-
-            dead_connections = set()
-            for websocket in self.active_connections[task_id]:
-                try:
-                    await websocket.send_json(data)
-                except:
-                    dead_connections.add(websocket)
-
-            # Clean up dead connections
-            for ws in dead_connections:
-                self.active_connections[task_id].discard(ws)
-
-# Global connection manager
+        """
+        Send a progress update to every connection for a task.
+
+        The payload is serialized once and queued per connection; this
+        never waits on a socket.
+        """
+        self._offer_progress(task_id, progress, message, status, current_segment)
+
+    def publish(
+        self,
+        task_id: str,
+        progress: float,
+        message: str,
+        status: str = "processing",
+        current_segment: int = None
+    ):
+        """Queue a progress update from any thread, e.g. a transcription worker."""
+        loop = self._loop
+        if loop is None or task_id not in self.active_connections:
+            return
+        try:
+            loop.call_soon_threadsafe(
+                self._offer_progress, task_id, progress, message, status, current_segment
+            )
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def _offer_progress(self, task_id, progress, message, status, current_segment):
+        connections = self.active_connections.get(task_id)
+        if not connections:
+            return
+        text = json.dumps({
+            "task_id": task_id,
+            "status": status,
+            "progress": progress,
+            "message": message,
+            "current_segment": current_segment
+        })
+        for websocket in list(connections):
+            self._sender(websocket, task_id).offer(text)
+
+
+class Subscription:
+    """The task ids one multiplexed connection watches, and what it has seen."""
+
+    def __init__(self, sender: ConnectionSender):
+        self.sender = sender
+        self.task_ids: Set[str] = set()
+        self.all_tasks = False
+        # task_id -> last state sent to this connection
+        self.seen: Dict[str, tuple] = {}
+
+
+class SubscriptionManager:
+    """
+    Many task subscriptions over one WebSocket each.
+
+    Every ``interval`` seconds the task states from ``source`` are compared
+    with what each connection was last sent, and each connection gets one
+    message listing only the tasks that changed or went away. A task's
+    entry is serialized once per tick however many connections watch it.
+    A connection whose previous batch hasn't been sent yet is skipped for
+    the tick, so a slow client just gets coarser batches.
+    """
+
+    def __init__(self, interval: float, max_tasks: int):
+        self.interval = interval
+        self.max_tasks = max_tasks
+        self.subscriptions: Dict[WebSocket, Subscription] = {}
+        # task_id -> {"status", "progress", "message", ...}
+        self.source: Callable[[], Dict[str, dict]] = dict
+        self.ticks = 0
+        self._ticker: Optional[asyncio.Future] = None
+
+    def set_source(self, source: Callable[[], Dict[str, dict]]) -> None:
+        """Set the function returning the current state of every task."""
+        self.source = source
+
+    def connection_count(self) -> int:
+        return len(self.subscriptions)
+
+    async def connect(self, websocket: WebSocket) -> None:
+        await websocket.accept()
+        self.subscriptions[websocket] = Subscription(ConnectionSender(
+            websocket,
+            self.disconnect,
+            max_queue=settings.WEBSOCKET_SEND_QUEUE,
+            send_timeout=settings.WEBSOCKET_SEND_TIMEOUT_S
+        ))
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.ensure_future(self._run())
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        subscription = self.subscriptions.pop(websocket, None)
+        if subscription is not None:
+            subscription.sender.close()
+
+    def reply(self, websocket: WebSocket, message) -> None:
+        """Queue a direct reply (ack, error, pong) to one connection."""
+        subscription = self.subscriptions.get(websocket)
+        if subscription is not None:
+            text = message if isinstance(message, str) else json.dumps(message)
+            subscription.sender.offer(text, droppable=False)
+
+    def subscribe(self, websocket: WebSocket, task_ids: Iterable[str] = (), all_tasks: bool = False) -> dict:
+        """Watch more tasks; raises ValueError past ``max_tasks``."""
+        subscription = self.subscriptions[websocket]
+        added = set(task_ids) - subscription.task_ids
+        if len(subscription.task_ids) + len(added) > self.max_tasks:
+            raise ValueError(f"At most {self.max_tasks} task subscriptions per connection")
+        subscription.task_ids |= added
+        subscription.all_tasks = subscription.all_tasks or all_tasks
+        return self._state(subscription)
+
+    def unsubscribe(self, websocket: WebSocket, task_ids: Iterable[str] = (), all_tasks: bool = False) -> dict:
+        """Stop watching tasks; ``all_tasks`` ends the all-tasks subscription."""
+        subscription = self.subscriptions[websocket]
+        subscription.task_ids -= set(task_ids)
+        if all_tasks:
+            subscription.all_tasks = False
+        for task_id in list(subscription.seen):
+            if not subscription.all_tasks and task_id not in subscription.task_ids:
+                del subscription.seen[task_id]
+        return self._state(subscription)
+
+    @staticmethod
+    def _state(subscription: Subscription) -> dict:
+        return {"task_ids": sorted(subscription.task_ids), "all": subscription.all_tasks}
+
+    async def _run(self) -> None:
+        while self.subscriptions:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Subscription tick failed: {e}")
+
+    def tick(self) -> None:
+        """Send each connection the changes since its last batch."""
+        self.ticks += 1
+        if not self.subscriptions:
+            return
+        states = self.source()
+        fragments: Dict[str, str] = {}
+
+        def fragment(task_id: str) -> str:
+            text = fragments.get(task_id)
+            if text is None:
+                text = fragments[task_id] = json.dumps({"task_id": task_id, **states[task_id]})
+            return text
+
+        for subscription in list(self.subscriptions.values()):
+            if not subscription.sender.idle:
+                continue
+            watched = states.keys() if subscription.all_tasks else subscription.task_ids
+            changed = []
+            for task_id in watched:
+                state = states.get(task_id)
+                if state is None:
+                    continue
+                key = tuple(state.values())
+                if subscription.seen.get(task_id) != key:
+                    subscription.seen[task_id] = key
+                    changed.append(fragment(task_id))
+            removed = [task_id for task_id in subscription.seen if task_id not in states]
+            for task_id in removed:
+                del subscription.seen[task_id]
+            if changed or removed:
+                subscription.sender.offer(
+                    f'{{"type":"tasks","tick":{self.ticks},"tasks":[{",".join(changed)}],'
+                    f'"removed":{json.dumps(removed)}}}',
+                    droppable=False
+                )
+
+
+# Global connection managers
 manager = ConnectionManager()
+subscriptions = SubscriptionManager(
+    interval=settings.WEBSOCKET_TICK_MS / 1000,
+    max_tasks=settings.WEBSOCKET_MAX_SUBSCRIPTIONS
+)
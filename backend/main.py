@@ -1,10 +1,13 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from contextlib import asynccontextmanager
+import json
 
-from api.routes import transcription, summarization, export
-from core.websocket import manager
+from api.routes import transcription, summarization, export, live, admin
+from core.websocket import manager, subscriptions
 from core.config import settings
+from core import metrics
 
 
 @asynccontextmanager
@@ -13,6 +16,9 @@ async def lifespan(app: FastAPI):
     print(f"Starting {settings.APP_NAME}...")
     print(f"Whisper model: {settings.WHISPER_MODEL}")
     print(f"Ollama model: {settings.OLLAMA_MODEL}")
+    resumed = transcription.resume_interrupted()
+    if resumed:
+        print(f"Resuming {resumed} interrupted transcription(s)")
     yield
     print("Shutting down...")
 
@@ -37,6 +43,8 @@ app.add_middleware(
 app.include_router(transcription.router)
 app.include_router(summarization.router)
 app.include_router(export.router)
+app.include_router(live.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -56,6 +64,21 @@ async def health():
     return {"status": "healthy"}
 
 
+metrics.WEBSOCKETS.set_function(lambda: {
+    ("progress",): manager.connection_count(),
+    ("tasks",): subscriptions.connection_count(),
+    ("live",): live.active_sessions
+})
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Pipeline metrics in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.websocket("/ws/progress/{task_id}")
 async def websocket_progress(websocket: WebSocket, task_id: str):
     """WebSocket endpoint for real-time progress updates."""
@@ -64,13 +87,47 @@ async def websocket_progress(websocket: WebSocket, task_id: str):
         while True:
             # Keep connection alive, wait for messages
             data = await websocket.receive_text()
-            # Echo back for ping/pong
+            # Echo back for ping/pong, in order with queued progress
             if data == "ping":
-                await websocket.send_text("pong")
+                manager.send_text(websocket, task_id, "pong")
     except WebSocketDisconnect:
         manager.disconnect(websocket, task_id)
 
 
+
+@app.websocket("/ws/tasks")
+async def websocket_tasks(websocket: WebSocket):
+    """
+    Progress of many tasks over one connection.
+
+    Send ``{"action": "subscribe", "task_ids": [...]}`` (or ``"all": true``)
+    and ``{"action": "unsubscribe", ...}``; changed tasks arrive batched as
+    ``{"type": "tasks", "tick": n, "tasks": [...], "removed": [...]}``.
+    """
+    await subscriptions.connect(websocket)
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                subscriptions.reply(websocket, "pong")
+                continue
+            try:
+                request = json.loads(data)
+                action = request["action"]
+                task_ids = request.get("task_ids") or []
+                all_tasks = bool(request.get("all", False))
+                if action not in ("subscribe", "unsubscribe") or not isinstance(task_ids, list):
+                    raise ValueError("Expected a subscribe or unsubscribe action with a task_ids list")
+                change = subscriptions.subscribe if action == "subscribe" else subscriptions.unsubscribe
+                state = change(websocket, [str(task_id) for task_id in task_ids], all_tasks)
+            except (ValueError, KeyError, TypeError) as e:
+                subscriptions.reply(websocket, {"type": "error", "detail": str(e)})
+                continue
+            subscriptions.reply(websocket, {"type": f"{action}d", **state})
+    except WebSocketDisconnect:
+        subscriptions.disconnect(websocket)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,19 +1,33 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, computed_field
+from typing import Optional, List, Dict
 from enum import Enum
 from datetime import datetime
 
+from models.segments import SegmentTable
+
 class TaskStatus(str, Enum):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class TranscriptWord(BaseModel):
+    word: str
+    start: float
+    end: float
+    probability: float
 
 class TranscriptSegment(BaseModel):
     id: int
     start: float
     end: float
     text: str
+    words: Optional[List[TranscriptWord]] = None  # only with word timestamps
+    # Decoder confidence, when it was recorded
+    avg_logprob: Optional[float] = None
+    no_speech_prob: Optional[float] = None
+    compression_ratio: Optional[float] = None
 
 class TranscriptionResult(BaseModel):
     task_id: str
@@ -21,10 +35,39 @@ class TranscriptionResult(BaseModel):
     progress: float = 0.0
     message: str = ""
     language: Optional[str] = None
+    language_probability: Optional[float] = None  # None when given as a hint
     duration: Optional[float] = None
-    segments: List[TranscriptSegment] = []
-    full_text: Optional[str] = None
+    segments: SegmentTable = Field(default_factory=SegmentTable)
+    content_hash: Optional[str] = None
+    profile: Optional[str] = None
+    decode_mode: Optional[str] = None  # sequential, batched, batched-cross-job
+    processing_time: Optional[float] = None
+    real_time_factor: Optional[float] = None
+    throughput: Optional[float] = None  # audio seconds per wall-clock second
+    repetition_restarts: int = 0  # decoder restarts after repetition loops
+    # Adaptive mode: audio seconds re-decoded for low confidence
+    redecoded_seconds: Optional[float] = None
+    # Two-pass mode: "draft", "refining" or "final". The first
+    # final_segments segments (ending at refined_until seconds) are
+    # refined; the rest are still draft.
+    transcript_stage: Optional[str] = None
+    final_segments: Optional[int] = None
+    refined_until: Optional[float] = None
+    # Per-stage durations in seconds (ingest, queue_wait, decode, ...)
+    timings: Dict[str, float] = {}
     created_at: datetime = Field(default_factory=datetime.now)
+    # When the job was queued, picked up by a worker, produced its first
+    # segment and finished
+    enqueued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    first_segment_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def full_text(self) -> Optional[str]:
+        # Derived from the segment text buffer instead of stored separately
+        return self.segments.full_text or None
 
 class SummaryRequest(BaseModel):
     task_id: str
@@ -40,6 +83,69 @@ class UploadResponse(BaseModel):
     filename: str
     message: str
 
+class RetranscribeRequest(BaseModel):
+    profile: Optional[str] = None
+    language: Optional[str] = None
+    word_timestamps: bool = False
+    priority: Optional[str] = None
+
+class RetranscribeResponse(BaseModel):
+    task_id: str
+    source_task_id: str
+    profile: str
+    message: str
+
+class TaskTimings(BaseModel):
+    """Where a task's time went, from upload to finish."""
+    task_id: str
+    status: TaskStatus
+    profile: Optional[str] = None
+    decode_mode: Optional[str] = None
+    audio_duration: Optional[float] = None
+    created_at: datetime
+    enqueued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    first_segment_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Seconds from upload to first segment, and to finish
+    time_to_first_segment: Optional[float] = None
+    total_seconds: Optional[float] = None
+    processing_time: Optional[float] = None
+    real_time_factor: Optional[float] = None
+    stages: Dict[str, float] = {}
+
+    @classmethod
+    def from_result(cls, result: "TranscriptionResult") -> "TaskTimings":
+        def since_upload(moment: Optional[datetime]) -> Optional[float]:
+            if moment is None:
+                return None
+            return round((moment - result.created_at).total_seconds(), 3)
+
+        return cls(
+            task_id=result.task_id,
+            status=result.status,
+            profile=result.profile,
+            decode_mode=result.decode_mode,
+            audio_duration=result.duration,
+            created_at=result.created_at,
+            enqueued_at=result.enqueued_at,
+            started_at=result.started_at,
+            first_segment_at=result.first_segment_at,
+            finished_at=result.finished_at,
+            time_to_first_segment=since_upload(result.first_segment_at),
+            total_seconds=since_upload(result.finished_at),
+            processing_time=result.processing_time,
+            real_time_factor=result.real_time_factor,
+            stages=result.timings
+        )
+
+class ProfileRequest(BaseModel):
+    # Window length; with task_id the session also ends when the task does
+    seconds: Optional[float] = None
+    task_id: Optional[str] = None
+    memory: bool = True  # tracemalloc snapshot alongside CPU stacks
+    interval_ms: Optional[float] = None
+
 class ProgressUpdate(BaseModel):
     task_id: str
     status: TaskStatus
@@ -47,3 +153,24 @@ class ProgressUpdate(BaseModel):
     message: str
     current_segment: Optional[int] = None
     total_segments: Optional[int] = None
+    # Seconds from now, estimated from probed duration and measured RTF
+    estimated_wait: Optional[float] = None
+    estimated_completion: Optional[float] = None
+    # Two-pass mode, see TranscriptionResult
+    transcript_stage: Optional[str] = None
+    final_segments: Optional[int] = None
+    refined_until: Optional[float] = None
+    # Bumped when status or refinement state change or progress crosses a
+    # STATUS_PROGRESS_STEP; pass back as ``since`` to long-poll for the next
+    version: Optional[int] = None
+
+class StatusBatchRequest(BaseModel):
+    task_ids: List[str]
+    # task_id -> version already seen; with ``wait`` the response is held
+    # until one of the tasks moves past it (0 for a task not yet created)
+    since: Dict[str, int] = {}
+    wait: float = 0.0
+
+class StatusBatchResponse(BaseModel):
+    tasks: List[ProgressUpdate]
+    missing: List[str] = []
@@ -0,0 +1,333 @@
+"""
+Compact, array-backed storage for transcript segments.
+"""
+import math
+from array import array
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic_core import core_schema
+
+_NAN = float("nan")
+
+
+class SegmentTable:
+    """
+    Columnar container for transcript segments.
+
+    Start and end times live in float32 arrays, all segment text lives in a
+    single space-joined buffer addressed by character offsets, and segment
+    ids are implied by position. The buffer doubles as the transcript's full
+    text, so nothing is stored twice. Pydantic ``TranscriptSegment`` objects
+    are only built when a caller explicitly asks for them (API responses).
+
+    Word timestamps, when decoded, are stored the same way: each word is a
+    character span of the text buffer plus float32 start, end and
+    probability columns.
+
+    Decoder confidence (avg_logprob, no_speech_prob, compression_ratio)
+    gets three more float32 columns, allocated once the first segment
+    with confidence is appended; rows without it hold NaN.
+    """
+
+    __slots__ = (
+        "_starts", "_ends", "_offsets", "_text", "_pending", "_size",
+        "_first_word", "_word_offsets", "_word_lengths",
+        "_word_starts", "_word_ends", "_word_probs",
+        "_avg_logprobs", "_no_speech_probs", "_compression_ratios"
+    )
+
+    def __init__(self):
+        self._starts = array("f")
+        self._ends = array("f")
+        # Offset of each segment's first character in the text buffer
+        self._offsets = array("I")
+        self._text = ""
+        # Text appended since the buffer was last joined
+        self._pending: List[str] = []
+        self._size = 0
+        # Index of each segment's first word in the word columns
+        self._first_word = array("I")
+        self._word_offsets = array("I")
+        self._word_lengths = array("H")
+        self._word_starts = array("f")
+        self._word_ends = array("f")
+        self._word_probs = array("f")
+        self._avg_logprobs = array("f")
+        self._no_speech_probs = array("f")
+        self._compression_ratios = array("f")
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Any]) -> "SegmentTable":
+        """Build a table from TranscriptSegment objects or plain dicts."""
+        table = cls()
+        for segment in segments:
+            if isinstance(segment, dict):
+                start, end, text = segment["start"], segment["end"], segment["text"]
+                words = segment.get("words")
+            else:
+                start, end, text = segment.start, segment.end, segment.text
+                words = getattr(segment, "words", None)
+            get = segment.get if isinstance(segment, dict) else lambda key: getattr(segment, key, None)
+            confidence = None
+            if get("avg_logprob") is not None:
+                confidence = (get("avg_logprob"), get("no_speech_prob"), get("compression_ratio"))
+            if words:
+                words = [
+                    (w["start"], w["end"], w["word"], w.get("probability", 0.0))
+                    if isinstance(w, dict) else (w.start, w.end, w.word, w.probability)
+                    for w in words
+                ]
+            table.append(start, end, text, words, confidence)
+        return table
+
+    def append(
+        self,
+        start: float,
+        end: float,
+        text: str,
+        words: Optional[Iterable[Tuple[float, float, str, float]]] = None,
+        confidence: Optional[Tuple[float, float, float]] = None
+    ) -> int:
+        """
+        Append a segment and return its id.
+
+        ``words`` are ``(start, end, word, probability)`` tuples whose text
+        appears in order in the segment text; words that can't be located
+        are dropped. ``confidence`` is ``(avg_logprob, no_speech_prob,
+        compression_ratio)`` as reported by the decoder.
+        """
+        text = " ".join(text.split())
+        if self._offsets:
+            self._pending.append(" ")
+            self._size += 1
+        self._starts.append(start)
+        self._ends.append(end)
+        self._offsets.append(self._size)
+        self._first_word.append(len(self._word_offsets))
+        if words:
+            cursor = 0
+            for word_start, word_end, word, probability in words:
+                word = " ".join(word.split())
+                position = text.find(word, cursor) if word else -1
+                if position < 0:
+                    continue
+                cursor = position + len(word)
+                self._word_offsets.append(self._size + position)
+                self._word_lengths.append(len(word))
+                self._word_starts.append(word_start)
+                self._word_ends.append(word_end)
+                self._word_probs.append(probability)
+        if confidence is not None or self._avg_logprobs:
+            # Pad rows appended before the first confidence with NaN
+            missing = len(self._offsets) - 1 - len(self._avg_logprobs)
+            avg_logprob, no_speech_prob, compression_ratio = confidence or (_NAN, _NAN, _NAN)
+            for column, value in (
+                (self._avg_logprobs, avg_logprob),
+                (self._no_speech_probs, no_speech_prob),
+                (self._compression_ratios, compression_ratio)
+            ):
+                column.extend([_NAN] * missing)
+                column.append(value)
+        self._pending.append(text)
+        self._size += len(text)
+        return len(self._offsets) - 1
+
+    def extend(self, other: "SegmentTable", begin: int = 0, end: Optional[int] = None) -> None:
+        """Append segments ``begin`` up to ``end`` of another table."""
+        for i in range(begin, len(other) if end is None else end):
+            self.append(
+                other.start(i), other.end(i), other.text(i),
+                other.words(i) or None, other.confidence(i)
+            )
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __bool__(self) -> bool:
+        return len(self._offsets) > 0
+
+    @property
+    def full_text(self) -> str:
+        """All segment text joined by single spaces."""
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending.clear()
+        return self._text
+
+    def _span(self, index: int) -> Tuple[int, int]:
+        begin = self._offsets[index]
+        if index + 1 < len(self._offsets):
+            return begin, self._offsets[index + 1] - 1
+        return begin, self._size
+
+    def text(self, index: int) -> str:
+        """Text of a single segment."""
+        begin, end = self._span(index)
+        return self.full_text[begin:end]
+
+    @property
+    def has_words(self) -> bool:
+        """Whether word timestamps were stored."""
+        return len(self._word_offsets) > 0
+
+    def _word_range(self, index: int) -> range:
+        if index + 1 < len(self._first_word):
+            return range(self._first_word[index], self._first_word[index + 1])
+        return range(self._first_word[index], len(self._word_offsets))
+
+    def words(self, index: int) -> List[Tuple[float, float, str, float]]:
+        """``(start, end, word, probability)`` rows of a single segment."""
+        buffer = self.full_text
+        return [
+            (
+                self._word_starts[w],
+                self._word_ends[w],
+                buffer[self._word_offsets[w]:self._word_offsets[w] + self._word_lengths[w]],
+                self._word_probs[w]
+            )
+            for w in self._word_range(index)
+        ]
+
+    @property
+    def has_confidence(self) -> bool:
+        """Whether decoder confidence was stored."""
+        return len(self._avg_logprobs) > 0
+
+    def confidence(self, index: int) -> Optional[Tuple[float, float, float]]:
+        """``(avg_logprob, no_speech_prob, compression_ratio)`` of a segment."""
+        if index >= len(self._avg_logprobs) or math.isnan(self._avg_logprobs[index]):
+            return None
+        return (
+            self._avg_logprobs[index],
+            self._no_speech_probs[index],
+            self._compression_ratios[index]
+        )
+
+    def __iter__(self) -> Iterator[Tuple[float, float, str]]:
+        """Iterate ``(start, end, text)`` rows without building objects."""
+        buffer = self.full_text
+        offsets = self._offsets
+        count = len(offsets)
+        for i in range(count):
+            end_offset = offsets[i + 1] - 1 if i + 1 < count else self._size
+            yield self._starts[i], self._ends[i], buffer[offsets[i]:end_offset]
+
+    def start(self, index: int) -> float:
+        """Start time of a single segment."""
+        return self._starts[index]
+
+    def end(self, index: int) -> float:
+        """End time of a single segment."""
+        return self._ends[index]
+
+    def truncate(self, count: int) -> None:
+        """Keep only the first ``count`` segments."""
+        if count < len(self._offsets):
+            self.truncate_text(self._offsets[count] - 1 if count else 0)
+
+    def truncate_text(self, length: int) -> None:
+        """Cut the transcript to its first ``length`` characters."""
+        if length >= self._size:
+            return
+        text = self.full_text[:length].rstrip()
+        keep = len(self._offsets)
+        while keep and self._offsets[keep - 1] >= len(text):
+            keep -= 1
+        del self._starts[keep:]
+        del self._ends[keep:]
+        del self._offsets[keep:]
+        del self._first_word[keep:]
+        for column in (self._avg_logprobs, self._no_speech_probs, self._compression_ratios):
+            del column[keep:]
+
+        # Drop words that no longer fit entirely in the buffer
+        keep_words = len(self._word_offsets)
+        while keep_words and (
+            self._word_offsets[keep_words - 1] + self._word_lengths[keep_words - 1] > len(text)
+        ):
+            keep_words -= 1
+        for column in (
+            self._word_offsets, self._word_lengths,
+            self._word_starts, self._word_ends, self._word_probs
+        ):
+            del column[keep_words:]
+
+        self._text = text
+        self._size = len(text)
+
+    def to_dicts(self) -> List[dict]:
+        """Materialize segments as plain dicts (JSON edge)."""
+        rows = [
+            {"id": i, "start": round(start, 2), "end": round(end, 2), "text": text}
+            for i, (start, end, text) in enumerate(self)
+        ]
+        if self.has_words:
+            for i, row in enumerate(rows):
+                row["words"] = [
+                    {
+                        "word": word,
+                        "start": round(start, 2),
+                        "end": round(end, 2),
+                        "probability": round(probability, 3)
+                    }
+                    for start, end, word, probability in self.words(i)
+                ]
+        if self.has_confidence:
+            for i, row in enumerate(rows):
+                confidence = self.confidence(i)
+                if confidence:
+                    row["avg_logprob"] = round(confidence[0], 4)
+                    row["no_speech_prob"] = round(confidence[1], 4)
+                    row["compression_ratio"] = round(confidence[2], 3)
+        return rows
+
+    def to_segments(self) -> list:
+        """Materialize segments as TranscriptSegment models."""
+        from models.schemas import TranscriptSegment
+
+        return [TranscriptSegment(**row) for row in self.to_dicts()]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the table's buffers."""
+        return (
+            self._starts.itemsize * len(self._starts)
+            + self._ends.itemsize * len(self._ends)
+            + self._offsets.itemsize * len(self._offsets)
+            + self._first_word.itemsize * len(self._first_word)
+            + sum(
+                column.itemsize * len(column)
+                for column in (
+                    self._word_offsets, self._word_lengths,
+                    self._word_starts, self._word_ends, self._word_probs,
+                    self._avg_logprobs, self._no_speech_probs, self._compression_ratios
+                )
+            )
+            + self._size
+        )
+
+    # Pydantic integration: accept a table or a list of segments, and
+    # serialize back to a list of segment dicts.
+
+    @classmethod
+    def _validate(cls, value: Any) -> "SegmentTable":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, (list, tuple)):
+            return cls.from_segments(value)
+        raise ValueError("segments must be a SegmentTable or a list of segments")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda table: table.to_dicts()
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema, handler):
+        from models.schemas import TranscriptSegment
+
+        return handler(core_schema.list_schema(TranscriptSegment.__pydantic_core_schema__))
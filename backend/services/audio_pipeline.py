@@ -0,0 +1,374 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterator, Optional, Tuple
+
+import av
+import numpy as np
+
+from services.job_queue import JobCancelled
+
+SAMPLE_RATE = 16000
+
+
+def decode_blocks(audio_path: str, block_seconds: float = 30.0) -> Iterator[np.ndarray]:
+    """
+    Decode and resample an audio/video container to 16 kHz mono float32.
+
+    Yields PCM blocks of roughly ``block_seconds`` instead of one array,
+    so consumers can start before the whole file is decoded.
+    """
+    block_samples = int(block_seconds * SAMPLE_RATE)
+    resampler = av.audio.resampler.AudioResampler(
+        format="s16", layout="mono", rate=SAMPLE_RATE
+    )
+    pending = []
+    pending_samples = 0
+
+    with av.open(audio_path, mode="r", metadata_errors="ignore") as container:
+        frames = container.decode(audio=0)
+        while True:
+            try:
+                frame = next(frames)
+            except StopIteration:
+                frame = None
+            except av.error.InvalidDataError:
+                continue
+
+            if frame is not None:
+                frame.pts = None  # Ignore timestamp check
+            for resampled in resampler.resample(frame):
+                samples = resampled.to_ndarray().reshape(-1)
+                pending.append(samples)
+                pending_samples += len(samples)
+                if pending_samples >= block_samples:
+                    yield np.concatenate(pending).astype(np.float32) / 32768.0
+                    pending, pending_samples = [], 0
+
+            if frame is None:
+                break
+
+    if pending:
+        yield np.concatenate(pending).astype(np.float32) / 32768.0
+
+
+class LiveAudioDecoder:
+    """
+    Converts audio frames streamed by a client to 16 kHz mono float32.
+
+    Accepts raw little-endian PCM (``pcm_s16le``, ``pcm_f32le``) at any
+    rate and channel count, or raw Opus packets (``opus``).
+    """
+
+    FORMATS = ("pcm_s16le", "pcm_f32le", "opus")
+
+    def __init__(self, format: str = "pcm_s16le", sample_rate: int = SAMPLE_RATE, channels: int = 1):
+        if format not in self.FORMATS:
+            raise ValueError(f"Unsupported audio format '{format}'. Available: {', '.join(self.FORMATS)}")
+        if channels not in (1, 2):
+            raise ValueError("Only mono or stereo audio is supported")
+        self.format = format
+        self.sample_rate = int(sample_rate) if format != "opus" else 48000
+        self.channels = channels
+        self._layout = "mono" if channels == 1 else "stereo"
+        self._codec = None
+        if format == "opus":
+            self._codec = av.CodecContext.create("opus", "r")
+            self._codec.sample_rate = self.sample_rate
+            self._codec.layout = self._layout
+        self._resampler = av.audio.resampler.AudioResampler(
+            format="s16", layout="mono", rate=SAMPLE_RATE
+        )
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """Decode one client frame."""
+        if self._codec is not None:
+            frames = self._codec.decode(av.Packet(data))
+        else:
+            dtype = np.int16 if self.format == "pcm_s16le" else np.float32
+            samples = np.frombuffer(data, dtype=dtype)
+            if self.channels == 1 and self.sample_rate == SAMPLE_RATE:
+                # Already in the model's format; skip the resampler
+                if dtype == np.int16:
+                    return samples.astype(np.float32) / 32768.0
+                return samples.astype(np.float32)
+            frame = av.AudioFrame.from_ndarray(
+                samples.reshape(1, -1),
+                format="s16" if dtype == np.int16 else "flt",
+                layout=self._layout
+            )
+            frame.sample_rate = self.sample_rate
+            frames = [frame]
+
+        blocks = [
+            resampled.to_ndarray().reshape(-1)
+            for frame in frames
+            for resampled in self._resampler.resample(frame)
+        ]
+        if not blocks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(blocks).astype(np.float32) / 32768.0
+
+
+class _Preempted(Exception):
+    """Raised inside the decoder to abandon a prefetch for an urgent job."""
+
+
+class PcmStream:
+    """
+    Decoded PCM for one job, delivered block by block.
+
+    The decode stage puts blocks as they are produced; the inference worker
+    reads them all back as one contiguous array.
+    """
+
+    _DONE = object()
+
+    def __init__(self):
+        self._blocks: "queue.Queue" = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._audio: Optional[np.ndarray] = None
+        self.started = False
+        self.urgent = False
+        self.decode_seconds = 0.0
+        self.samples = 0
+
+    @classmethod
+    def ready(cls, audio: np.ndarray) -> "PcmStream":
+        """A stream whose audio is already available (no decode needed)."""
+        stream = cls()
+        stream._audio = audio
+        stream.samples = len(audio)
+        stream.started = True
+        return stream
+
+    def resolve(self, audio: np.ndarray) -> None:
+        """Complete the stream with audio that needed no decoding."""
+        self._audio = audio
+        self.samples = len(audio)
+        self.finish()
+
+    def put(self, block: np.ndarray) -> None:
+        self.samples += len(block)
+        self._blocks.put(block)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self._error = error
+        self._blocks.put(self._DONE)
+
+    def read_all(self, on_block=None) -> np.ndarray:
+        """Block until decoding finishes and return the full waveform."""
+        if self._audio is not None:
+            return self._audio
+        blocks = []
+        while True:
+            block = self._blocks.get()
+            if block is self._DONE:
+                break
+            blocks.append(block)
+            if on_block:
+                on_block()
+        if self._error is not None:
+            raise self._error
+        if self._audio is not None:
+            # Resolved without decoding while we were waiting
+            return self._audio
+        self._audio = (
+            np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+        )
+        return self._audio
+
+    def discard(self, on_block=None) -> None:
+        """Drop any buffered blocks."""
+        while True:
+            try:
+                block = self._blocks.get_nowait()
+            except queue.Empty:
+                return
+            if block is not self._DONE and on_block:
+                on_block()
+
+
+class DecodeStage:
+    """
+    Dedicated decode/resample thread running ahead of model inference.
+
+    Jobs a worker is waiting for are decoded first; otherwise the stage
+    prefetches pending jobs in the order the job queue will serve them, so
+    the next job's decoding overlaps the current job's inference. Buffered
+    audio across all jobs is bounded by ``buffer_blocks`` blocks. A
+    prefetch is abandoned (and redone later) if a worker needs a job that
+    has not been decoded yet, and finished prefetches give their blocks
+    back (to be decoded again) if that job can't get buffer space, since
+    the job queue may serve jobs in a different order than they were
+    prefetched. Cancelled jobs stop decoding at the next block and give
+    their buffered blocks back.
+
+    With a ``cache`` (see pcm_cache), jobs whose content hash is cached
+    are served from the memory-mapped PCM, and fresh decodes are written
+    to the cache as they stream.
+    """
+
+    def __init__(
+        self,
+        job_queue,
+        block_seconds: float = 30.0,
+        buffer_blocks: int = 60,
+        cache=None
+    ):
+        self.job_queue = job_queue
+        self.cache = cache
+        self.block_seconds = block_seconds
+        self._slots = threading.Semaphore(max(1, buffer_blocks))
+        self._cond = threading.Condition()
+        self._urgent: Deque = deque()
+        # Jobs fully prefetched but not yet read, in prefetch order
+        self._prefetched: Deque = deque()
+        self._current = None
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self) -> None:
+        """Wake the decoder (a job was queued)."""
+        with self._cond:
+            self._ensure_thread()
+            self._cond.notify()
+
+    def read(self, job) -> Tuple[np.ndarray, float]:
+        """
+        Return a job's decoded audio and the seconds spent waiting for it.
+        """
+        with self._cond:
+            self._ensure_thread()
+            if job.pcm is None:
+                job.pcm = PcmStream()
+                self._urgent.append(job)
+            # An urgent stream is never abandoned, so it is safe to read
+            job.pcm.urgent = True
+            if job in self._prefetched:
+                self._prefetched.remove(job)
+            stream = job.pcm
+            self._cond.notify()
+        waited = time.perf_counter()
+        audio = stream.read_all(on_block=self._slots.release)
+        return audio, time.perf_counter() - waited
+
+    def drop(self, job) -> None:
+        """Release a cancelled job's buffered audio."""
+        with self._cond:
+            # The decoder drops the job it is working on itself
+            if job is not self._current and job.pcm is not None and not job.pcm.urgent:
+                job.pcm.discard(on_block=self._slots.release)
+                job.pcm = None
+                if job in self._prefetched:
+                    self._prefetched.remove(job)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="audio-decoder", daemon=True
+            )
+            self._thread.start()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while self._urgent:
+                    job = self._urgent.popleft()
+                    if job.pcm is not None and not job.pcm.started:
+                        job.pcm.started = True
+                        self._current = job
+                        return job
+                for job in self.job_queue.snapshot():
+                    if job.pcm is None and not job.cancelled:
+                        job.pcm = PcmStream()
+                        job.pcm.started = True
+                        self._current = job
+                        return job
+                self._cond.wait()
+
+    def _check_preempt(self, job) -> None:
+        # Decided under the lock so a worker can't start reading a stream
+        # that is about to be dropped
+        with self._cond:
+            job.raise_if_cancelled()
+            if self._urgent and not job.pcm.urgent:
+                job.pcm.discard(on_block=self._slots.release)
+                job.pcm = None
+                raise _Preempted()
+
+    def _reclaim(self) -> None:
+        # A worker waits on the job being decoded, but finished prefetches
+        # hold the buffer; drop the latest one, it is decoded again later
+        with self._cond:
+            while self._prefetched:
+                job = self._prefetched.pop()
+                if job.pcm is not None and not job.pcm.urgent:
+                    job.pcm.discard(on_block=self._slots.release)
+                    job.pcm = None
+                    return
+
+    def _cancel(self, job, error: JobCancelled) -> None:
+        with self._cond:
+            self._current = None
+            stream = job.pcm
+            if stream is None:
+                return
+            if stream.urgent:
+                # A worker is waiting on this stream; wake it with the error
+                stream.finish(error=error)
+            else:
+                stream.discard(on_block=self._slots.release)
+                job.pcm = None
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            stream = job.pcm
+            cached = self.cache.get(job.content_hash) if self.cache else None
+            if cached is not None:
+                self._current = None
+                stream.resolve(cached)
+                continue
+
+            writer = (
+                self.cache.writer(job.content_hash)
+                if self.cache and job.content_hash else None
+            )
+            started = time.perf_counter()
+            waited = 0.0
+            try:
+                for block in decode_blocks(job.audio_path, self.block_seconds):
+                    self._check_preempt(job)
+                    wait_start = time.perf_counter()
+                    while not self._slots.acquire(timeout=0.05):
+                        self._check_preempt(job)
+                        if stream.urgent:
+                            self._reclaim()
+                    waited += time.perf_counter() - wait_start
+                    stream.put(block)
+                    if writer:
+                        writer.write(block)
+                if writer:
+                    writer.commit()
+                stream.decode_seconds = time.perf_counter() - started - waited
+                stream.finish()
+                with self._cond:
+                    self._current = None
+                    if not stream.urgent:
+                        self._prefetched.append(job)
+                if job.cancelled:
+                    self.drop(job)
+            except _Preempted:
+                self._current = None
+                if writer:
+                    writer.abort()
+            except JobCancelled as e:
+                if writer:
+                    writer.abort()
+                self._cancel(job, e)
+            except Exception as e:
+                self._current = None
+                if writer:
+                    writer.abort()
+                stream.finish(error=e)
@@ -1,6 +1,9 @@
 import os
 import uuid
+import hashlib
 from pathlib import Path
+from typing import Optional
+import av
 from core.config import settings
 
 class AudioProcessor:
@@ -20,6 +23,25 @@ class AudioProcessor:
         """Generate unique task ID."""
         return str(uuid.uuid4())[:8]
 
+    @staticmethod
+    def content_hash(file_content: bytes) -> str:
+        """SHA-256 of the uploaded bytes (keys caches shared across tasks)."""
+        return hashlib.sha256(file_content).hexdigest()
+
+    @staticmethod
+    def probe_duration(file_path: str) -> Optional[float]:
+        """Read the audio duration from container headers without decoding."""
+        try:
+            with av.open(file_path, metadata_errors="ignore") as container:
+                if container.duration:
+                    return container.duration / av.time_base
+                stream = next(iter(container.streams.audio), None)
+                if stream is not None and stream.duration and stream.time_base:
+                    return float(stream.duration * stream.time_base)
+        except Exception:
+            pass
+        return None
+
     @staticmethod
     def get_upload_path(task_id: str, filename: str) -> Path:
         """Get path for uploaded file."""
@@ -0,0 +1,199 @@
+"""
+Benchmark-driven choice of CPU threads, worker count and compute type.
+
+Run from the backend directory to tune and save the result:
+
+    python -m services.autotune [--objective latency] [--clip-seconds 20]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from core.config import settings, apply_autotune, AUTOTUNED_SETTINGS
+from services.audio_pipeline import SAMPLE_RATE
+
+COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+OBJECTIVES = ("throughput", "latency")
+
+
+def synthetic_clip(seconds: float, seed: int = 0) -> np.ndarray:
+    """
+    Speech-like test signal at 16 kHz.
+
+    Voiced harmonics with a gliding pitch, gated into syllables and words,
+    over light noise. Encoder cost doesn't depend on what is said, and the
+    signal gives VAD and the decoder something speech-shaped to work on.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.sin(2 * np.pi * 4 * t) > -0.3
+    words = np.sin(2 * np.pi * 0.7 * t) > -0.6
+    signal = voice * syllables * words + 0.01 * rng.standard_normal(len(t))
+    return (0.3 * signal / np.abs(signal).max()).astype(np.float32)
+
+
+def candidate_configs(cpu_count: int, compute_types: Iterable[str] = COMPUTE_TYPES) -> List[dict]:
+    """Thread/worker/compute-type combinations that fit the CPU count."""
+    threads = sorted({n for n in (1, 2, 4, 8, 16, cpu_count) if n <= cpu_count})
+    workers = sorted({n for n in (1, 2, 4) if n <= cpu_count})
+    return [
+        {
+            "WHISPER_CPU_THREADS": thread_count,
+            "TRANSCRIPTION_WORKERS": worker_count,
+            "WHISPER_COMPUTE_TYPE": compute_type
+        }
+        for compute_type in compute_types
+        for thread_count in threads
+        for worker_count in workers
+        if thread_count * worker_count <= cpu_count
+    ]
+
+
+def benchmark(config: dict, clip: np.ndarray, model_name: str, runs: int = 1) -> dict:
+    """
+    Measure one configuration.
+
+    Each worker transcribes the clip ``runs`` times concurrently after a
+    warm-up pass. Throughput is audio seconds per wall second across all
+    workers; latency is the mean time to transcribe one clip.
+    """
+    from faster_whisper import WhisperModel
+
+    workers = config["TRANSCRIPTION_WORKERS"]
+    model = WhisperModel(
+        model_name,
+        device="cpu",
+        compute_type=config["WHISPER_COMPUTE_TYPE"],
+        cpu_threads=config["WHISPER_CPU_THREADS"],
+        num_workers=workers
+    )
+    options = dict(settings.DECODE_PROFILES[settings.DEFAULT_DECODE_PROFILE])
+    options.pop("vad_parameters", None)
+
+    def run(_=None) -> float:
+        started = time.perf_counter()
+        segments, _ = model.transcribe(clip, language="en", vad_filter=False, **options)
+        for _ in segments:  # Decoding happens while iterating
+            pass
+        return time.perf_counter() - started
+
+    run()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(run, range(workers * runs)))
+    wall = time.perf_counter() - started
+    audio_seconds = len(clip) / SAMPLE_RATE * len(latencies)
+    return {
+        **config,
+        "throughput": round(audio_seconds / wall, 3),
+        "latency": round(sum(latencies) / len(latencies), 3)
+    }
+
+
+def choose(results: List[dict], objective: str) -> dict:
+    """Best measured configuration for an objective."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}'. Available: {', '.join(OBJECTIVES)}")
+    if objective == "latency":
+        return min(results, key=lambda r: r["latency"])
+    return max(results, key=lambda r: r["throughput"])
+
+
+def autotune(
+    objective: str = "throughput",
+    model_name: Optional[str] = None,
+    clip_seconds: float = 20.0,
+    compute_types: Iterable[str] = COMPUTE_TYPES,
+    measure: Callable = benchmark
+) -> dict:
+    """Benchmark every candidate configuration and pick the best."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}'. Available: {', '.join(OBJECTIVES)}")
+    model_name = model_name or settings.WHISPER_MODEL
+    cpu_count = os.cpu_count() or 1
+    clip = synthetic_clip(clip_seconds)
+
+    results = []
+    for config in candidate_configs(cpu_count, compute_types):
+        try:
+            result = measure(config, clip, model_name)
+        except (ValueError, RuntimeError) as e:
+            # e.g. a compute type this CPU doesn't support
+            print(f"Skipping {config}: {e}")
+            continue
+        print(
+            f"threads={result['WHISPER_CPU_THREADS']:<3} "
+            f"workers={result['TRANSCRIPTION_WORKERS']:<2} "
+            f"compute={result['WHISPER_COMPUTE_TYPE']:<13} "
+            f"throughput={result['throughput']:<8} latency={result['latency']}s"
+        )
+        results.append(result)
+    if not results:
+        raise RuntimeError("No configuration could be benchmarked")
+
+    best = choose(results, objective)
+    return {
+        "model": model_name,
+        "cpu_count": cpu_count,
+        "objective": objective,
+        "clip_seconds": clip_seconds,
+        "config": {key: best[key] for key in AUTOTUNED_SETTINGS},
+        "results": results
+    }
+
+
+def save(tuned: dict, path: Path) -> None:
+    """Write an autotune result, replacing any previous one atomically."""
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(tuned, indent=2))
+    os.replace(tmp, path)
+
+
+def ensure_tuned() -> None:
+    """Tune at startup if enabled and no usable saved result exists."""
+    if not settings.AUTOTUNE_ON_STARTUP or apply_autotune(settings) is not None:
+        return
+    print(f"Autotuning for {settings.AUTOTUNE_OBJECTIVE} (AUTOTUNE_ON_STARTUP)...")
+    tuned = autotune(
+        settings.AUTOTUNE_OBJECTIVE,
+        clip_seconds=settings.AUTOTUNE_CLIP_SECONDS
+    )
+    save(tuned, settings.AUTOTUNE_FILE)
+    apply_autotune(settings)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark and save the best Whisper CPU settings.")
+    parser.add_argument("--objective", choices=OBJECTIVES, default=settings.AUTOTUNE_OBJECTIVE)
+    parser.add_argument("--model", default=settings.WHISPER_MODEL)
+    parser.add_argument("--clip-seconds", type=float, default=settings.AUTOTUNE_CLIP_SECONDS)
+    parser.add_argument(
+        "--compute-types", default=",".join(COMPUTE_TYPES),
+        help="comma-separated compute types to try"
+    )
+    parser.add_argument("--output", type=Path, default=settings.AUTOTUNE_FILE)
+    args = parser.parse_args(argv)
+
+    tuned = autotune(
+        args.objective,
+        args.model,
+        args.clip_seconds,
+        [c.strip() for c in args.compute_types.split(",") if c.strip()]
+    )
+    save(tuned, args.output)
+    print(f"Best for {args.objective}: {tuned['config']}")
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
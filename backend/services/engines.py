@@ -0,0 +1,197 @@
+"""
+Speech recognition engines behind WhisperService.
+
+An engine turns 16 kHz mono float32 audio into a lazily decoded stream of
+segments plus an info object, in the shape faster-whisper uses: segments
+have ``start``, ``end``, ``text``, ``words`` (each with ``start``, ``end``,
+``word``, ``probability``), ``avg_logprob``, ``no_speech_prob`` and
+``compression_ratio``; info has ``language``, ``language_probability``
+and ``duration``. ``ASR_ENGINE`` selects the engine by name.
+"""
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from services.audio_pipeline import SAMPLE_RATE
+
+
+class AsrEngine(ABC):
+    """Interface every engine implements."""
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, **options) -> Tuple[Iterator, object]:
+        """Decode audio sequentially; options are faster-whisper's."""
+
+    @abstractmethod
+    def transcribe_batched(self, audio: np.ndarray, batch_size: int, **options) -> Tuple[Iterator, object]:
+        """Decode independent chunks of audio in batches."""
+
+    @abstractmethod
+    def detect_language(
+        self,
+        audio: np.ndarray,
+        language_detection_segments: int = 1
+    ) -> Tuple[str, float, List[Tuple[str, float]]]:
+        """Return (language, probability, all language probabilities)."""
+
+
+ENGINES: Dict[str, Callable[[str], AsrEngine]] = {}
+
+
+def register_engine(name: str):
+    """Class decorator making an engine selectable as ``ASR_ENGINE=name``."""
+    def register(cls):
+        ENGINES[name] = cls
+        return cls
+    return register
+
+
+def create_engine(model_name: Optional[str] = None) -> AsrEngine:
+    """Build the configured engine for a model (default WHISPER_MODEL)."""
+    name = settings.ASR_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown ASR engine '{name}'. Available: {', '.join(ENGINES)}")
+    return ENGINES[name](model_name or settings.WHISPER_MODEL)
+
+
+@register_engine("faster-whisper")
+class FasterWhisperEngine(AsrEngine):
+    """CTranslate2 Whisper models via faster-whisper."""
+
+    def __init__(self, model_name: str):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_name,
+            device=settings.WHISPER_DEVICE,
+            compute_type=settings.WHISPER_COMPUTE_TYPE,
+            cpu_threads=settings.WHISPER_CPU_THREADS,
+            # One model replica per queue worker so they decode in parallel
+            num_workers=settings.TRANSCRIPTION_WORKERS
+        )
+        self._pipeline = None
+
+    def transcribe(self, audio, **options):
+        return self.model.transcribe(audio, **options)
+
+    def transcribe_batched(self, audio, batch_size, **options):
+        if self._pipeline is None:
+            from faster_whisper import BatchedInferencePipeline
+
+            self._pipeline = BatchedInferencePipeline(model=self.model)
+        return self._pipeline.transcribe(audio, batch_size=batch_size, **options)
+
+    def detect_language(self, audio, language_detection_segments=1):
+        return self.model.detect_language(
+            audio, language_detection_segments=language_detection_segments
+        )
+
+
+@dataclass
+class FakeWord:
+    start: float
+    end: float
+    word: str
+    probability: float
+
+
+@dataclass
+class FakeSegment:
+    start: float
+    end: float
+    text: str
+    words: Optional[List[FakeWord]]
+    avg_logprob: float
+    no_speech_prob: float
+    compression_ratio: float
+
+
+@dataclass
+class FakeInfo:
+    language: str
+    language_probability: float
+    duration: float
+
+
+_VOCABULARY = (
+    "the quick brown fox jumps over a lazy dog while seven bright stars "
+    "watch quiet rivers carry amber leaves past old stone bridges toward "
+    "distant hills where morning fog slowly lifts"
+).split()
+
+
+@register_engine("fake")
+class FakeEngine(AsrEngine):
+    """
+    Deterministic engine for benchmarks and tests.
+
+    Emits one segment every ``segment_seconds`` of audio (or of each
+    ``clip_timestamps`` clip) with text derived from the segment's
+    position, and sleeps ``rtf`` seconds per audio second as segments are
+    consumed, so the rest of the pipeline can be measured without model
+    compute.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "fake",
+        rtf: Optional[float] = None,
+        segment_seconds: Optional[float] = None,
+        language: Optional[str] = None
+    ):
+        self.model_name = model_name
+        self.rtf = settings.FAKE_ENGINE_RTF if rtf is None else rtf
+        self.segment_seconds = segment_seconds or settings.FAKE_ENGINE_SEGMENT_SECONDS
+        self.language = language or settings.FAKE_ENGINE_LANGUAGE
+
+    def transcribe(self, audio, language=None, word_timestamps=False, clip_timestamps=None, **options):
+        duration = len(audio) / SAMPLE_RATE
+        if isinstance(clip_timestamps, list) and clip_timestamps:
+            spans = [(clip["start"], clip["end"]) for clip in clip_timestamps]
+        else:
+            spans = [(0.0, duration)]
+        info = FakeInfo(language or self.language, 1.0, duration)
+        return self._segments(spans, word_timestamps), info
+
+    def transcribe_batched(self, audio, batch_size, **options):
+        return self.transcribe(audio, **options)
+
+    def detect_language(self, audio, language_detection_segments=1):
+        return self.language, 1.0, [(self.language, 1.0)]
+
+    def _segments(self, spans: List[Tuple[float, float]], word_timestamps: bool) -> Iterator[FakeSegment]:
+        for span_start, span_end in spans:
+            start = span_start
+            while span_end - start >= 0.05:
+                end = min(start + self.segment_seconds, span_end)
+                if self.rtf:
+                    time.sleep((end - start) * self.rtf)
+                yield self._segment(start, end, word_timestamps)
+                start = end
+
+    def _segment(self, start: float, end: float, word_timestamps: bool) -> FakeSegment:
+        # Two words per second, drawn from a generator seeded by position so
+        # reruns match; a periodic pattern would trip repetition detection
+        count = max(1, int((end - start) * 2))
+        rng = random.Random(int(start * 1000))
+        words = [rng.choice(_VOCABULARY) for _ in range(count)]
+        words[0] = words[0].capitalize()
+        words[-1] += "."
+        step = (end - start) / count
+        return FakeSegment(
+            start=round(start, 3),
+            end=round(end, 3),
+            text=" " + " ".join(words),
+            words=[
+                FakeWord(round(start + k * step, 3), round(start + (k + 1) * step, 3), " " + word, 0.9)
+                for k, word in enumerate(words)
+            ] if word_timestamps else None,
+            avg_logprob=-0.2,
+            no_speech_prob=0.01,
+            compression_ratio=1.4
+        )
@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """Raised when a job is cancelled while queued or running."""
+
+
+@dataclass
+class TranscriptionJob:
+    """A queued transcription request."""
+    task_id: str
+    audio_path: str
+    profile: Optional[str] = None
+    # Upload content hash; keys the decoded-PCM cache
+    content_hash: Optional[str] = None
+    # Language hint; skips language detection when set
+    language: Optional[str] = None
+    # Word-level timestamps cost an extra alignment pass, so are opt-in
+    word_timestamps: bool = False
+    # Scheduling class (see Settings.PRIORITY_CLASSES) and the audio
+    # duration probed from the container header, if known
+    priority: Optional[str] = None
+    duration: Optional[float] = None
+    # Segments journaled before a restart; decoding resumes after them
+    resume_segments: Optional[Any] = None
+    # Two-pass mode: a draft job decodes with the small draft model; a
+    # refine job re-decodes refine_segments (the draft) window by window
+    # and publishes each step through on_refined
+    draft: bool = False
+    refine_segments: Optional[Any] = None
+    on_refined: Optional[Callable] = None
+    # Adaptive mode: re-decode low-confidence segments after the first pass
+    adaptive: bool = False
+    progress_callback: Optional[Callable] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    first_segment_at: Optional[float] = None
+    # Ident of the worker thread holding the job
+    worker_thread: Optional[int] = None
+    # Decoded audio, filled in by the decode stage (see audio_pipeline)
+    pcm: Optional[Any] = None
+    # Per-stage durations in seconds
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Set by JobQueue.cancel; checked between decoded blocks and segments
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Task {self.task_id} was cancelled")
+
+    @property
+    def batch_key(self):
+        """Jobs with equal keys may be decoded in one batch."""
+        if (self.resume_segments is not None or self.refine_segments is not None
+                or self.draft or self.adaptive):
+            # These need their own sequential path; never batch
+            return self.task_id
+        return self.profile, self.word_timestamps
+
+
+class JobQueue:
+    """
+    Priority queue of transcription jobs served by dedicated worker threads.
+
+    Jobs are served shortest-job-first within priority classes. A job's
+    score is its class penalty plus its audio duration, minus
+    ``aging_rate`` seconds for every second it has waited; the lowest
+    score goes next, so long or low-priority jobs can't starve. Jobs of
+    unknown duration count as ``unknown_duration`` seconds, and jobs with
+    equal scores keep FIFO order.
+
+    The handler receives a list of jobs (usually one) and returns one
+    result per job. When ``max_batch`` is above one, a worker takes up to
+    that many pending jobs sharing the head job's batch key.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[TranscriptionJob]], list],
+        workers: int = 1,
+        max_batch: int = 1,
+        on_submit: Optional[Callable[[], None]] = None,
+        class_penalties: Optional[Dict[str, float]] = None,
+        aging_rate: float = 1.0,
+        unknown_duration: float = 600.0
+    ):
+        self.handler = handler
+        self.on_submit = on_submit
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.class_penalties = class_penalties or {}
+        self.aging_rate = aging_rate
+        self.unknown_duration = unknown_duration
+        self._pending: Deque[TranscriptionJob] = deque()
+        # task_id -> job currently held by a worker
+        self._running: Dict[str, TranscriptionJob] = {}
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, job: TranscriptionJob) -> Future:
+        """Queue a job and return a future for its result."""
+        with self._cond:
+            self._ensure_workers()
+            self._pending.append(job)
+            self._cond.notify()
+        if self.on_submit:
+            self.on_submit()
+        return job.future
+
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._cond:
+            return len(self._pending)
+
+    def snapshot(self) -> List[TranscriptionJob]:
+        """Pending jobs in the order workers will take them."""
+        with self._cond:
+            return self._ordered(time.time())
+
+    def running(self) -> List[TranscriptionJob]:
+        """Jobs currently held by workers."""
+        with self._cond:
+            return list(self._running.values())
+
+    def _score(self, job: TranscriptionJob, now: float) -> float:
+        duration = job.duration if job.duration is not None else self.unknown_duration
+        waited = now - job.enqueued_at
+        return self.class_penalties.get(job.priority, 0.0) + duration - self.aging_rate * waited
+
+    def _ordered(self, now: float) -> List[TranscriptionJob]:
+        # sorted() is stable, so equal scores stay in arrival order
+        return sorted(self._pending, key=lambda job: self._score(job, now))
+
+    def cancel(self, task_id: str) -> Optional[TranscriptionJob]:
+        """
+        Cancel a queued or running job and return it (None if unknown).
+
+        A queued job is removed at once and its future fails with
+        JobCancelled; a running job is flagged and stops at its handler's
+        next cancellation check.
+        """
+        with self._cond:
+            for job in self._pending:
+                if job.task_id == task_id:
+                    self._pending.remove(job)
+                    job.cancel_event.set()
+                    job.future.set_exception(JobCancelled(f"Task {task_id} was cancelled"))
+                    return job
+            job = self._running.get(task_id)
+            if job is not None:
+                job.cancel_event.set()
+            return job
+
+    def _ensure_workers(self) -> None:
+        # Workers start lazily so importing the service stays cheap
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"transcription-worker-{len(self._threads)}",
+                daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_batch(self) -> List[TranscriptionJob]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            now = time.time()
+            ordered = self._ordered(now)
+            head = ordered[0]
+            batch = [head]
+            if self.max_batch > 1:
+                for job in ordered[1:]:
+                    if len(batch) >= self.max_batch:
+                        break
+                    if job.batch_key == head.batch_key:
+                        batch.append(job)
+            for job in batch:
+                self._pending.remove(job)
+                job.started_at = now
+                job.worker_thread = threading.get_ident()
+                self._running[job.task_id] = job
+            return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.handler(batch)
+                for job, result in zip(batch, results):
+                    job.future.set_result(result)
+            except Exception as e:
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+            finally:
+                with self._cond:
+                    for job in batch:
+                        self._running.pop(job.task_id, None)
@@ -0,0 +1,193 @@
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from models.segments import SegmentTable
+from services.audio_pipeline import SAMPLE_RATE
+
+# (start, end, word, probability), times in seconds since the session began
+Word = Tuple[float, float, str, float]
+
+SENTENCE_END = (".", "?", "!")
+
+
+def _same_word(a: Word, b: Word) -> bool:
+    return a[2].strip().lower() == b[2].strip().lower()
+
+
+class LiveTranscriber:
+    """
+    Incremental transcription of a live audio stream.
+
+    Audio accumulates in a sliding window that is re-decoded each time
+    ``min_chunk_seconds`` of new audio has arrived. Words are finalized
+    with a local-agreement policy: a word is committed once two
+    consecutive decodes of the window agree on it (as a common prefix of
+    the uncommitted words). The window is then trimmed to start at the
+    last committed word, and the committed text is fed back as the prompt.
+
+    Committed words are grouped into finalized segments at sentence ends
+    or every ``max_segment_seconds``; everything after that is reported as
+    a provisional caption that may still change.
+    """
+
+    def __init__(
+        self,
+        model,
+        language: Optional[str] = None,
+        options: Optional[dict] = None,
+        min_chunk_seconds: float = 1.0,
+        buffer_seconds: float = 15.0,
+        max_segment_seconds: float = 10.0
+    ):
+        self.model = model
+        self.language = language
+        self.options = options or {}
+        self.min_chunk_seconds = min_chunk_seconds
+        self.buffer_seconds = buffer_seconds
+        self.max_segment_seconds = max_segment_seconds
+        self.segments = SegmentTable()
+        # Seconds of audio received, and seconds spent decoding it
+        self.duration = 0.0
+        self.busy_seconds = 0.0
+        self._audio = np.zeros(0, dtype=np.float32)
+        # Session time of the window's first sample
+        self._offset = 0.0
+        self._unprocessed = 0
+        # Words of the last decode not yet agreed on
+        self._hypothesis: List[Word] = []
+        # Committed words not yet grouped into a finalized segment
+        self._pending: List[Word] = []
+        self._committed: List[Word] = []
+        self._committed_end = 0.0
+
+    def insert_audio(self, samples: np.ndarray) -> None:
+        """Append 16 kHz mono float32 samples."""
+        if len(samples):
+            self._audio = np.concatenate([self._audio, samples])
+            self._unprocessed += len(samples)
+            self.duration += len(samples) / SAMPLE_RATE
+
+    @property
+    def ready(self) -> bool:
+        """Whether enough new audio has arrived to decode again."""
+        return self._unprocessed >= self.min_chunk_seconds * SAMPLE_RATE
+
+    def process(self) -> Tuple[List[int], Optional[Tuple[float, float, str]]]:
+        """
+        Decode the window once.
+
+        Returns the ids of newly finalized segments and the provisional
+        ``(start, end, text)`` caption, if any.
+        """
+        words = self._decode()
+        self._pending.extend(self._agree(words))
+        finalized = self._flush(force=False)
+        self._trim()
+        return finalized, self.provisional()
+
+    def finish(self, decode: bool = True) -> List[int]:
+        """
+        End the session: decode leftover audio, then commit and finalize
+        every remaining word. Returns the ids of the finalized segments.
+        """
+        if decode and self._unprocessed:
+            self._hypothesis = self._decode()
+        self._commit(self._hypothesis)
+        self._pending.extend(self._hypothesis)
+        self._hypothesis = []
+        return self._flush(force=True)
+
+    def provisional(self) -> Optional[Tuple[float, float, str]]:
+        """Caption for the audio that has not been finalized yet."""
+        words = self._pending + self._hypothesis
+        if not words:
+            return None
+        return words[0][0], words[-1][1], " ".join(w[2].strip() for w in words)
+
+    def _prompt(self) -> Optional[str]:
+        text = " ".join(w[2].strip() for w in self._committed[-40:])
+        return text or None
+
+    def _decode(self) -> List[Word]:
+        self._unprocessed = 0
+        started = time.perf_counter()
+        segments, info = self.model.transcribe(
+            self._audio,
+            language=self.language,
+            initial_prompt=self._prompt(),
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            vad_filter=False,
+            **self.options
+        )
+        words = [
+            (w.start + self._offset, w.end + self._offset, w.word, w.probability)
+            for segment in segments
+            for w in (segment.words or [])
+        ]
+        self.busy_seconds += time.perf_counter() - started
+        if words and self.language is None:
+            # Keep the language stable once speech has been heard
+            self.language = info.language
+
+        # Words the window still covers but that were already committed
+        words = [w for w in words if w[0] >= self._committed_end - 0.1]
+        for n in range(min(5, len(self._committed), len(words)), 0, -1):
+            if all(_same_word(a, b) for a, b in zip(self._committed[-n:], words[:n])):
+                words = words[n:]
+                break
+        return words
+
+    def _agree(self, words: List[Word]) -> List[Word]:
+        agreed = 0
+        for new, old in zip(words, self._hypothesis):
+            if not _same_word(new, old):
+                break
+            agreed += 1
+        self._hypothesis = words[agreed:]
+        committed = words[:agreed]
+        self._commit(committed)
+        return committed
+
+    def _commit(self, words: List[Word]) -> None:
+        if words:
+            self._committed.extend(words)
+            del self._committed[:-40]
+            self._committed_end = words[-1][1]
+
+    def _flush(self, force: bool) -> List[int]:
+        finalized = []
+        begin = 0
+        for i, word in enumerate(self._pending):
+            too_long = word[1] - self._pending[begin][0] >= self.max_segment_seconds
+            if word[2].strip().endswith(SENTENCE_END) or too_long:
+                finalized.append(self._append(self._pending[begin:i + 1]))
+                begin = i + 1
+        if force and begin < len(self._pending):
+            finalized.append(self._append(self._pending[begin:]))
+            begin = len(self._pending)
+        del self._pending[:begin]
+        return finalized
+
+    def _append(self, words: List[Word]) -> int:
+        return self.segments.append(
+            round(words[0][0], 2),
+            round(words[-1][1], 2),
+            " ".join(w[2].strip() for w in words),
+            [(round(w[0], 2), round(w[1], 2), w[2], w[3]) for w in words]
+        )
+
+    def _trim(self) -> None:
+        window = len(self._audio) / SAMPLE_RATE
+        if window <= self.buffer_seconds:
+            return
+        cut = self._committed_end - self._offset
+        if cut <= 0 and window > 2 * self.buffer_seconds:
+            # Nothing agreed for a long time; drop the oldest audio
+            cut = window - self.buffer_seconds
+            self._hypothesis = []
+        if cut > 0:
+            self._audio = self._audio[int(cut * SAMPLE_RATE):]
+            self._offset += cut
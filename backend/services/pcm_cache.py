@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+class PcmCacheWriter:
+    """Streams decoded blocks into a cache entry; visible only after commit."""
+
+    def __init__(self, cache: "PcmCache", key: str):
+        self.cache = cache
+        self.key = key
+        self._tmp_path = cache.path_for(key).with_suffix(".tmp")
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, block: np.ndarray) -> None:
+        self._file.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+
+    def commit(self) -> None:
+        self._file.close()
+        self.cache._commit(self.key, self._tmp_path)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+class PcmCache:
+    """
+    Size-capped on-disk cache of decoded 16 kHz mono float32 PCM.
+
+    Entries are raw float32 files keyed by the upload's content hash and
+    are returned as read-only memory maps, so every reader (re-runs,
+    parallel chunk workers) shares the same pages without copying.
+    Least recently used entries are evicted once the cache exceeds
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        files = sorted(self.directory.glob("*.pcm"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            self._entries[path.stem] = path.stat().st_size
+        for path in self.directory.glob("*.tmp"):
+            path.unlink(missing_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.pcm"
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return sum(self._entries.values())
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Optional[str]) -> Optional[np.ndarray]:
+        """Return a read-only memory map of the cached PCM, or None."""
+        if not key:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            if path.stat().st_size == 0:
+                return np.zeros(0, dtype=np.float32)
+            return np.memmap(path, dtype=np.float32, mode="r")
+        except OSError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+    def writer(self, key: str) -> PcmCacheWriter:
+        return PcmCacheWriter(self, key)
+
+    def _commit(self, key: str, tmp_path: Path) -> None:
+        path = self.path_for(key)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[key] = path.stat().st_size
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self) -> None:
+        total = sum(self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            total -= size
+            try:
+                # Existing memory maps stay valid after unlink on POSIX
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
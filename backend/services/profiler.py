@@ -0,0 +1,218 @@
+"""
+On-demand profiling of the running server.
+
+A session samples the Python stack of every thread (or of a chosen set)
+at a fixed interval and, optionally, traces allocations with tracemalloc.
+Nothing is installed until a session starts and everything is removed
+when it ends, so the server pays nothing while no session is running.
+
+Each session writes to ``<directory>/<profile_id>``:
+
+- ``cpu.collapsed``: folded stacks, one ``thread;frame;...;leaf count``
+  line per distinct stack, for flamegraph.pl, speedscope or inferno
+- ``memory.txt``: the largest allocation sites grown during the session
+- ``memory.tracemalloc``: the raw snapshot, see ``tracemalloc.Snapshot.load``
+- ``profile.json``: session metadata
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+# Frames kept per traceback while tracing allocations
+TRACEMALLOC_FRAMES = 25
+TOP_ALLOCATIONS = 50
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the folded format
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(";", ":")
+
+
+def fold_stack(frame, thread_name: str) -> str:
+    """A thread's current stack as one folded line, root first."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name.replace(";", ":").replace(" ", "_"))
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """One bounded profiling window, run on its own sampler thread."""
+
+    def __init__(
+        self,
+        directory: Path,
+        seconds: float,
+        interval: float,
+        memory: bool,
+        task_id: Optional[str] = None,
+        threads: Optional[Callable[[], Set[int]]] = None,
+        until: Optional[Callable[[], bool]] = None
+    ):
+        self.profile_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.directory = Path(directory) / self.profile_id
+        self.seconds = seconds
+        self.interval = interval
+        self.memory = memory
+        self.task_id = task_id
+        # Thread ids to sample (None samples every thread), and a
+        # condition that ends the session early, e.g. its task finishing
+        self.threads = threads
+        self.until = until
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.status = "running"
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+
+    def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        self._baseline = tracemalloc.take_snapshot() if self.memory else None
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """End the session early; results are still written."""
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            deadline = time.monotonic() + self.seconds
+            own = threading.get_ident()
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                if self.until is not None and self.until():
+                    break
+                self._sample(own)
+                self._stop.wait(self.interval)
+            self._write()
+            self.status = "finished"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+            self.finished_at = datetime.now()
+
+    def _sample(self, own: int) -> None:
+        wanted = self.threads() if self.threads is not None else None
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (wanted is not None and ident not in wanted):
+                continue
+            self.stacks[fold_stack(frame, names.get(ident, f"thread-{ident}"))] += 1
+        self.samples += 1
+
+    def _write(self) -> None:
+        with open(self.directory / "cpu.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            snapshot.dump(str(self.directory / "memory.tracemalloc"))
+            growth = snapshot.compare_to(self._baseline, "traceback")
+            with open(self.directory / "memory.txt", "w", encoding="utf-8") as f:
+                current, peak = tracemalloc.get_traced_memory()
+                f.write(f"Traced memory: current {current} B, peak {peak} B\n\n")
+                for stat in growth[:TOP_ALLOCATIONS]:
+                    f.write(f"{stat.size_diff:+d} B ({stat.count_diff:+d} blocks), now {stat.size} B\n")
+                    for line in stat.traceback.format():
+                        f.write(f"  {line}\n")
+                    f.write("\n")
+
+        (self.directory / "profile.json").write_text(json.dumps(self.info(), indent=2))
+
+    def info(self) -> dict:
+        files = sorted(p.name for p in self.directory.iterdir()) if self.directory.exists() else []
+        return {
+            "profile_id": self.profile_id,
+            "status": self.status,
+            "task_id": self.task_id,
+            "seconds": self.seconds,
+            "interval_ms": round(self.interval * 1000, 3),
+            "memory": self.memory,
+            "samples": self.samples,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "files": files
+        }
+
+
+class Profiler:
+    """Runs at most one profiling session at a time and remembers past ones."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self.current: Optional[ProfileSession] = None
+        self.sessions: Dict[str, ProfileSession] = {}
+
+    def start(self, **options) -> ProfileSession:
+        """Start a session; raises RuntimeError if one is already running."""
+        with self._lock:
+            if self.current is not None and self.current.status == "running":
+                raise RuntimeError(f"Profile {self.current.profile_id} is still running")
+            session = ProfileSession(self.directory, **options)
+            session.start()
+            self.current = session
+            self.sessions[session.profile_id] = session
+            return session
+
+    def stop(self) -> Optional[ProfileSession]:
+        with self._lock:
+            session = self.current
+        if session is not None:
+            session.stop()
+        return session
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        """Session info, including sessions from before a restart."""
+        session = self.sessions.get(profile_id)
+        if session is not None:
+            return session.info()
+        path = self.directory / profile_id / "profile.json"
+        if "/" in profile_id or ".." in profile_id or not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def file(self, profile_id: str, name: str) -> Optional[Path]:
+        """Path of one output file, guarded against escaping the directory."""
+        if any(part in ("", ".", "..") or "/" in part or "\\" in part for part in (profile_id, name)):
+            return None
+        path = self.directory / profile_id / name
+        return path if path.is_file() else None
+
+    def list(self) -> List[dict]:
+        if not self.directory.exists():
+            return []
+        return [
+            info for info in (self.get(p.name) for p in sorted(self.directory.iterdir()))
+            if info is not None
+        ]
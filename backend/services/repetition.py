@@ -0,0 +1,131 @@
+"""
+Repetition-loop detection for streaming transcripts.
+"""
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Polynomial rolling hash parameters
+_BASE = 1_000_003
+_MOD = (1 << 61) - 1
+
+
+class RepetitionDetector:
+    """
+    Incremental detector for Whisper repetition loops.
+
+    Segments are fed as they are decoded. Words enter a sliding window,
+    and a rolling hash over the last ``ngram`` words counts every n-gram
+    in the window; an n-gram seen ``max_repeats`` times, or window text
+    that compresses better than ``compression_ratio``, means the decoder
+    is looping. Each word costs O(1) work apart from the occasional
+    compression check.
+    """
+
+    def __init__(
+        self,
+        ngram: int = 4,
+        max_repeats: int = 4,
+        window_words: int = 80,
+        compression_ratio: float = 3.0,
+        min_compression_chars: int = 200
+    ):
+        self.ngram = max(1, ngram)
+        self.max_repeats = max(2, max_repeats)
+        self.window_words = max(window_words, self.ngram * self.max_repeats)
+        self.compression_ratio = compression_ratio
+        self.min_compression_chars = min_compression_chars
+        self._power = pow(_BASE, self.ngram - 1, _MOD)
+        # (word, word hash, segment index) for words in the window
+        self._words: Deque[tuple] = deque()
+        self._chars = 0
+        # n-gram hash -> segment indexes of its occurrences in the window
+        self._ngrams: Dict[int, Deque[int]] = {}
+        # n-gram hash ending at each window word (None until ngram words)
+        self._ngram_at: Deque[Optional[int]] = deque()
+        self._hash = 0
+        self._seen = 0
+
+    def feed(self, text: str, segment: int) -> Optional[int]:
+        """
+        Add a decoded segment's text.
+
+        Returns the index of the segment where a detected loop starts (the
+        second occurrence of the repeated text), or None.
+        """
+        loop_start = None
+        for word in text.lower().split():
+            start = self._push(word, segment)
+            if start is not None and loop_start is None:
+                loop_start = start
+        if loop_start is None and self._is_compressible():
+            loop_start = self._most_repeated_start(segment)
+        return loop_start
+
+    def _push(self, word: str, segment: int) -> Optional[int]:
+        word_hash = hash(word) % _MOD
+        if self._seen >= self.ngram:
+            # Roll the oldest word of the current n-gram out of the hash
+            outgoing = self._words[-self.ngram][1]
+            self._hash = (self._hash - outgoing * self._power) % _MOD
+        self._hash = (self._hash * _BASE + word_hash) % _MOD
+        self._seen += 1
+
+        self._words.append((word, word_hash, segment))
+        self._chars += len(word) + 1
+        ngram_hash = self._hash if self._seen >= self.ngram else None
+        self._ngram_at.append(ngram_hash)
+
+        loop_start = None
+        if ngram_hash is not None:
+            occurrences = self._ngrams.setdefault(ngram_hash, deque())
+            occurrences.append(segment)
+            if len(occurrences) >= self.max_repeats:
+                loop_start = occurrences[1]
+
+        if len(self._words) > self.window_words:
+            self._evict()
+        return loop_start
+
+    def _evict(self) -> None:
+        word, _, _ = self._words.popleft()
+        self._chars -= len(word) + 1
+        ngram_hash = self._ngram_at.popleft()
+        if ngram_hash is not None:
+            occurrences = self._ngrams[ngram_hash]
+            occurrences.popleft()
+            if not occurrences:
+                del self._ngrams[ngram_hash]
+
+    def _is_compressible(self) -> bool:
+        if self._chars < self.min_compression_chars:
+            return False
+        data = " ".join(word for word, _, _ in self._words).encode("utf-8")
+        return len(data) / len(zlib.compress(data)) > self.compression_ratio
+
+    def _most_repeated_start(self, segment: int) -> int:
+        occurrences = max(self._ngrams.values(), key=len, default=None)
+        if occurrences is None or len(occurrences) < 2:
+            return segment
+        return occurrences[1]
+
+
+def trailing_repeat_cut(words: List[str], min_len: int = 3, max_len: int = 7) -> int:
+    """
+    Number of leading words to keep once repeated trailing phrases go.
+
+    A phrase of ``min_len`` to ``max_len`` words that immediately repeats
+    the phrase before it at the end of the transcript is dropped, again
+    and again, in a single backward pass over the removed words.
+    """
+    keep = len(words)
+    if keep <= 10:
+        return keep
+    changed = True
+    while changed:
+        changed = False
+        for n in range(min_len, max_len + 1):
+            if keep >= n * 3 and words[keep - n:keep] == words[keep - 2 * n:keep - n]:
+                keep -= n
+                changed = True
+    return keep
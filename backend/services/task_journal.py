@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Tuple
+
+from models.segments import SegmentTable
+
+
+class TaskJournal:
+    """
+    Durable per-task log of decoded segments.
+
+    Each task gets a JSON-lines file: a header with everything needed to
+    queue the task again, then one line per decoded segment, flushed to
+    disk as it is produced. The file is removed when the task ends
+    normally, so any journal left on startup belongs to a task that was
+    interrupted by a crash or restart.
+
+    Each file has its own lock, so parallel tasks don't wait on each
+    other's fsyncs.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Guards _files; each task's writes hold that task's own lock
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[IO, threading.Lock]] = {}
+
+    def path_for(self, task_id: str) -> Path:
+        return self.directory / f"{task_id}.jsonl"
+
+    def start(self, task_id: str, **header) -> None:
+        """Open a task's journal, writing the header if it is new."""
+        path = self.path_for(task_id)
+        with self._lock:
+            is_new = not path.exists()
+            self._files[task_id] = (open(path, "a", encoding="utf-8"), threading.Lock())
+        if is_new:
+            self._write(task_id, {"type": "task", "task_id": task_id, **header})
+
+    def append(
+        self,
+        task_id: str,
+        start: float,
+        end: float,
+        text: str,
+        words: Optional[list] = None,
+        confidence: Optional[tuple] = None
+    ) -> None:
+        """Record a decoded segment (no-op for tasks without a journal)."""
+        record = {"type": "segment", "start": start, "end": end, "text": text}
+        if words:
+            record["words"] = [list(word) for word in words]
+        if confidence:
+            record["confidence"] = list(confidence)
+        self._write(task_id, record)
+
+    def truncate(self, task_id: str, count: int) -> None:
+        """Record that only the first ``count`` segments are kept."""
+        self._write(task_id, {"type": "truncate", "count": count})
+
+    def finish(self, task_id: str) -> None:
+        """Close and delete a task's journal."""
+        with self._lock:
+            entry = self._files.pop(task_id, None)
+        if entry:
+            handle, lock = entry
+            with lock:
+                handle.close()
+        self.path_for(task_id).unlink(missing_ok=True)
+
+    def interrupted(self) -> List[Tuple[dict, SegmentTable]]:
+        """Headers and journaled segments of tasks left unfinished."""
+        tasks = []
+        for path in sorted(self.directory.glob("*.jsonl"), key=lambda p: p.stat().st_mtime):
+            if path.stem in self._files:
+                continue
+            header, table = self._load(path)
+            if header is None:
+                path.unlink(missing_ok=True)
+                continue
+            tasks.append((header, table))
+        return tasks
+
+    def _load(self, path: Path) -> Tuple[Optional[dict], SegmentTable]:
+        header = None
+        table = SegmentTable()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from the crash; nothing after it is valid
+                    break
+                kind = record.get("type")
+                if kind == "task":
+                    header = record
+                elif kind == "segment":
+                    words = [tuple(word) for word in record.get("words") or []]
+                    confidence = record.get("confidence")
+                    table.append(
+                        record["start"], record["end"], record["text"],
+                        words or None, tuple(confidence) if confidence else None
+                    )
+                elif kind == "truncate":
+                    table.truncate(record["count"])
+        return header, table
+
+    def _write(self, task_id: str, record: dict) -> None:
+        with self._lock:
+            entry = self._files.get(task_id)
+        if entry is None:
+            return
+        handle, lock = entry
+        line = json.dumps(record) + "\n"
+        with lock:
+            if handle.closed:
+                return  # Finished meanwhile
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
@@ -0,0 +1,114 @@
+"""
+Retained per-task timing breakdowns, for aggregate analysis.
+
+Every finished task's TaskTimings is appended to a JSON-lines file that
+outlives the in-memory task store. Summarize it from the backend
+directory with:
+
+    python -m services.timing_log [--file timings.jsonl] [--since 2024-05-01]
+"""
+import argparse
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class TimingLog:
+    """
+    Append-only log of task timing records.
+
+    The most recent ``keep`` records are also held in memory, so a task's
+    timings stay available after the task itself has been deleted.
+    """
+
+    def __init__(self, path: Path, keep: int = 1000):
+        self.path = Path(path)
+        self.keep = keep
+        self._lock = threading.Lock()
+        # task_id -> record, oldest first
+        self._recent: "OrderedDict[str, dict]" = OrderedDict()
+
+    def record(self, timings: dict) -> None:
+        line = json.dumps(timings, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._recent[timings["task_id"]] = timings
+            self._recent.move_to_end(timings["task_id"])
+            while len(self._recent) > self.keep:
+                self._recent.popitem(last=False)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._recent.get(task_id)
+
+    def read(self) -> Iterator[dict]:
+        """Every record in the file; a torn last line is skipped."""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _distribution(values: List[float]) -> dict:
+    ordered = sorted(values)
+
+    def percentile(pct: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "max": ordered[-1]
+    }
+
+
+def aggregate(records: Iterable[dict]) -> dict:
+    """Per-stage and end-to-end distributions over completed tasks."""
+    stages: Dict[str, List[float]] = {}
+    totals: Dict[str, List[float]] = {
+        "time_to_first_segment": [],
+        "total_seconds": [],
+        "real_time_factor": []
+    }
+    tasks = 0
+    for record in records:
+        if record.get("status") != "completed":
+            continue
+        tasks += 1
+        for stage, seconds in (record.get("stages") or {}).items():
+            stages.setdefault(stage, []).append(seconds)
+        for key, values in totals.items():
+            if record.get(key) is not None:
+                values.append(record[key])
+    return {
+        "tasks": tasks,
+        "stages": {stage: _distribution(values) for stage, values in sorted(stages.items())},
+        **{key: _distribution(values) for key, values in totals.items() if values}
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from core.config import settings
+
+    parser = argparse.ArgumentParser(description="Summarize retained task timings.")
+    parser.add_argument("--file", type=Path, default=settings.TIMINGS_LOG_FILE)
+    parser.add_argument("--since", help="only tasks created on or after this ISO date")
+    args = parser.parse_args(argv)
+
+    records = TimingLog(args.file).read()
+    if args.since:
+        records = (r for r in records if r.get("created_at", "") >= args.since)
+    print(json.dumps(aggregate(records), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,54 @@
 import os
+import copy
+import time
 import asyncio
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
-from typing import Callable, Optional
-from faster_whisper import WhisperModel
+from typing import Callable, List, Optional, Set, Tuple
+import numpy as np
+from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
+from core import metrics
 from core.config import settings
-from models.schemas import TranscriptSegment, TranscriptionResult, TaskStatus
+from models.schemas import TranscriptionResult, TaskStatus
+from models.segments import SegmentTable
+from services.job_queue import JobCancelled, JobQueue, TranscriptionJob
+from services.audio_pipeline import DecodeStage, SAMPLE_RATE
+from services.pcm_cache import PcmCache
+from services.repetition import RepetitionDetector, trailing_repeat_cut
+from services.live_transcriber import LiveTranscriber
+from services.task_journal import TaskJournal
+from services.autotune import ensure_tuned
+from services.engines import AsrEngine, create_engine
+
+# Whisper's context window; batched chunks must not exceed it
+CHUNK_LENGTH_S = 30
+# Audio scanned by VAD around each language detection window
+DETECTION_REGION_S = 90
+# Language codes Whisper models accept as a hint (multilingual models;
+# kept here rather than importing faster-whisper's private list)
+WHISPER_LANGUAGES = frozenset((
+    "af", "am", "ar", "as", "az", "ba", "be", "bg", "bn", "bo", "br", "bs", "ca",
+    "cs", "cy", "da", "de", "el", "en", "es", "et", "eu", "fa", "fi", "fo", "fr",
+    "gl", "gu", "ha", "haw", "he", "hi", "hr", "ht", "hu", "hy", "id", "is", "it",
+    "ja", "jw", "ka", "kk", "km", "kn", "ko", "la", "lb", "ln", "lo", "lt", "lv",
+    "mg", "mi", "mk", "ml", "mn", "mr", "ms", "mt", "my", "ne", "nl", "nn", "no",
+    "oc", "pa", "pl", "ps", "pt", "ro", "ru", "sa", "sd", "si", "sk", "sl", "sn",
+    "so", "sq", "sr", "su", "sv", "sw", "ta", "te", "tg", "th", "tk", "tl", "tr",
+    "tt", "uk", "ur", "uz", "vi", "yi", "yo", "zh", "yue"
+))
 
 class WhisperService:
     _instance: Optional['WhisperService'] = None
-    _model: Optional[WhisperModel] = None
+    engine: Optional[AsrEngine] = None
+    _draft_engine: Optional[AsrEngine] = None
+    _draft_lock = threading.Lock()
+    _queue: Optional[JobQueue] = None
+    _decoder: Optional[DecodeStage] = None
+    pcm_cache: Optional[PcmCache] = None
+    journal: Optional[TaskJournal] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -16,164 +56,1028 @@ class WhisperService:
         return cls._instance
 
     def __init__(self):
-        if self._model is None:
-            print(f"Loading Whisper model: {settings.WHISPER_MODEL}...")
-            self._model = WhisperModel(
-                settings.WHISPER_MODEL,
-                device=settings.WHISPER_DEVICE,
-                compute_type=settings.WHISPER_COMPUTE_TYPE,
-                cpu_threads=settings.WHISPER_CPU_THREADS
-            )
+        if self.engine is None:
+            if settings.ASR_ENGINE == "faster-whisper":
+                ensure_tuned()
+            print(f"Loading Whisper model: {settings.WHISPER_MODEL} ({settings.ASR_ENGINE})...")
+            self.engine = self._load_engine(settings.WHISPER_MODEL)
             print("Whisper model loaded successfully!")
+        if self._queue is None:
+            self._queue = JobQueue(
+                self._run_jobs,
+                workers=settings.TRANSCRIPTION_WORKERS,
+                max_batch=(
+                    settings.WHISPER_MAX_JOBS_PER_BATCH
+                    if settings.WHISPER_THROUGHPUT_MODE else 1
+                ),
+                on_submit=lambda: self._decoder.notify(),
+                class_penalties=settings.PRIORITY_CLASSES,
+                aging_rate=settings.SCHEDULER_AGING_RATE,
+                unknown_duration=settings.SCHEDULER_UNKNOWN_DURATION_S
+            )
+            if settings.PCM_CACHE_ENABLED:
+                self.pcm_cache = PcmCache(
+                    settings.PCM_CACHE_DIR,
+                    max_bytes=settings.PCM_CACHE_MAX_MB * 1024 * 1024
+                )
+            if settings.JOURNAL_ENABLED:
+                self.journal = TaskJournal(settings.JOURNAL_DIR)
+            self._decoder = DecodeStage(
+                self._queue,
+                block_seconds=settings.DECODE_BLOCK_SECONDS,
+                buffer_blocks=settings.DECODE_BUFFER_SECONDS // settings.DECODE_BLOCK_SECONDS,
+                cache=self.pcm_cache
+            )
+            # Running totals for throughput reporting
+            self.audio_seconds_processed = 0.0
+            self.wall_seconds_busy = 0.0
+            # content hash -> (language, probability), least recently used first
+            self._languages: "OrderedDict[str, tuple]" = OrderedDict()
+            self._languages_lock = threading.Lock()
+            self.language_cache_hits = 0
+            self.language_cache_misses = 0
+            self._register_metrics()
+
+    def _register_metrics(self) -> None:
+        # Read at scrape time, so the decode path pays nothing for them
+        metrics.QUEUE_PENDING.set_function(self._queue.pending)
+        metrics.QUEUE_RUNNING.set_function(lambda: len(self._queue.running()))
+        metrics.CACHE_REQUESTS.set_function(self._cache_counts)
+        metrics.PCM_CACHE_BYTES.set_function(
+            lambda: self.pcm_cache.size_bytes if self.pcm_cache else 0
+        )
+
+    def _cache_counts(self) -> dict:
+        counts = {
+            ("language", "hit"): self.language_cache_hits,
+            ("language", "miss"): self.language_cache_misses
+        }
+        if self.pcm_cache:
+            counts[("pcm", "hit")] = self.pcm_cache.hits
+            counts[("pcm", "miss")] = self.pcm_cache.misses
+        return counts
+
+    @staticmethod
+    def _load_engine(model_name: str) -> AsrEngine:
+        started = time.perf_counter()
+        engine = create_engine(model_name)
+        metrics.MODEL_LOAD_SECONDS.set(
+            round(time.perf_counter() - started, 3),
+            engine=settings.ASR_ENGINE, model=model_name
+        )
+        return engine
+
+    @property
+    def draft_engine(self) -> AsrEngine:
+        """Engine for two-pass drafts with the small model, built on first use."""
+        if settings.TWO_PASS_DRAFT_MODEL == settings.WHISPER_MODEL:
+            return self.engine
+        with self._draft_lock:
+            if self._draft_engine is None:
+                print(f"Loading draft Whisper model: {settings.TWO_PASS_DRAFT_MODEL}...")
+                self._draft_engine = self._load_engine(settings.TWO_PASS_DRAFT_MODEL)
+        return self._draft_engine
+
+    def throughput_stats(self) -> dict:
+        """Audio seconds decoded per wall-clock second since startup."""
+        return {
+            "audio_seconds": round(self.audio_seconds_processed, 2),
+            "wall_seconds": round(self.wall_seconds_busy, 2),
+            "throughput": (
+                round(self.audio_seconds_processed / self.wall_seconds_busy, 3)
+                if self.wall_seconds_busy else None
+            ),
+            "queued_jobs": self._queue.pending(),
+            "engine": settings.ASR_ENGINE,
+            "throughput_mode": settings.WHISPER_THROUGHPUT_MODE
+        }
+
+    def cancel(self, task_id: str) -> Optional[TranscriptionJob]:
+        """
+        Cancel a queued or running transcription.
+
+        Queued jobs are dropped immediately; a running job stops within one
+        decoded segment. Returns the cancelled job, or None if the task has
+        no job in the queue.
+        """
+        job = self._queue.cancel(task_id)
+        if job is not None:
+            self._decoder.drop(job)
+        return job
+
+    def is_active(self, task_id: str) -> bool:
+        """Whether a task has a job queued or running."""
+        jobs = self._queue.snapshot() + self._queue.running()
+        return any(job.task_id == task_id for job in jobs)
+
+    def task_threads(self, task_id: str) -> Set[int]:
+        """Idents of the worker threads running a task's jobs right now."""
+        return {
+            job.worker_thread for job in self._queue.running()
+            if job.task_id == task_id and job.worker_thread is not None
+        }
+
+    def estimate(self, task_id: str) -> Optional[Tuple[float, float]]:
+        """
+        Estimated seconds until a task starts and until it completes.
+
+        Work is the probed audio duration times the measured real-time
+        factor; queued work ahead of the task is shared across workers.
+        Returns None if the task has no job in the queue.
+        """
+        rtf = (
+            self.wall_seconds_busy / self.audio_seconds_processed
+            if self.audio_seconds_processed else settings.ESTIMATE_DEFAULT_RTF
+        )
+        now = time.time()
+
+        def remaining(job: TranscriptionJob) -> float:
+            duration = job.duration if job.duration is not None else settings.SCHEDULER_UNKNOWN_DURATION_S
+            elapsed = now - job.started_at if job.started_at else 0.0
+            return max(0.0, duration * rtf - elapsed)
+
+        running = self._queue.running()
+        for job in running:
+            if job.task_id == task_id:
+                return 0.0, round(remaining(job), 1)
+
+        ahead = sum(remaining(job) for job in running)
+        for job in self._queue.snapshot():
+            wait = ahead / self._queue.workers
+            if job.task_id == task_id:
+                return round(wait, 1), round(wait + remaining(job), 1)
+            ahead += remaining(job)
+        return None
+
+    @staticmethod
+    def resolve_priority(priority: Optional[str] = None) -> str:
+        """Return a valid priority class, falling back to the default."""
+        name = priority or settings.DEFAULT_PRIORITY
+        if name not in settings.PRIORITY_CLASSES:
+            raise ValueError(
+                f"Unknown priority '{name}'. "
+                f"Available: {', '.join(settings.PRIORITY_CLASSES)}"
+            )
+        return name
+
+    @staticmethod
+    def resolve_profile(profile: Optional[str] = None) -> str:
+        """Return a valid decode profile name, falling back to the default."""
+        name = profile or settings.DEFAULT_DECODE_PROFILE
+        if name not in settings.DECODE_PROFILES:
+            raise ValueError(
+                f"Unknown decode profile '{name}'. "
+                f"Available: {', '.join(settings.DECODE_PROFILES)}"
+            )
+        return name
+
+    @staticmethod
+    def resolve_language(language: Optional[str] = None) -> Optional[str]:
+        """Normalize a language hint; None means detect it."""
+        if not language or not language.strip():
+            return None
+        code = language.strip().lower()
+        if code not in WHISPER_LANGUAGES:
+            raise ValueError(f"Unsupported language code '{language}'")
+        return code
+
+    @staticmethod
+    def _decode_options(profile: str) -> dict:
+        """Build transcribe() keyword arguments for a decode profile."""
+        options = dict(
+            beam_size=5,
+            best_of=5,
+            patience=1.0,
+            length_penalty=1.0,
+            temperature=[0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+            vad_filter=True,
+            condition_on_previous_text=True,
+            compression_ratio_threshold=2.4,
+            log_prob_threshold=-1.0,
+            no_speech_threshold=0.6,
+            word_timestamps=False,  # Enabled per job, see TranscriptionJob
+        )
+        # Deep copy: the batched pipeline mutates vad_parameters
+        options.update(copy.deepcopy(settings.DECODE_PROFILES[profile]))
+        return options
+
+    def live_session(self, language: Optional[str] = None) -> LiveTranscriber:
+        """
+        Start a live transcription session.
+
+        Live sessions call the shared model directly instead of going
+        through the job queue, so captions aren't delayed by file jobs.
+        """
+        options = self._decode_options(settings.LIVE_PROFILE)
+        # The session decides these for every window itself
+        for key in ("vad_filter", "vad_parameters", "word_timestamps",
+                    "condition_on_previous_text", "language"):
+            options.pop(key, None)
+        return LiveTranscriber(
+            self.engine,
+            language=language,
+            options=options,
+            min_chunk_seconds=settings.LIVE_MIN_CHUNK_SECONDS,
+            buffer_seconds=settings.LIVE_BUFFER_SECONDS,
+            max_segment_seconds=settings.LIVE_MAX_SEGMENT_SECONDS
+        )
 
     async def transcribe(
         self,
         audio_path: str,
         task_id: str,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        profile: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        language: Optional[str] = None,
+        word_timestamps: bool = False,
+        priority: Optional[str] = None,
+        duration: Optional[float] = None,
+        resume_segments: Optional[SegmentTable] = None,
+        draft: bool = False,
+        adaptive: bool = False
     ) -> TranscriptionResult:
         """
         Transcribe an audio file with progress updates.
+
+        ``audio_path`` may be None when ``content_hash`` names audio held in
+        the decoded-PCM cache. A ``language`` hint skips language detection.
+        ``priority`` and the probed ``duration`` decide queue order.
+        Segments are journaled as they are decoded; ``resume_segments``
+        (from TaskJournal.interrupted) continues an interrupted task.
+        ``draft`` decodes with the two-pass draft model, see refine().
+        ``adaptive`` re-decodes low-confidence segments afterwards.
         """
-        try:
-            # Run transcription in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                self._transcribe_sync,
-                audio_path,
+        job = TranscriptionJob(
+            task_id=task_id,
+            audio_path=audio_path,
+            profile=profile,
+            content_hash=content_hash,
+            language=language,
+            word_timestamps=word_timestamps,
+            priority=priority,
+            duration=duration,
+            resume_segments=resume_segments,
+            draft=draft,
+            adaptive=adaptive,
+            progress_callback=progress_callback
+        )
+        loop = asyncio.get_running_loop()
+        if self.journal:
+            # Opening, writing and fsyncing the journal stays off the event loop
+            await loop.run_in_executor(None, lambda: self.journal.start(
                 task_id,
-                progress_callback
-            )
-            return result
+                audio_path=audio_path,
+                profile=profile,
+                content_hash=content_hash,
+                language=language,
+                word_timestamps=word_timestamps,
+                priority=priority,
+                duration=duration,
+                draft=draft,
+                adaptive=adaptive
+            ))
+        try:
+            # Queue for a transcription worker thread to avoid blocking
+            result = await asyncio.wrap_future(self._queue.submit(job))
+        except JobCancelled:
+            result = self._cancelled_result(job)
         except Exception as e:
-            return TranscriptionResult(
+            result = TranscriptionResult(
                 task_id=task_id,
                 status=TaskStatus.FAILED,
                 message=f"Transcription failed: {str(e)}"
             )
+        # Not in a finally: a shutdown (or crash) must leave the journal
+        if self.journal:
+            await loop.run_in_executor(None, self.journal.finish, task_id)
+        self._stamp(job, result)
+        metrics.JOBS.inc(kind="transcribe", status=result.status.value)
+        return result
 
-    def _transcribe_sync(
+    async def refine(
         self,
-        audio_path: str,
+        audio_path: Optional[str],
         task_id: str,
-        progress_callback: Optional[Callable] = None
+        draft: SegmentTable,
+        on_refined: Callable,
+        progress_callback: Optional[Callable] = None,
+        content_hash: Optional[str] = None,
+        language: Optional[str] = None,
+        word_timestamps: bool = False,
+        duration: Optional[float] = None
     ) -> TranscriptionResult:
+        """
+        Second pass of two-pass mode: re-decode a draft transcript.
+
+        The job is queued at TWO_PASS_REFINE_PRIORITY with the
+        TWO_PASS_REFINE_PROFILE on the main model. After each window,
+        ``on_refined(segments, final_segments, refined_until)`` receives a
+        new table of the refined segments followed by the remaining draft.
+        """
+        job = TranscriptionJob(
+            task_id=task_id,
+            audio_path=audio_path,
+            profile=settings.TWO_PASS_REFINE_PROFILE,
+            content_hash=content_hash,
+            language=language,
+            word_timestamps=word_timestamps,
+            priority=settings.TWO_PASS_REFINE_PRIORITY,
+            duration=duration,
+            refine_segments=draft,
+            on_refined=on_refined,
+            progress_callback=progress_callback
+        )
+        try:
+            result = await asyncio.wrap_future(self._queue.submit(job))
+        except JobCancelled:
+            result = self._cancelled_result(job)
+        except Exception as e:
+            result = TranscriptionResult(
+                task_id=task_id,
+                status=TaskStatus.FAILED,
+                message=f"Refinement failed: {str(e)}"
+            )
+        self._stamp(job, result)
+        metrics.JOBS.inc(kind="refine", status=result.status.value)
+        return result
+
+    @staticmethod
+    def _stamp(job: TranscriptionJob, result: TranscriptionResult) -> None:
+        """Copy a job's lifecycle times onto its result."""
+        def moment(timestamp: Optional[float]) -> Optional[datetime]:
+            return datetime.fromtimestamp(timestamp) if timestamp is not None else None
+
+        result.enqueued_at = moment(job.enqueued_at)
+        result.started_at = moment(job.started_at)
+        result.first_segment_at = moment(job.first_segment_at)
+        result.finished_at = datetime.now()
+
+    def _run_jobs(self, jobs: List[TranscriptionJob]) -> List[TranscriptionResult]:
+        """Queue handler: decode one job, or several jobs in one batch."""
+        started = time.perf_counter()
+        now = time.time()
+        for job in jobs:
+            job.timings["queue_wait"] = round(now - job.enqueued_at, 3)
+
+        if jobs[0].refine_segments is not None:
+            results = [self._refine_sync(jobs[0])]
+        elif len(jobs) == 1:
+            results = [self._transcribe_sync(jobs[0])]
+        else:
+            results = self._transcribe_cross_job(jobs)
+
+        self.wall_seconds_busy += time.perf_counter() - started
+        self.audio_seconds_processed += sum(
+            result.duration or 0.0 for result in results
+            if result.status == TaskStatus.COMPLETED
+        )
+        self._record_metrics(results)
+        return results
+
+    @staticmethod
+    def _record_metrics(results: List[TranscriptionResult]) -> None:
+        """Export finished jobs' stage timings; once per job, not per segment."""
+        for result in results:
+            for stage, seconds in result.timings.items():
+                metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+            if result.status == TaskStatus.COMPLETED and result.duration:
+                metrics.AUDIO_SECONDS.inc(result.duration)
+                if result.real_time_factor is not None:
+                    metrics.REAL_TIME_FACTOR.observe(
+                        result.real_time_factor, decode_mode=result.decode_mode
+                    )
+
+    def _read_audio(self, job: TranscriptionJob) -> np.ndarray:
+        """Get a job's PCM from the decode stage and record decode timings."""
+        audio, waited = self._decoder.read(job)
+        job.timings["decode"] = round(job.pcm.decode_seconds, 3)
+        # Only the part of decoding that did not overlap earlier work
+        job.timings["decode_wait"] = round(waited, 3)
+        return audio
+
+    def _detect_language(self, job: TranscriptionJob, audio: np.ndarray, vad_options: VadOptions):
+        """
+        Return a job's language and its detection probability.
+
+        Uses the job's hint when given. Otherwise VAD picks up to
+        LANGUAGE_DETECTION_WINDOWS speech windows spread over the file and
+        only those are scored, and the answer is cached by content hash.
+        Returns (None, None) when no speech is found.
+        """
+        if job.language:
+            return job.language, None
+
+        key = job.content_hash
+        if key:
+            with self._languages_lock:
+                if key in self._languages:
+                    self._languages.move_to_end(key)
+                    self.language_cache_hits += 1
+                    job.timings["language_detection"] = 0.0
+                    return self._languages[key]
+                self.language_cache_misses += 1
+
+        started = time.perf_counter()
+        window = CHUNK_LENGTH_S * SAMPLE_RATE
+        windows = []
+        for region in self._detection_regions(len(audio)):
+            samples = audio[region]
+            speech = get_speech_timestamps(samples, vad_options)
+            if not speech:
+                continue
+            chunks, _ = collect_chunks(samples, speech)
+            clip = np.concatenate(chunks)[:window]
+            # Pad to a full window so each clip is scored on its own
+            windows.append(np.pad(clip, (0, window - len(clip))))
+
+        language = probability = None
+        if windows:
+            language, probability, _ = self.engine.detect_language(
+                np.concatenate(windows),
+                language_detection_segments=len(windows)
+            )
+            probability = round(float(probability), 4)
+        job.timings["language_detection"] = round(time.perf_counter() - started, 3)
+
+        if key and language:
+            with self._languages_lock:
+                self._languages[key] = (language, probability)
+                while len(self._languages) > settings.LANGUAGE_CACHE_SIZE:
+                    self._languages.popitem(last=False)
+        return language, probability
+
+    @staticmethod
+    def _detection_regions(num_samples: int) -> List[slice]:
+        """Evenly spaced stretches of audio to search for speech windows."""
+        region = DETECTION_REGION_S * SAMPLE_RATE
+        count = max(1, settings.LANGUAGE_DETECTION_WINDOWS)
+        if num_samples <= region:
+            return [slice(0, num_samples)]
+        count = min(count, -(-num_samples // region))
+        step = (num_samples - region) / max(1, count - 1)
+        return [
+            slice(int(i * step), int(i * step) + region) for i in range(count)
+        ]
+
+    def _transcribe_sync(self, job: TranscriptionJob) -> TranscriptionResult:
         """
         Synchronous transcription with progress tracking.
-        Optimized for accuracy on long files.
+        Decode settings come from the selected profile.
         """
-        segments_list = []
-        full_text_parts = []
+        task_id = job.task_id
+        progress_callback = job.progress_callback
+        engine = self.draft_engine if job.draft else self.engine
+        # A job resumed after a restart continues its journaled transcript
+        segment_table = job.resume_segments if job.resume_segments is not None else SegmentTable()
+        started = time.perf_counter()
 
         try:
-            # Transcribe with optimized settings for accuracy
-            # beam_size=5 provides better accuracy than beam_size=1
-            # vad_filter helps skip silence and improves accuracy
-            # condition_on_previous_text helps with context continuity
-            segments, info = self._model.transcribe(
-                audio_path,
-                beam_size=5,  # Better accuracy (1=fast, 5=balanced, 10=best)
-                best_of=5,    # Number of candidates to consider
-                patience=1.0,  # Beam search patience factor
-                length_penalty=1.0,
-                vad_filter=True,
-                vad_parameters=dict(
-                    threshold=0.5,  # Speech detection threshold
-                    min_speech_duration_ms=250,
-                    max_speech_duration_s=float('inf'),
-                    min_silence_duration_ms=500,
-                    speech_pad_ms=400  # Padding around speech
-                ),
-                condition_on_previous_text=True,  # Use context from previous segments
-                compression_ratio_threshold=2.4,
-                log_prob_threshold=-1.0,
-                no_speech_threshold=0.6,
-                word_timestamps=False,  # Disable for speed, enable if needed
+            profile = self.resolve_profile(job.profile)
+            options = self._decode_options(profile)
+            options["word_timestamps"] = job.word_timestamps
+            # Decode from the end of the last committed segment
+            resume = segment_table.end(len(segment_table) - 1) if segment_table else 0.0
+            if resume:
+                options["initial_prompt"] = segment_table.full_text[-200:]
+            audio = self._read_audio(job)
+            job.raise_if_cancelled()
+            language, language_probability = self._detect_language(
+                job, audio, VadOptions(**options.get("vad_parameters") or {})
             )
+            if language:
+                options["language"] = language
 
-            # Process segments
-            segment_id = 0
-            total_duration = info.duration if info.duration else 0
+            # Short files gain nothing from batching and stay sequential
+            decode_mode = "sequential"
+            if (settings.WHISPER_THROUGHPUT_MODE and not job.draft
+                    and len(audio) / SAMPLE_RATE >= settings.WHISPER_BATCH_MIN_DURATION_S):
+                decode_mode = "batched"
 
-            for segment in segments:
-                text = segment.text.strip()
-                if text:  # Only add non-empty segments
-                    segment_data = TranscriptSegment(
-                        id=segment_id,
-                        start=round(segment.start, 2),
-                        end=round(segment.end, 2),
-                        text=text
-                    )
-                    segments_list.append(segment_data)
-                    full_text_parts.append(text)
-                    segment_id += 1
-
-                # Calculate progress
-                if total_duration > 0 and progress_callback:
-                    progress = min((segment.end / total_duration) * 100, 99.0)
-                    progress_callback(
-                        task_id=task_id,
-                        progress=progress,
-                        message=f"Transcribing... {int(progress)}%",
-                        current_segment=segment_id
-                    )
+            inference_started = time.perf_counter()
+            remaining = audio[int(resume * SAMPLE_RATE):]
+            if decode_mode == "batched":
+                segments, info = self.engine.transcribe_batched(
+                    remaining,
+                    batch_size=settings.WHISPER_BATCH_SIZE,
+                    **options
+                )
+            else:
+                segments, info = engine.transcribe(remaining, **options)
+            options.pop("initial_prompt", None)
+
+            # Batched chunks don't condition on previous text, so only the
+            # sequential decoder can fall into a repetition loop
+            detector = self._repetition_detector() if decode_mode == "sequential" else None
+            duration = info.duration + resume if info.duration else None
+            total_duration = duration or 0
+            restarts = 0
 
-            # Final progress update
-            if progress_callback:
-                progress_callback(
-                    task_id=task_id,
-                    progress=100.0,
-                    message="Transcription complete!",
-                    current_segment=segment_id
+            while True:
+                loop_start = None
+                for segment in segments:
+                    job.raise_if_cancelled()
+                    # Restarted passes decode a slice starting at ``resume``
+                    start, end = segment.start + resume, segment.end + resume
+                    text = segment.text.strip()
+                    if text:  # Only add non-empty segments
+                        words = self._word_rows(segment, -resume)
+                        confidence = self._confidence(segment)
+                        index = segment_table.append(
+                            round(start, 2), round(end, 2), text, words, confidence
+                        )
+                        if job.first_segment_at is None:
+                            job.first_segment_at = time.time()
+                        if self.journal:
+                            self.journal.append(
+                                task_id, round(start, 2), round(end, 2), text, words, confidence
+                            )
+                        if detector:
+                            loop_start = detector.feed(text, index)
+                            if loop_start is not None:
+                                break
+
+                    # Calculate progress
+                    if total_duration > 0 and progress_callback:
+                        progress = min((end / total_duration) * 100, 99.0)
+                        progress_callback(
+                            task_id=task_id,
+                            progress=progress,
+                            message=f"Transcribing... {int(progress)}%",
+                            current_segment=len(segment_table)
+                        )
+
+                if loop_start is None:
+                    break
+
+                # Drop the loop and decode again from where it started,
+                # without the looping text as a prompt. If that spot loops
+                # again, skip past the segment that triggered detection.
+                restarts += 1
+                loop_time = segment_table.start(loop_start)
+                restart_at = loop_time if loop_time > resume else end
+                segment_table.truncate(loop_start)
+                if self.journal:
+                    self.journal.truncate(task_id, loop_start)
+                print(
+                    f"Repetition loop in task {task_id} at {loop_time:.2f}s; "
+                    f"restarting at {restart_at:.2f}s"
+                )
+                resume = restart_at
+                options["condition_on_previous_text"] = False
+                options["language"] = info.language
+                if restarts >= settings.REPETITION_MAX_RESTARTS:
+                    detector = None
+                else:
+                    detector = self._repetition_detector()
+                segments, _ = engine.transcribe(
+                    audio[int(resume * SAMPLE_RATE):], **options
+                )
+            job.timings["inference"] = round(time.perf_counter() - inference_started, 3)
+
+            redecoded = None
+            if job.adaptive:
+                redecode_started = time.perf_counter()
+                segment_table, redecoded = self._redecode_low_confidence(
+                    job, audio, segment_table, info.language
                 )
+                job.timings["redecode"] = round(time.perf_counter() - redecode_started, 3)
 
-            # Join text with proper spacing
-            full_text = " ".join(full_text_parts)
+            if not language:
+                # No speech to sample; transcribe() detected the language
+                language_probability = round(float(info.language_probability), 4)
 
-            # Clean up common transcription artifacts
-            full_text = self._clean_transcript(full_text)
+            result = self._complete(
+                job, segment_table, info.language, duration, profile,
+                decode_mode, started, language_probability=language_probability
+            )
+            result.repetition_restarts = restarts
+            result.redecoded_seconds = redecoded
+            return result
 
+        except JobCancelled:
+            return self._cancelled_result(job)
+        except Exception as e:
             return TranscriptionResult(
                 task_id=task_id,
-                status=TaskStatus.COMPLETED,
-                progress=100.0,
-                message="Transcription complete!",
-                language=info.language,
-                duration=round(info.duration, 2) if info.duration else None,
-                segments=segments_list,
-                full_text=full_text
+                status=TaskStatus.FAILED,
+                message=f"Transcription error: {str(e)}",
+                timings=job.timings
             )
 
+    def _refine_sync(self, job: TranscriptionJob) -> TranscriptionResult:
+        """
+        Refine a two-pass draft window by window with the main model.
+
+        Windows end on draft segment boundaries, so each decoded window
+        replaces a whole run of draft segments. A new table is built and
+        handed to ``job.on_refined`` after every window rather than editing
+        the published one, so readers never see a half-replaced window.
+        """
+        draft = job.refine_segments
+        refined = SegmentTable()
+        started = time.perf_counter()
+
+        try:
+            profile = self.resolve_profile(job.profile)
+            options = self._decode_options(profile)
+            options["word_timestamps"] = job.word_timestamps
+            options["language"] = job.language
+            audio = self._read_audio(job)
+            duration = len(audio) / SAMPLE_RATE
+
+            for next_draft, window_start, window_end in self._refine_windows(draft, duration):
+                job.raise_if_cancelled()
+                if refined:
+                    options["initial_prompt"] = refined.full_text[-200:]
+                window = audio[int(window_start * SAMPLE_RATE):int(window_end * SAMPLE_RATE)]
+                segments, _ = self.engine.transcribe(window, **options)
+                for segment in segments:
+                    job.raise_if_cancelled()
+                    text = segment.text.strip()
+                    if text:
+                        refined.append(
+                            round(segment.start + window_start, 2),
+                            round(segment.end + window_start, 2),
+                            text,
+                            self._word_rows(segment, -window_start),
+                            self._confidence(segment)
+                        )
+                        if job.first_segment_at is None:
+                            job.first_segment_at = time.time()
+
+                published = SegmentTable()
+                published.extend(refined)
+                published.extend(draft, next_draft)
+                if job.on_refined:
+                    job.on_refined(published, len(refined), round(window_end, 2))
+                if job.progress_callback and duration:
+                    progress = min(window_end / duration * 100, 99.0)
+                    job.progress_callback(
+                        task_id=job.task_id,
+                        progress=progress,
+                        message=f"Refining transcript... {int(progress)}%",
+                        current_segment=len(refined)
+                    )
+
+            return self._complete(job, refined, job.language, duration, profile, "two-pass", started)
+
+        except JobCancelled:
+            return self._cancelled_result(job)
         except Exception as e:
             return TranscriptionResult(
-                task_id=task_id,
+                task_id=job.task_id,
                 status=TaskStatus.FAILED,
-                message=f"Transcription error: {str(e)}"
+                message=f"Refinement error: {str(e)}",
+                timings=job.timings
             )
 
-    def _clean_transcript(self, text: str) -> str:
-        """Clean up common transcription artifacts."""
-        import re
+    @staticmethod
+    def _refine_windows(draft: SegmentTable, duration: float) -> List[Tuple[int, float, float]]:
+        """
+        Split audio into refinement windows along draft segment boundaries.
 
-        # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
+        Returns ``(next_draft_segment, start, end)`` per window; each window
+        takes at least one draft segment and otherwise stays within
+        TWO_PASS_WINDOW_SECONDS. The last window runs to the end of the audio.
+        """
+        windows = []
+        start = 0.0
+        index = 0
+        while index < len(draft):
+            stop = index + 1
+            while stop < len(draft) and draft.end(stop) - start <= settings.TWO_PASS_WINDOW_SECONDS:
+                stop += 1
+            end = draft.end(stop - 1) if stop < len(draft) else max(duration, draft.end(stop - 1))
+            windows.append((stop, start, end))
+            start, index = end, stop
+        return windows or [(0, 0.0, duration)]
+
+    def _transcribe_cross_job(self, jobs: List[TranscriptionJob]) -> List[TranscriptionResult]:
+        """
+        Decode several queued jobs in shared batches.
 
-        # Remove repeated phrases (common hallucination)
-        # This is a simple heuristic - repeated 3+ word phrases
+        Each job's speech is split by VAD into chunks of at most 30 seconds.
+        Jobs are grouped by detected language, their audio is laid end to
+        end, and the chunks of the whole group are passed to the batched
+        pipeline as explicit clips. Segments are mapped back to their job
+        by sample offset.
+        """
+        started = time.perf_counter()
+        results = {}
+
+        try:
+            profile = self.resolve_profile(jobs[0].profile)
+            options = self._decode_options(profile)
+            # Batched jobs share a batch key, so agree on word timestamps
+            options["word_timestamps"] = jobs[0].word_timestamps
+            vad_parameters = options.pop("vad_parameters", None) or {}
+            vad_parameters.pop("max_speech_duration_s", None)
+            vad_options = VadOptions(**vad_parameters, max_speech_duration_s=CHUNK_LENGTH_S)
+            options.pop("vad_filter", None)
+
+            groups = {}
+            for job in jobs:
+                try:
+                    audio = self._read_audio(job)
+                    speech = get_speech_timestamps(audio, vad_options)
+                    language = probability = None
+                    if speech:
+                        language, probability = self._detect_language(job, audio, vad_options)
+                    groups.setdefault(language, []).append((job, audio, speech, probability))
+                except JobCancelled:
+                    results[job.task_id] = self._cancelled_result(job)
+                except Exception as e:
+                    results[job.task_id] = TranscriptionResult(
+                        task_id=job.task_id,
+                        status=TaskStatus.FAILED,
+                        message=f"Transcription error: {str(e)}",
+                        timings=job.timings
+                    )
+
+            total_audio = sum(
+                len(audio) for group in groups.values() for _, audio, _, _ in group
+            ) / SAMPLE_RATE
+
+            for language, members in groups.items():
+                inference_started = time.perf_counter()
+                tables = {job.task_id: SegmentTable() for job, _, _, _ in members}
+                offsets, clips = [], []
+                offset = 0
+                for job, audio, speech, _ in members:
+                    offsets.append(offset)
+                    for start, end in self._merge_speech_chunks(speech):
+                        clips.append({
+                            "start": (offset + start) / SAMPLE_RATE,
+                            "end": (offset + end) / SAMPLE_RATE
+                        })
+                    offset += len(audio)
+
+                if clips:
+                    segments, _ = self.engine.transcribe_batched(
+                        np.concatenate([audio for _, audio, _, _ in members]),
+                        language=language,
+                        clip_timestamps=clips,
+                        batch_size=settings.WHISPER_BATCH_SIZE,
+                        **options
+                    )
+                    for segment in segments:
+                        if all(job.cancelled for job, _, _, _ in members):
+                            break
+                        index = bisect_right(offsets, int(segment.start * SAMPLE_RATE)) - 1
+                        job = members[index][0]
+                        if job.cancelled:
+                            continue
+                        shift = offsets[index] / SAMPLE_RATE
+                        text = segment.text.strip()
+                        if text:
+                            start, end = round(segment.start - shift, 2), round(segment.end - shift, 2)
+                            words = self._word_rows(segment, shift)
+                            confidence = self._confidence(segment)
+                            tables[job.task_id].append(start, end, text, words, confidence)
+                            if job.first_segment_at is None:
+                                job.first_segment_at = time.time()
+                            if self.journal:
+                                self.journal.append(
+                                    job.task_id, start, end, text, words, confidence
+                                )
+                        if job.progress_callback:
+                            job_duration = len(members[index][1]) / SAMPLE_RATE
+                            progress = min((segment.end - shift) / job_duration * 100, 99.0)
+                            job.progress_callback(
+                                task_id=job.task_id,
+                                progress=progress,
+                                message=f"Transcribing (batched)... {int(progress)}%",
+                                current_segment=len(tables[job.task_id])
+                            )
+
+                inference_time = round(time.perf_counter() - inference_started, 3)
+                for job, audio, _, probability in members:
+                    if job.cancelled:
+                        results[job.task_id] = self._cancelled_result(job)
+                        continue
+                    job.timings["inference"] = inference_time
+                    results[job.task_id] = self._complete(
+                        job, tables[job.task_id], language,
+                        len(audio) / SAMPLE_RATE, profile, "batched-cross-job",
+                        started, batch_audio_seconds=total_audio,
+                        language_probability=probability
+                    )
+
+        except Exception as e:
+            for job in jobs:
+                results.setdefault(job.task_id, TranscriptionResult(
+                    task_id=job.task_id,
+                    status=TaskStatus.FAILED,
+                    message=f"Transcription error: {str(e)}",
+                    timings=job.timings
+                ))
+
+        return [results[job.task_id] for job in jobs]
+
+    @staticmethod
+    def _repetition_detector() -> Optional[RepetitionDetector]:
+        """A fresh loop detector, or None when detection is disabled."""
+        if not settings.REPETITION_DETECTION:
+            return None
+        return RepetitionDetector(
+            ngram=settings.REPETITION_NGRAM_SIZE,
+            max_repeats=settings.REPETITION_MAX_REPEATS,
+            window_words=settings.REPETITION_WINDOW_WORDS,
+            compression_ratio=settings.REPETITION_COMPRESSION_RATIO
+        )
+
+    @staticmethod
+    def _word_rows(segment, shift: float = 0.0) -> Optional[list]:
+        """Word timestamps of a decoded segment as SegmentTable rows."""
+        if not segment.words:
+            return None
+        return [
+            (round(w.start - shift, 2), round(w.end - shift, 2), w.word, w.probability)
+            for w in segment.words
+        ]
+
+    @staticmethod
+    def _confidence(segment) -> Optional[Tuple[float, float, float]]:
+        """A decoded segment's (avg_logprob, no_speech_prob, compression_ratio)."""
+        avg_logprob = getattr(segment, "avg_logprob", None)
+        if avg_logprob is None:
+            return None
+        return avg_logprob, segment.no_speech_prob, segment.compression_ratio
+
+    @staticmethod
+    def _is_low_confidence(confidence: Optional[Tuple[float, float, float]]) -> bool:
+        if confidence is None:
+            return False
+        avg_logprob, no_speech_prob, compression_ratio = confidence
+        return (
+            avg_logprob < settings.ADAPTIVE_MIN_AVG_LOGPROB
+            or no_speech_prob > settings.ADAPTIVE_MAX_NO_SPEECH_PROB
+            or compression_ratio > settings.ADAPTIVE_MAX_COMPRESSION_RATIO
+        )
+
+    def _low_confidence_ranges(
+        self,
+        table: SegmentTable,
+        duration: float
+    ) -> List[Tuple[int, int, float, float]]:
+        """
+        Runs of low-confidence segments as ``(first, stop, start, end)``.
+
+        Adjacent low segments are merged, and each range is padded by
+        ADAPTIVE_PAD_SECONDS without reaching into the neighbouring kept
+        segments.
+        """
+        ranges = []
+        index = 0
+        while index < len(table):
+            if not self._is_low_confidence(table.confidence(index)):
+                index += 1
+                continue
+            stop = index + 1
+            while stop < len(table) and self._is_low_confidence(table.confidence(stop)):
+                stop += 1
+            floor = table.end(index - 1) if index else 0.0
+            ceiling = table.start(stop) if stop < len(table) else duration
+            ranges.append((
+                index,
+                stop,
+                max(floor, table.start(index) - settings.ADAPTIVE_PAD_SECONDS),
+                min(ceiling, table.end(stop - 1) + settings.ADAPTIVE_PAD_SECONDS)
+            ))
+            index = stop
+        return ranges
+
+    def _redecode_low_confidence(
+        self,
+        job: TranscriptionJob,
+        audio: np.ndarray,
+        table: SegmentTable,
+        language: Optional[str]
+    ) -> Tuple[SegmentTable, float]:
+        """
+        Re-decode low-confidence stretches with ADAPTIVE_REDECODE_PROFILE.
+
+        Returns the transcript with those stretches replaced and the
+        number of audio seconds that were decoded again.
+        """
+        ranges = self._low_confidence_ranges(table, len(audio) / SAMPLE_RATE)
+        if not ranges:
+            return table, 0.0
+
+        options = self._decode_options(self.resolve_profile(settings.ADAPTIVE_REDECODE_PROFILE))
+        options["word_timestamps"] = job.word_timestamps
+        options["language"] = language
+        rebuilt = SegmentTable()
+        cursor = 0
+        redecoded = 0.0
+        for first, stop, start, end in ranges:
+            job.raise_if_cancelled()
+            rebuilt.extend(table, cursor, first)
+            options["initial_prompt"] = rebuilt.full_text[-200:] or None
+            segments, _ = self.engine.transcribe(
+                audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], **options
+            )
+            for segment in segments:
+                text = segment.text.strip()
+                if text:
+                    rebuilt.append(
+                        round(segment.start + start, 2),
+                        round(segment.end + start, 2),
+                        text,
+                        self._word_rows(segment, -start),
+                        self._confidence(segment)
+                    )
+            redecoded += end - start
+            cursor = stop
+        rebuilt.extend(table, cursor)
+        return rebuilt, round(redecoded, 2)
+
+    @staticmethod
+    def _merge_speech_chunks(speech: List[dict]) -> List[tuple]:
+        """Greedily merge VAD speech chunks into clips of at most 30 seconds."""
+        max_samples = CHUNK_LENGTH_S * SAMPLE_RATE
+        merged = []
+        for chunk in speech:
+            if merged and chunk["end"] - merged[-1][0] <= max_samples:
+                merged[-1] = (merged[-1][0], chunk["end"])
+            else:
+                merged.append((chunk["start"], chunk["end"]))
+        return merged
+
+    def _complete(
+        self,
+        job: TranscriptionJob,
+        segment_table: SegmentTable,
+        language: Optional[str],
+        duration: Optional[float],
+        profile: str,
+        decode_mode: str,
+        started: float,
+        batch_audio_seconds: Optional[float] = None,
+        language_probability: Optional[float] = None
+    ) -> TranscriptionResult:
+        """Clean up a decoded transcript and build its completed result."""
+        # Final progress update
+        if job.progress_callback:
+            job.progress_callback(
+                task_id=job.task_id,
+                progress=100.0,
+                message="Transcription complete!",
+                current_segment=len(segment_table)
+            )
+
+        # Clean up common transcription artifacts; the full text is
+        # derived from the segment buffer, so trim the table itself
+        cleanup_started = time.perf_counter()
+        full_text = self._clean_transcript(segment_table.full_text)
+        segment_table.truncate_text(len(full_text))
+        job.timings["cleanup"] = round(time.perf_counter() - cleanup_started, 3)
+
+        # Real-time factor: wall-clock seconds spent per second of audio.
+        # Throughput is its inverse; jobs decoded together share the
+        # wall time, so their throughput covers the whole batch.
+        processing_time = time.perf_counter() - started
+        audio_seconds = batch_audio_seconds if batch_audio_seconds is not None else duration
+        real_time_factor = round(processing_time / duration, 4) if duration else None
+        throughput = (
+            round(audio_seconds / processing_time, 3)
+            if audio_seconds and processing_time else None
+        )
+
+        return TranscriptionResult(
+            task_id=job.task_id,
+            status=TaskStatus.COMPLETED,
+            progress=100.0,
+            message="Transcription complete!",
+            language=language,
+            language_probability=language_probability,
+            duration=round(duration, 2) if duration else None,
+            segments=segment_table,
+            profile=profile,
+            decode_mode=decode_mode,
+            processing_time=round(processing_time, 3),
+            real_time_factor=real_time_factor,
+            throughput=throughput,
+            timings=job.timings
+        )
+
+    @staticmethod
+    def _cancelled_result(job: TranscriptionJob) -> TranscriptionResult:
+        return TranscriptionResult(
+            task_id=job.task_id,
+            status=TaskStatus.CANCELLED,
+            message="Transcription cancelled",
+            timings=job.timings
+        )
+
+    def _clean_transcript(self, text: str) -> str:
+        """Clean up common transcription artifacts in one linear pass."""
+        # Splitting also collapses runs of whitespace
         words = text.split()
-        if len(words) > 10:
-            # Check for repeated patterns at the end (hallucination symptom)
-            for pattern_len in range(3, 8):
-                if len(words) >= pattern_len * 3:
-                    last_pattern = ' '.join(words[-pattern_len:])
-                    prev_pattern = ' '.join(words[-pattern_len*2:-pattern_len])
-                    if last_pattern == prev_pattern:
-                        # Remove the repeated pattern
-                        words = words[:-pattern_len]
-                        text = ' '.join(words)
-
-        return text.strip()
+        # Drop a phrase repeated at the very end (common hallucination);
+        # loops elsewhere are caught while decoding, see RepetitionDetector
+        return ' '.join(words[:trailing_repeat_cut(words)])
 
 # Singleton instance
 whisper_service = WhisperService()
@@ -1,8 +1,11 @@
 """
 Pytest configuration and fixtures for Audtext backend tests.
 """
+import atexit
 import os
+import shutil
 import sys
+import tempfile
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, AsyncMock, patch
@@ -11,6 +14,19 @@ from fastapi.testclient import TestClient
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Use the deterministic fake engine so no Whisper model is loaded
+os.environ.setdefault("ASR_ENGINE", "fake")
+
+# Keep journals, timing logs, profiles and caches out of the repository;
+# settings are read at import, so this has to happen before importing main
+_state_dir = Path(tempfile.mkdtemp(prefix="audtext-tests-"))
+atexit.register(shutil.rmtree, _state_dir, ignore_errors=True)
+os.environ.setdefault("TIMINGS_LOG_FILE", str(_state_dir / "timings.jsonl"))
+os.environ.setdefault("JOURNAL_DIR", str(_state_dir / "journal"))
+os.environ.setdefault("PROFILE_DIR", str(_state_dir / "profiles"))
+os.environ.setdefault("PCM_CACHE_DIR", str(_state_dir / "pcm_cache"))
+os.environ.setdefault("AUTOTUNE_FILE", str(_state_dir / "autotune.json"))
+
 from main import app
 from models.schemas import TranscriptSegment, TranscriptionResult, TaskStatus
 
@@ -48,7 +64,7 @@ def sample_segments():
 
 
 @pytest.fixture
-def sample_transcription_result(sample_segments, sample_transcript):
+def sample_transcription_result(sample_segments):
     """Sample transcription result for testing."""
     return TranscriptionResult(
         task_id="test-task-123",
@@ -57,8 +73,7 @@ def sample_transcription_result(sample_segments, sample_transcript):
         message="Transcription complete!",
         language="en",
         duration=40.0,
-        segments=sample_segments,
-        full_text=sample_transcript
+        segments=sample_segments
     )
 
 
@@ -3,9 +3,12 @@ API endpoint tests for Audtext backend.
 """
 import pytest
 import json
+import asyncio
+import numpy as np
 from unittest.mock import patch, AsyncMock, Mock
 from fastapi.testclient import TestClient
 from models.schemas import TaskStatus, TranscriptionResult, TranscriptSegment
+from models.segments import SegmentTable
 
 
 class TestHealthEndpoints:
@@ -49,6 +52,56 @@ class TestTranscriptionEndpoints:
         # Should be rejected or fail during processing
         assert response.status_code in [400, 422, 500]
 
+    def test_upload_unknown_profile(self, client, temp_audio_file):
+        """Test upload with an unknown decode profile is rejected."""
+        with open(temp_audio_file, "rb") as f:
+            response = client.post(
+                "/api/upload",
+                files={"file": ("test.wav", f, "audio/wav")},
+                data={"profile": "nonexistent"}
+            )
+        assert response.status_code == 400
+
+    def test_upload_unknown_language(self, client, temp_audio_file):
+        """Test upload with an unsupported language hint is rejected."""
+        with open(temp_audio_file, "rb") as f:
+            response = client.post(
+                "/api/upload",
+                files={"file": ("test.wav", f, "audio/wav")},
+                data={"language": "xx-nope"}
+            )
+        assert response.status_code == 400
+
+    def test_upload_unknown_priority(self, client, temp_audio_file):
+        """Test upload with an unknown priority class is rejected."""
+        with open(temp_audio_file, "rb") as f:
+            response = client.post(
+                "/api/upload",
+                files={"file": ("test.wav", f, "audio/wav")},
+                data={"priority": "urgent!!"}
+            )
+        assert response.status_code == 400
+
+    def test_status_reports_estimates(self, client):
+        """Test queued tasks expose estimated wait and completion."""
+        store = {"test-task": TranscriptionResult(task_id="test-task", status=TaskStatus.PROCESSING)}
+        with patch('api.routes.transcription.transcription_store', store), \
+                patch('api.routes.transcription.whisper_service') as mock_service:
+            mock_service.estimate.return_value = (12.0, 30.5)
+            response = client.get("/api/status/test-task")
+
+        data = response.json()
+        assert data["estimated_wait"] == 12.0
+        assert data["estimated_completion"] == 30.5
+
+    def test_list_profiles(self, client):
+        """Test the decode profiles endpoint."""
+        response = client.get("/api/profiles")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["default"] in data["profiles"]
+        assert {"fast", "balanced", "accurate"} <= set(data["profiles"])
+
     def test_get_status_nonexistent_task(self, client):
         """Test getting status of non-existent task."""
         response = client.get("/api/status/nonexistent-task-id")
@@ -60,6 +113,573 @@ class TestTranscriptionEndpoints:
         assert response.status_code == 404
 
 
+class TestStatusLongPoll:
+    """Tests for long-polling and batched status."""
+
+    @pytest.fixture
+    def store(self):
+        from core.config import settings
+        store = {
+            task_id: TranscriptionResult(task_id=task_id, status=TaskStatus.PROCESSING)
+            for task_id in ("a", "b")
+        }
+        with patch('api.routes.transcription.transcription_store', store), \
+                patch('api.routes.transcription.whisper_service') as mock_service, \
+                patch.object(settings, 'STATUS_RECHECK_S', 30.0):
+            mock_service.estimate.return_value = None
+            yield store
+
+    def test_wait_returns_on_change(self, client, store):
+        """Test a long-poll returns as soon as progress changes, not at the deadline."""
+        import threading
+        import time
+        from api.routes.transcription import progress_callback
+
+        first = client.get("/api/status/a").json()
+        assert first["version"] >= 1
+        same = client.get(f"/api/status/a?since={first['version']}&wait=0").json()
+        assert same["version"] == first["version"]
+
+        threading.Timer(0.2, progress_callback, ("a", 50.0, "Halfway")).start()
+        started = time.perf_counter()
+        changed = client.get(f"/api/status/a?since={first['version']}&wait=10").json()
+        assert time.perf_counter() - started < 5
+        assert changed["progress"] == 50.0 and changed["version"] > first["version"]
+
+        started = time.perf_counter()
+        unchanged = client.get(f"/api/status/a?since={changed['version']}&wait=0.3").json()
+        assert time.perf_counter() - started >= 0.3
+        assert unchanged["version"] == changed["version"]
+
+    def test_version_moves_in_progress_steps(self, client, store):
+        """Test per-segment progress within a step doesn't answer a long-poll."""
+        from api.routes.transcription import progress_callback
+
+        version = client.get("/api/status/a").json()["version"]
+        for progress in (1.0, 2.5, 4.9):
+            progress_callback("a", progress, f"Transcribing... {int(progress)}%")
+        same = client.get(f"/api/status/a?since={version}&wait=0.2").json()
+        assert same["version"] == version and same["progress"] == 4.9
+
+        progress_callback("a", 5.0, "Transcribing... 5%")
+        assert client.get(f"/api/status/a?since={version}&wait=10").json()["version"] > version
+
+    def test_deleted_while_waiting(self, client, store):
+        """Test a task deleted during a long-poll answers 404."""
+        import threading
+        version = client.get("/api/status/b").json()["version"]
+        store["b"].status = TaskStatus.COMPLETED
+        client.get("/api/status/b")  # observe the completed state
+        threading.Timer(0.2, lambda: client.delete("/api/task/b")).start()
+        response = client.get(f"/api/status/b?since={version + 1}&wait=10")
+        assert response.status_code == 404
+
+    def test_batch(self, client, store):
+        """Test many tasks in one request, waiting for any of them to change."""
+        import threading
+        from api.routes.transcription import progress_callback
+
+        response = client.post("/api/status/batch", json={"task_ids": ["a", "b", "nope"]})
+        data = response.json()
+        assert response.status_code == 200
+        assert [task["task_id"] for task in data["tasks"]] == ["a", "b"]
+        assert data["missing"] == ["nope"]
+
+        since = {task["task_id"]: task["version"] for task in data["tasks"]} | {"nope": 0}
+        threading.Timer(0.2, progress_callback, ("b", 20.0, "Going")).start()
+        data = client.post(
+            "/api/status/batch", json={"task_ids": ["a", "b", "nope"], "since": since, "wait": 10}
+        ).json()
+        progress = {task["task_id"]: task["progress"] for task in data["tasks"]}
+        assert progress == {"a": 0.0, "b": 20.0}
+
+        from core.config import settings
+        with patch.object(settings, 'STATUS_BATCH_MAX', 2):
+            response = client.post("/api/status/batch", json={"task_ids": ["a", "b", "c"]})
+        assert response.status_code == 400
+
+
+class TestRetranscribeEndpoint:
+    """Tests for re-transcription from the decoded-PCM cache."""
+
+    def test_retranscribe_nonexistent_task(self, client):
+        """Test re-transcribing an unknown task."""
+        response = client.post("/api/retranscribe/nonexistent")
+        assert response.status_code == 404
+
+    @patch('api.routes.transcription.transcription_store', {
+        'test-task': TranscriptionResult(task_id='test-task', status=TaskStatus.COMPLETED, content_hash='abc')
+    })
+    def test_retranscribe_cache_disabled(self, client):
+        """Test re-transcription requires the PCM cache."""
+        with patch('api.routes.transcription.whisper_service.pcm_cache', None):
+            response = client.post("/api/retranscribe/test-task")
+        assert response.status_code == 400
+
+    @patch('api.routes.transcription.transcription_store', {
+        'test-task': TranscriptionResult(task_id='test-task', status=TaskStatus.COMPLETED, content_hash='abc')
+    })
+    def test_retranscribe_evicted_audio(self, client, tmp_path):
+        """Test re-transcription of evicted audio returns 410."""
+        from services.pcm_cache import PcmCache
+        with patch('api.routes.transcription.whisper_service.pcm_cache', PcmCache(tmp_path, 1 << 20)):
+            response = client.post("/api/retranscribe/test-task")
+        assert response.status_code == 410
+
+    def test_retranscribe_queues_new_task(self, client, tmp_path):
+        """Test cached audio is re-transcribed under a new task id."""
+        from services.pcm_cache import PcmCache
+        from api.routes import transcription
+
+        cache = PcmCache(tmp_path, 1 << 20)
+        writer = cache.writer("abc")
+        writer.write(np.zeros(16000, dtype=np.float32))
+        writer.commit()
+        store = {'test-task': TranscriptionResult(task_id='test-task', status=TaskStatus.COMPLETED, content_hash='abc')}
+        with patch.object(transcription, 'transcription_store', store), \
+                patch.object(transcription.whisper_service, 'pcm_cache', cache), \
+                patch.object(transcription, 'run_transcription', AsyncMock()) as mock_run:
+            response = client.post("/api/retranscribe/test-task", json={"profile": "fast"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["source_task_id"] == "test-task"
+        assert data["profile"] == "fast"
+        assert store[data["task_id"]].content_hash == "abc"
+        mock_run.assert_called_once_with(
+            data["task_id"], None, "fast", "abc", None, False, "interactive", None
+        )
+
+
+class TestCancelEndpoint:
+    """Tests for DELETE /api/task/{task_id}."""
+
+    def test_cancel_nonexistent_task(self, client):
+        """Test cancelling an unknown task returns 404."""
+        response = client.delete("/api/task/nonexistent")
+        assert response.status_code == 404
+
+    def test_cancel_pending_task(self, client):
+        """Test a queued task is cancelled and its job dropped."""
+        store = {"test-task": TranscriptionResult(task_id="test-task", status=TaskStatus.PROCESSING)}
+        with patch('api.routes.transcription.transcription_store', store), \
+                patch('api.routes.transcription.whisper_service') as mock_service:
+            response = client.delete("/api/task/test-task")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+        assert store["test-task"].status == TaskStatus.CANCELLED
+        mock_service.cancel.assert_called_once_with("test-task")
+
+    def test_delete_finished_task(self, client):
+        """Test a finished task is removed from the store."""
+        store = {"test-task": TranscriptionResult(task_id="test-task", status=TaskStatus.COMPLETED)}
+        with patch('api.routes.transcription.transcription_store', store):
+            response = client.delete("/api/task/test-task")
+
+        assert response.status_code == 200
+        assert "test-task" not in store
+
+    def test_upload_cleaned_up_when_cancelled_or_deleted(self):
+        """Test the upload is removed either way and a deleted task stays deleted."""
+        from api.routes import transcription
+
+        store = {"t": TranscriptionResult(task_id="t", status=TaskStatus.CANCELLED)}
+        decoded = TranscriptionResult(task_id="t", status=TaskStatus.COMPLETED)
+
+        async def delete_while_running(*args, **kwargs):
+            store.pop("t")
+            return decoded
+
+        with patch.object(transcription, 'transcription_store', store), \
+                patch.object(transcription, 'whisper_service') as mock_service, \
+                patch.object(transcription.audio_processor, 'cleanup_file') as cleanup:
+            asyncio.run(transcription.run_transcription("t", "a.wav"))
+            mock_service.transcribe.assert_not_called()
+            cleanup.assert_called_once_with("a.wav")
+
+            store["t"] = TranscriptionResult(task_id="t", status=TaskStatus.PENDING)
+            mock_service.transcribe = AsyncMock(side_effect=delete_while_running)
+            asyncio.run(transcription.run_transcription("t", "b.wav"))
+
+        assert "t" not in store
+        cleanup.assert_called_with("b.wav")
+
+    def test_cancel_when_last_client_leaves(self):
+        """Test the idle callback fires once every client has disconnected."""
+        from core.websocket import ConnectionManager
+
+        manager = ConnectionManager()
+        first, second = Mock(), Mock()
+        manager.active_connections["t"] = {first, second}
+        cancelled = []
+        manager.on_idle("t", cancelled.append)
+
+        manager.disconnect(first, "t")
+        assert cancelled == []
+        manager.disconnect(second, "t")
+        assert cancelled == ["t"]
+
+
+class TestProgressFanOut:
+    """Tests for per-connection WebSocket send queues."""
+
+    class FakeSocket:
+        def __init__(self, delay=0.0):
+            self.delay = delay
+            self.sent = []
+            self.closed = False
+
+        async def accept(self):
+            pass
+
+        async def send_text(self, text):
+            await asyncio.sleep(self.delay)
+            self.sent.append(json.loads(text) if text.startswith("{") else text)
+
+        async def close(self, code=1000):
+            self.closed = True
+
+    def test_slow_client_does_not_delay_others(self):
+        """Test a slow socket keeps only the latest progress and is closed when stuck."""
+        import time
+        from core.config import settings
+        from core.websocket import ConnectionManager
+
+        async def scenario():
+            manager = ConnectionManager()
+            fast, slow = self.FakeSocket(), self.FakeSocket(delay=0.1)
+            await manager.connect(fast, "t")
+            await manager.connect(slow, "t")
+            broadcast = 0.0
+            with patch('core.websocket.json.dumps', wraps=json.dumps) as dumps:
+                for i in range(1, 21):
+                    started = time.perf_counter()
+                    await manager.send_progress("t", float(i), f"step {i}")
+                    broadcast = max(broadcast, time.perf_counter() - started)
+                    await asyncio.sleep(0.005)
+            await asyncio.sleep(0.1)
+            fast_seen = [m["progress"] for m in fast.sent]
+            await asyncio.sleep(0.4)
+            return manager, dumps.call_count, broadcast, fast_seen, slow
+
+        with patch.object(settings, 'WEBSOCKET_SEND_QUEUE', 4), \
+                patch.object(settings, 'WEBSOCKET_SEND_TIMEOUT_S', 5.0):
+            manager, dumps, broadcast, fast_seen, slow = asyncio.run(scenario())
+
+        assert dumps == 20  # once per broadcast, not per connection
+        assert broadcast < 0.05
+        assert fast_seen == [float(i) for i in range(1, 21)]
+        slow_seen = [m["progress"] for m in slow.sent]
+        assert slow_seen[-1] == 20.0 and len(slow_seen) < 20
+
+        async def stuck():
+            manager = ConnectionManager()
+            socket = self.FakeSocket(delay=10)
+            await manager.connect(socket, "t")
+            await manager.send_progress("t", 1.0, "step")
+            await asyncio.sleep(0.3)
+            return manager, socket
+
+        with patch.object(settings, 'WEBSOCKET_SEND_TIMEOUT_S', 0.1):
+            manager, socket = asyncio.run(stuck())
+        assert socket.closed and "t" not in manager.active_connections and not manager.senders
+
+    def test_upload_progress_reaches_websocket(self):
+        """Test a /ws/progress client sees a real upload's progress through to completion."""
+        import httpx
+        from websockets.sync.client import connect
+        from benchmarks.fake_ollama import serve
+        from benchmarks.workloads import synthetic_wav
+        from api.routes import transcription
+        from main import app
+        from services.whisper_service import whisper_service
+
+        audio = synthetic_wav(20, rate=16000, channels=1)
+        messages = []
+        # Real server: TestClient would run the transcription before returning
+        with patch.object(whisper_service.engine, 'rtf', 0.05), serve(app) as base_url:
+            response = httpx.post(f"{base_url}/api/upload", files={"file": ("p.wav", audio, "audio/wav")})
+            task_id = response.json()["task_id"]
+            with connect(f"ws{base_url[len('http'):]}/ws/progress/{task_id}") as ws:
+                while not messages or messages[-1]["status"] not in ("completed", "failed"):
+                    messages.append(json.loads(ws.recv(timeout=10)))
+        transcription.transcription_store.pop(task_id, None)
+
+        assert messages[-1]["status"] == "completed" and messages[-1]["progress"] == 100.0
+        progress = [m["progress"] for m in messages if m["status"] == "processing"]
+        assert progress and 0 < min(progress) < 100
+        assert all(m["task_id"] == task_id for m in messages)
+
+    def test_pong_is_never_dropped(self):
+        """Test replies survive a full queue of progress messages."""
+        from core.websocket import ConnectionManager
+
+        async def scenario():
+            manager = ConnectionManager()
+            socket = self.FakeSocket(delay=0.05)
+            await manager.connect(socket, "t")
+            manager.send_text(socket, "t", "pong")
+            for i in range(30):
+                await manager.send_progress("t", float(i), "step")
+            await asyncio.sleep(0.5)
+            return socket
+
+        socket = asyncio.run(scenario())
+        assert "pong" in socket.sent
+        assert socket.sent[-1]["progress"] == 29.0
+
+
+class TestTaskSubscriptions:
+    """Tests for multiplexed task subscriptions on /ws/tasks."""
+
+    @staticmethod
+    def receive_batch(ws):
+        message = ws.receive_json()
+        assert message["type"] == "tasks"
+        return {task["task_id"]: task for task in message["tasks"]}, message["removed"]
+
+    def test_subscribe_receives_batched_deltas(self, client):
+        """Test only changed tasks are sent, then removals, then all tasks."""
+        from core.websocket import subscriptions
+        store = {
+            task_id: TranscriptionResult(task_id=task_id, status=TaskStatus.PROCESSING)
+            for task_id in ("a", "b", "c")
+        }
+        with patch('api.routes.transcription.transcription_store', store), \
+                patch.object(subscriptions, 'interval', 0.01):
+            with client.websocket_connect("/ws/tasks") as ws:
+                ws.send_json({"action": "subscribe", "task_ids": ["a", "b"]})
+                assert ws.receive_json() == {"type": "subscribed", "task_ids": ["a", "b"], "all": False}
+                tasks, removed = self.receive_batch(ws)
+                assert set(tasks) == {"a", "b"} and removed == []
+                assert tasks["a"]["status"] == "processing"
+
+                store["b"].progress = 40.0
+                store["c"].progress = 10.0  # not subscribed
+                tasks, _ = self.receive_batch(ws)
+                assert list(tasks) == ["b"] and tasks["b"]["progress"] == 40.0
+
+                del store["a"]
+                tasks, removed = self.receive_batch(ws)
+                assert tasks == {} and removed == ["a"]
+
+                ws.send_json({"action": "subscribe", "all": True})
+                assert ws.receive_json()["all"] is True
+                tasks, _ = self.receive_batch(ws)
+                assert list(tasks) == ["c"]
+
+                ws.send_text("ping")
+                assert ws.receive_text() == "pong"
+        assert subscriptions.connection_count() == 0
+
+    def test_invalid_requests(self, client):
+        """Test bad messages and too many subscriptions are reported, not fatal."""
+        from core.websocket import subscriptions
+        with patch.object(subscriptions, 'max_tasks', 2):
+            with client.websocket_connect("/ws/tasks") as ws:
+                ws.send_text("not json")
+                assert ws.receive_json()["type"] == "error"
+                ws.send_json({"action": "watch"})
+                assert ws.receive_json()["type"] == "error"
+                ws.send_json({"action": "subscribe", "task_ids": ["a", "b", "c"]})
+                assert "At most 2" in ws.receive_json()["detail"]
+                ws.send_json({"action": "subscribe", "task_ids": ["a", "b"]})
+                ws.send_json({"action": "unsubscribe", "task_ids": ["a"]})
+                assert ws.receive_json()["task_ids"] == ["a", "b"]
+                assert ws.receive_json() == {"type": "unsubscribed", "task_ids": ["b"], "all": False}
+
+
+class TestTwoPass:
+    """Tests for two-pass draft and refinement."""
+
+    def test_draft_is_published_then_refined(self):
+        """Test the draft is readable first and refined windows replace it."""
+        import asyncio
+        from api.routes import transcription
+
+        draft = SegmentTable.from_segments([
+            {"start": 0.0, "end": 5.0, "text": "helo world"},
+            {"start": 5.0, "end": 9.0, "text": "draft tail"},
+        ])
+        seen = []
+
+        async def refine(file_path, task_id, segments, publish, *args):
+            seen.append(store[task_id].transcript_stage)
+            refined = SegmentTable.from_segments([{"start": 0.0, "end": 5.0, "text": "Hello world."}])
+            window = SegmentTable()
+            window.extend(refined)
+            window.extend(segments, 1)
+            publish(window, 1, 5.0)
+            return TranscriptionResult(
+                task_id=task_id, status=TaskStatus.COMPLETED, duration=9.0, segments=refined
+            )
+
+        store = {"t": TranscriptionResult(task_id="t", status=TaskStatus.PENDING)}
+        with patch.object(transcription, 'transcription_store', store), \
+                patch.object(transcription, 'whisper_service') as mock_service, \
+                patch.object(transcription.audio_processor, 'cleanup_file'):
+            mock_service.transcribe = AsyncMock(return_value=TranscriptionResult(
+                task_id="t", status=TaskStatus.COMPLETED, segments=draft, language="en"
+            ))
+            mock_service.refine = AsyncMock(side_effect=refine)
+            asyncio.run(transcription.run_transcription("t", "a.wav", two_pass=True))
+
+        assert mock_service.transcribe.call_args.kwargs["draft"] is True
+        assert seen[0] == "draft"
+        result = store["t"]
+        assert result.transcript_stage == "final"
+        assert result.full_text == "Hello world."
+        assert (result.final_segments, result.refined_until) == (1, 9.0)
+
+    def test_status_reports_refined_part(self, client):
+        """Test status shows how much of a two-pass transcript is final."""
+        store = {"t": TranscriptionResult(
+            task_id="t", status=TaskStatus.COMPLETED, transcript_stage="refining",
+            final_segments=3, refined_until=42.5
+        )}
+        with patch('api.routes.transcription.transcription_store', store):
+            data = client.get("/api/status/t").json()
+
+        assert data["transcript_stage"] == "refining"
+        assert (data["final_segments"], data["refined_until"]) == (3, 42.5)
+
+
+class TestTimingsEndpoint:
+    """Tests for the per-task timing breakdown."""
+
+    def test_tests_keep_state_out_of_the_repo(self):
+        """Test logs, journals and profiles written by tests land outside the tree."""
+        from core.config import settings
+        for path in (settings.TIMINGS_LOG_FILE, settings.JOURNAL_DIR, settings.PROFILE_DIR):
+            assert not path.resolve().is_relative_to(settings.BASE_DIR)
+
+    def test_timings_survive_task_deletion(self, client, tmp_path):
+        """Test timings combine upload and decode stages and outlive the task."""
+        import asyncio
+        from datetime import datetime, timedelta
+        from api.routes import transcription
+        from services.timing_log import TimingLog
+
+        uploaded = datetime(2024, 5, 1, 12, 0, 0)
+        store = {"t": TranscriptionResult(
+            task_id="t", status=TaskStatus.PENDING, created_at=uploaded, timings={"ingest": 0.5}
+        )}
+        decoded = TranscriptionResult(
+            task_id="t", status=TaskStatus.COMPLETED, duration=60.0, real_time_factor=0.1,
+            timings={"queue_wait": 2.0, "inference": 5.0},
+            enqueued_at=uploaded + timedelta(seconds=1),
+            started_at=uploaded + timedelta(seconds=3),
+            first_segment_at=uploaded + timedelta(seconds=4),
+            finished_at=uploaded + timedelta(seconds=9)
+        )
+        log = TimingLog(tmp_path / "timings.jsonl")
+        with patch.object(transcription, 'transcription_store', store), \
+                patch.object(transcription, 'timing_log', log), \
+                patch.object(transcription, 'whisper_service') as mock_service, \
+                patch.object(transcription.audio_processor, 'cleanup_file'):
+            mock_service.transcribe = AsyncMock(return_value=decoded)
+            asyncio.run(transcription.run_transcription("t", "a.wav"))
+            data = client.get("/api/tasks/t/timings").json()
+            client.delete("/api/task/t")
+            after_delete = client.get("/api/tasks/t/timings")
+            missing = client.get("/api/tasks/unknown/timings")
+
+        assert data["stages"]["ingest"] == 0.5 and data["stages"]["inference"] == 5.0
+        assert "store" in data["stages"]
+        assert data["time_to_first_segment"] == 4.0 and data["total_seconds"] == 9.0
+        assert (data["audio_duration"], data["real_time_factor"]) == (60.0, 0.1)
+        assert after_delete.status_code == 200
+        assert after_delete.json()["total_seconds"] == 9.0
+        assert len(list(log.read())) == 1
+        assert missing.status_code == 404
+
+
+class TestAdminProfiling:
+    """Tests for the admin profiling endpoints."""
+
+    def test_admin_routes_need_token(self, client):
+        """Test admin routes are hidden without a token and reject bad ones."""
+        from core.config import settings
+
+        assert client.get("/api/admin/profiles").status_code == 404
+        with patch.object(settings, 'ADMIN_TOKEN', 'secret'):
+            assert client.get("/api/admin/profiles").status_code == 403
+            assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+            assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+    def test_profile_window(self, client, tmp_path):
+        """Test a bounded window writes folded stacks that can be downloaded."""
+        import time
+        from core.config import settings
+        from api.routes import admin
+        from services.profiler import Profiler
+
+        headers = {"X-Admin-Token": "secret"}
+        with patch.object(settings, 'ADMIN_TOKEN', 'secret'), \
+                patch.object(admin, 'profiler', Profiler(tmp_path)):
+            started = client.post("/api/admin/profiles", json={"seconds": 0.2, "interval_ms": 5}, headers=headers)
+            busy = client.post("/api/admin/profiles", json={"seconds": 0.2}, headers=headers)
+            profile_id = started.json()["profile_id"]
+            admin.profiler.current.join(5)
+            info = client.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()
+            stacks = client.get(f"/api/admin/profiles/{profile_id}/files/cpu.collapsed", headers=headers)
+            missing = client.get(f"/api/admin/profiles/{profile_id}/files/other.txt", headers=headers)
+            escape = admin.profiler.file("..", profile_id)
+            too_long = client.post("/api/admin/profiles", json={"seconds": 1e9}, headers=headers)
+            no_task = client.post("/api/admin/profiles", json={"task_id": "missing"}, headers=headers)
+
+        assert started.status_code == 200 and busy.status_code == 409
+        assert info["status"] == "finished" and info["samples"] > 0
+        assert {"cpu.collapsed", "memory.txt", "memory.tracemalloc", "profile.json"} <= set(info["files"])
+        assert stacks.status_code == 200
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.text.splitlines())
+        assert missing.status_code == 404 and escape is None
+        assert too_long.status_code == 400 and no_task.status_code == 404
+
+
+class TestLiveEndpoint:
+    """Tests for the /ws/live streaming endpoint."""
+
+    def test_live_session_stores_exportable_task(self, client):
+        """Test streamed audio produces captions and a completed task."""
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+        from services.live_transcriber import LiveTranscriber
+
+        words = SimpleNamespace(words=[
+            SimpleNamespace(start=0.0, end=0.5, word=" Testing", probability=0.9),
+            SimpleNamespace(start=0.5, end=1.0, word=" live.", probability=0.9),
+        ])
+        model = MagicMock()
+        model.transcribe.side_effect = lambda *a, **k: ([words], SimpleNamespace(language="en"))
+        store = {}
+        with patch('api.routes.live.transcription_store', store), \
+                patch('api.routes.live.whisper_service.live_session',
+                      side_effect=lambda language: LiveTranscriber(model, language)):
+            with client.websocket_connect("/ws/live") as ws:
+                ws.send_json({"format": "pcm_s16le", "sample_rate": 16000})
+                task_id = ws.receive_json()["task_id"]
+                for _ in range(2):
+                    ws.send_bytes(np.zeros(16000, dtype=np.int16).tobytes())
+                ws.send_json({"type": "stop"})
+                messages = []
+                while not messages or messages[-1]["type"] != "done":
+                    messages.append(ws.receive_json())
+
+        finals = [m for m in messages if m["type"] == "final"]
+        assert finals[0]["text"] == "Testing live."
+        assert store[task_id].status == TaskStatus.COMPLETED
+        assert store[task_id].full_text == "Testing live."
+        assert store[task_id].duration == 2.0
+
+    def test_live_rejects_bad_config(self, client):
+        """Test an unknown audio format is refused."""
+        with client.websocket_connect("/ws/live") as ws:
+            ws.send_json({"format": "mp3"})
+            assert ws.receive_json()["type"] == "error"
+
+
 class TestSummaryEndpoints:
     """Tests for summary-related endpoints."""
 
@@ -80,8 +700,7 @@ class TestSummaryEndpoints:
     @patch('api.routes.summarization.transcription_store', {
         'test-task': Mock(
             status=TaskStatus.COMPLETED,
-            full_text="",
-            segments=[]
+            segments=SegmentTable()
         )
     })
     def test_summary_with_empty_transcript(self, client):
@@ -96,8 +715,10 @@ class TestSummaryEndpoints:
     @patch('api.routes.summarization.transcription_store', {
         'test-task': Mock(
             status=TaskStatus.COMPLETED,
-            full_text="This is a test transcript with some content to summarize.",
-            segments=[]
+            segments=SegmentTable.from_segments([
+                TranscriptSegment(id=0, start=0.0, end=5.0,
+                                  text="This is a test transcript with some content to summarize.")
+            ])
         )
     })
     def test_summary_with_valid_transcript(self, client):
@@ -112,8 +733,10 @@ class TestSummaryEndpoints:
     @patch('api.routes.summarization.transcription_store', {
         'test-task': Mock(
             status=TaskStatus.COMPLETED,
-            full_text="This is a test transcript with some content to summarize.",
-            segments=[]
+            segments=SegmentTable.from_segments([
+                TranscriptSegment(id=0, start=0.0, end=5.0,
+                                  text="This is a test transcript with some content to summarize.")
+            ])
         )
     })
     def test_summary_styles(self, client):
@@ -135,11 +758,10 @@ class TestExportEndpoints:
     @patch('api.routes.export.transcription_store', {
         'test-task': Mock(
             status=TaskStatus.COMPLETED,
-            full_text="Test transcript text",
-            segments=[
-                Mock(id=0, start=0.0, end=5.0, text="Test segment one."),
-                Mock(id=1, start=5.0, end=10.0, text="Test segment two.")
-            ],
+            segments=SegmentTable.from_segments([
+                TranscriptSegment(id=0, start=0.0, end=5.0, text="Test segment one."),
+                TranscriptSegment(id=1, start=5.0, end=10.0, text="Test segment two.")
+            ]),
             duration=10.0,
             language="en"
         )
@@ -153,11 +775,10 @@ class TestExportEndpoints:
     @patch('api.routes.export.transcription_store', {
         'test-task': Mock(
             status=TaskStatus.COMPLETED,
-            full_text="Test transcript text",
-            segments=[
-                Mock(id=0, start=0.0, end=5.0, text="Test segment one."),
-                Mock(id=1, start=5.0, end=10.0, text="Test segment two.")
-            ],
+            segments=SegmentTable.from_segments([
+                TranscriptSegment(id=0, start=0.0, end=5.0, text="Test segment one."),
+                TranscriptSegment(id=1, start=5.0, end=10.0, text="Test segment two.")
+            ]),
             duration=10.0,
             language="en"
         )
@@ -175,11 +796,10 @@ class TestExportEndpoints:
     @patch('api.routes.export.transcription_store', {
         'test-task': Mock(
             status=TaskStatus.COMPLETED,
-            full_text="Test transcript text",
-            segments=[
-                Mock(id=0, start=0.0, end=5.0, text="Test segment one."),
-                Mock(id=1, start=5.0, end=10.0, text="Test segment two.")
-            ],
+            segments=SegmentTable.from_segments([
+                TranscriptSegment(id=0, start=0.0, end=5.0, text="Test segment one."),
+                TranscriptSegment(id=1, start=5.0, end=10.0, text="Test segment two.")
+            ]),
             duration=10.0,
             language="en"
         )
@@ -191,6 +811,55 @@ class TestExportEndpoints:
         content = response.text
         assert "WEBVTT" in content  # VTT header
 
+    @patch('api.routes.export.transcription_store', {
+        'test-task': Mock(
+            status=TaskStatus.COMPLETED,
+            segments=SegmentTable.from_segments([
+                {"start": 0.0, "end": 1.0, "text": "Hi there.", "words": [
+                    {"word": " Hi", "start": 0.0, "end": 0.4, "probability": 0.9},
+                    {"word": " there.", "start": 0.5, "end": 1.0, "probability": 0.8},
+                ]}
+            ])
+        ),
+        'no-words': Mock(
+            status=TaskStatus.COMPLETED,
+            segments=SegmentTable.from_segments([
+                TranscriptSegment(id=0, start=0.0, end=5.0, text="Test segment one.")
+            ])
+        )
+    })
+    def test_export_vtt_words(self, client):
+        """Test word-level VTT export with inline word timestamps."""
+        response = client.get("/api/export/vtt/test-task?words=true")
+        assert response.status_code == 200
+        assert "<00:00:00.500><c>there.</c>" in response.text
+
+        response = client.get("/api/export/vtt/no-words?words=true")
+        assert response.status_code == 400
+
+    @patch('api.routes.export.transcription_store', {
+        'test-task': Mock(
+            status=TaskStatus.COMPLETED,
+            segments=SegmentTable.from_segments([
+                {"start": 0.0, "end": 1.0, "text": "Tom & Jerry <3 -->", "words": [
+                    {"word": " Tom", "start": 0.0, "end": 0.2, "probability": 0.9},
+                    {"word": " &", "start": 0.2, "end": 0.4, "probability": 0.9},
+                    {"word": " Jerry", "start": 0.4, "end": 0.6, "probability": 0.9},
+                    {"word": " <3", "start": 0.6, "end": 0.8, "probability": 0.9},
+                    {"word": " -->", "start": 0.8, "end": 1.0, "probability": 0.9},
+                ]}
+            ])
+        )
+    })
+    def test_export_vtt_escapes_markup(self, client):
+        """Test &, < and > in cue text are escaped in both VTT modes."""
+        cues = client.get("/api/export/vtt/test-task").text.split("\n")
+        assert "Tom &amp; Jerry &lt;3 --&gt;" in cues
+
+        words = client.get("/api/export/vtt/test-task?words=true").text
+        assert "<c>&amp;</c>" in words and "<c>&lt;3</c>" in words and "<c>--&gt;</c>" in words
+        assert "<c><3</c>" not in words
+
     @patch('api.routes.export.transcription_store')
     def test_export_json(self, mock_store, client):
         """Test JSON export format."""
@@ -201,7 +870,6 @@ class TestExportEndpoints:
             status=TaskStatus.COMPLETED,
             progress=100.0,
             message="Complete",
-            full_text="Test transcript text",
             segments=[
                 TranscriptSegment(id=0, start=0.0, end=5.0, text="Test segment one."),
                 TranscriptSegment(id=1, start=5.0, end=10.0, text="Test segment two.")
@@ -239,3 +907,67 @@ class TestOllamaHealth:
         assert "status" in data
         assert "model" in data
         assert "message" in data
+
+
+class TestMetricsEndpoint:
+    """Tests for the Prometheus metrics endpoint."""
+
+    def test_histogram_rendering(self):
+        """Test histograms render cumulative buckets, count and sum."""
+        from core import metrics
+
+        histogram = metrics.Histogram("test_latency_seconds", "Test.", ["stage"], buckets=(0.1, 1.0))
+        try:
+            for value in (0.05, 0.5, 5.0):
+                histogram.observe(value, stage='say "hi"')
+            text = metrics.render()
+        finally:
+            metrics.REGISTRY.remove(histogram)
+
+        assert "# TYPE test_latency_seconds histogram" in text
+        assert 'test_latency_seconds_bucket{stage="say \\"hi\\"",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{stage="say \\"hi\\"",le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count{stage="say \\"hi\\""} 3' in text
+        assert 'test_latency_seconds_sum{stage="say \\"hi\\""} 5.55' in text
+        with pytest.raises(ValueError):
+            histogram.observe(1.0)
+
+    def test_metrics_endpoint(self, client):
+        """Test /metrics reports uploads, stored tasks and export latency."""
+        from core import metrics
+        from api.routes import transcription
+
+        uploads = metrics.UPLOADS.value()
+        exports = metrics.STAGE_SECONDS.count(stage="export")
+        transcription.transcription_store["metrics-task"] = TranscriptionResult(
+            task_id="metrics-task",
+            status=TaskStatus.COMPLETED,
+            segments=SegmentTable.from_segments([{"start": 0.0, "end": 1.0, "text": "Hello."}])
+        )
+        try:
+            with patch.object(transcription, 'run_transcription', AsyncMock()) as mock_run:
+                client.post("/api/upload", files={"file": ("test.wav", b"RIFF" + b"\0" * 64, "audio/wav")})
+            assert client.get("/api/export/txt/metrics-task").status_code == 200
+            response = client.get("/metrics")
+        finally:
+            transcription.transcription_store.pop("metrics-task", None)
+            for call in mock_run.call_args_list:
+                transcription.transcription_store.pop(call.args[0], None)
+                transcription.audio_processor.cleanup_file(call.args[1])
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert metrics.UPLOADS.value() == uploads + 1
+        assert metrics.STAGE_SECONDS.count(stage="export") == exports + 1
+        text = response.text
+        assert 'audtext_tasks{status="completed"}' in text
+        assert 'audtext_stage_seconds_count{stage="ingest"}' in text
+        assert "audtext_queue_pending_jobs 0" in text
+        assert 'audtext_websocket_connections{kind="progress"} 0' in text
+        assert 'audtext_model_load_seconds{engine="fake"' in text
+        assert 'audtext_cache_requests_total{cache="language",result="hit"}' in text
+        store_bytes = next(
+            line for line in text.splitlines() if line.startswith("audtext_transcription_store_bytes ")
+        )
+        assert int(store_bytes.split()[1]) > 0
@@ -0,0 +1,144 @@
+"""
+Tests for the benchmark suite's workloads and baseline comparison.
+"""
+import io
+import wave
+
+from benchmarks.run import compare, metric
+from benchmarks.workloads import synthetic_segments, synthetic_wav
+
+
+class TestBenchmarks:
+    """Tests for benchmark helpers."""
+
+    def test_workloads_are_reproducible(self):
+        """Test synthetic workloads are identical across runs."""
+        assert synthetic_wav(1.0) == synthetic_wav(1.0)
+        with wave.open(io.BytesIO(synthetic_wav(1.0, rate=22050, channels=1))) as wav:
+            assert (wav.getframerate(), wav.getnchannels(), wav.getnframes()) == (22050, 1, 22050)
+        first, second = synthetic_segments(50, words=True), synthetic_segments(50, words=True)
+        assert first.to_dicts() == second.to_dicts()
+        assert first.has_words
+
+    def test_compare_flags_regressions_by_direction(self):
+        """Test lower-is-better and higher-is-better metrics regress the right way."""
+        baseline = {
+            "latency_ms": metric(100.0, "ms"),
+            "throughput": metric(50.0, "MB/s", "higher"),
+            "dropped": metric(1.0, "ms")
+        }
+        current = {
+            "latency_ms": metric(130.0, "ms"),
+            "throughput": metric(60.0, "MB/s", "higher"),
+            "new_metric": metric(5.0, "ms")
+        }
+        rows = {row["metric"]: row for row in compare(current, baseline, tolerance=0.25)}
+
+        assert set(rows) == {"latency_ms", "throughput"}
+        assert rows["latency_ms"]["regressed"] and rows["latency_ms"]["change"] == 0.3
+        assert not rows["throughput"]["regressed"]
+        assert compare({"throughput": metric(30.0, "MB/s", "higher")}, baseline, 0.25)[0]["regressed"]
+
+
+class TestFakeOllama:
+    """Tests for the local Ollama stand-in server."""
+
+    def _client(self, **config):
+        from fastapi.testclient import TestClient
+        from benchmarks.fake_ollama import FakeOllamaConfig, create_app
+
+        config.setdefault("prompt_eval_rate", 0)
+        config.setdefault("token_rate", 0)
+        return TestClient(create_app(FakeOllamaConfig(**config)))
+
+    def test_non_streaming_generate(self):
+        """Test a non-streaming reply carries the text and Ollama's counters."""
+        client = self._client(response_tokens=5)
+        body = {"model": "llama3.1:8b", "prompt": "Summarize this.", "stream": False}
+        data = client.post("/api/generate", json=body).json()
+
+        assert data["done"] and len(data["response"].split()) == 5
+        assert data["eval_count"] == 5 and data["prompt_eval_count"] > 0
+        assert client.post("/api/generate", json=body).json()["response"] == data["response"]
+        assert client.get("/api/tags").json()["models"][0]["name"] == "llama3.1:8b"
+
+    def test_streaming_generate(self):
+        """Test streamed tokens arrive as NDJSON ending with a done record."""
+        import json
+
+        client = self._client()
+        body = {"model": "llama3.1:8b", "prompt": "Hi", "options": {"num_predict": 4}}
+        with client.stream("POST", "/api/generate", json=body) as response:
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+
+        assert [line["done"] for line in lines] == [False] * 4 + [True]
+        assert lines[-1]["done_reason"] == "length"
+        assert len("".join(line["response"] for line in lines).split()) == 4
+
+    def test_error_injection_and_unknown_model(self):
+        """Test every Nth request fails and unknown models get a 404."""
+        client = self._client(error_every=2, error_status=503)
+        body = {"model": "llama3.1:8b", "prompt": "x", "stream": False}
+        statuses = [client.post("/api/generate", json=body).status_code for _ in range(4)]
+
+        assert statuses == [200, 503, 200, 503]
+        assert client.post("/api/generate", json={**body, "model": "other"}).status_code == 404
+        assert client.get("/_stats").json()["errors"] == 2
+        assert client.post("/_config", json={"error_every": 0}).json()["error_every"] == 0
+        assert client.post("/_config", json={"bogus": 1}).status_code == 400
+
+    def test_ollama_service_against_stand_in(self):
+        """Test OllamaService talks to the stand-in over real HTTP."""
+        import asyncio
+        import pytest
+        from benchmarks.fake_ollama import FakeOllamaConfig, create_app, serve
+        from services.ollama_service import OllamaService
+
+        service = OllamaService()
+        config = FakeOllamaConfig(models=[service.model], prompt_eval_rate=0, token_rate=0, error_every=2)
+        with serve(create_app(config)) as base_url:
+            service.base_url = base_url
+            summary = asyncio.run(service.generate_summary("A short transcript."))
+            with pytest.raises(Exception, match="Ollama error 500"):
+                asyncio.run(service.generate_summary("A short transcript."))
+            assert asyncio.run(service.check_health())
+
+        assert summary
+
+
+class TestLoadTest:
+    """Tests for the load-test harness."""
+
+    def test_endpoint_stats(self):
+        """Test percentiles, throughput and error rate per endpoint."""
+        from benchmarks.load import EndpointStats
+
+        stats = EndpointStats()
+        for i in range(100):
+            stats.record((i + 1) / 1000, ok=i % 10 != 0)
+        summary = stats.summary(elapsed=2.0)
+
+        assert summary["requests"] == 100 and summary["throughput_rps"] == 50.0
+        assert summary["error_rate"] == 0.1
+        assert (summary["p50_ms"], summary["p99_ms"]) == (51.0, 100.0)
+        assert EndpointStats().summary(1.0)["p99_ms"] is None
+
+    def test_short_stage_in_process(self, tmp_path):
+        """Test a short stage drives every endpoint without errors."""
+        import json
+        import os
+        from unittest.mock import patch
+        from benchmarks.load import main
+
+        output = tmp_path / "load.json"
+        with patch.dict(os.environ):
+            main([
+                "--users", "2", "--duration", "1", "--audio-seconds", "5", "--rtf", "0",
+                "--poll-interval", "0.05", "--ws-fraction", "1", "--summarize-fraction", "1",
+                "--output", str(output)
+            ])
+        endpoints = json.loads(output.read_text())["stages"][0]["endpoints"]
+
+        for name in ("upload", "status", "result", "summarize", "ws_connect", "task_end_to_end"):
+            assert endpoints[name]["requests"] > 0, name
+            assert endpoints[name]["error_rate"] == 0.0, name
@@ -189,3 +189,16 @@ class TestExportEdgeCases:
         parsed = json.loads(json_str)
 
         assert "\n" in parsed["text"] or "\\n" in json_str
+
+
+class TestExportTimestamps:
+    """Tests for the export route timestamp helpers."""
+
+    def test_float32_times_do_not_lose_a_millisecond(self):
+        """Test stored float32 times format to the expected millisecond."""
+        from array import array
+        from api.routes.export import format_timestamp_srt, format_timestamp_vtt
+
+        stored = array("f", [3.07, 3661.999])
+        assert format_timestamp_srt(stored[0]) == "00:00:03,070"
+        assert format_timestamp_vtt(stored[1]) == "01:01:01.999"
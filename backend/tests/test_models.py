@@ -0,0 +1,151 @@
+"""
+Model and storage tests for Audtext backend.
+"""
+import pytest
+
+from models.schemas import TranscriptionResult, TranscriptSegment, TaskStatus
+from models.segments import SegmentTable
+
+
+class TestSegmentTable:
+    """Tests for the compact segment container."""
+
+    def test_append_and_iterate(self):
+        """Test rows come back in order with their text."""
+        table = SegmentTable()
+        table.append(0.0, 1.5, "Hello world.")
+        table.append(1.5, 3.0, "Second segment.")
+
+        rows = list(table)
+        assert len(table) == 2
+        assert rows[0] == (0.0, 1.5, "Hello world.")
+        assert rows[1][2] == "Second segment."
+        assert table.text(1) == "Second segment."
+
+    def test_full_text_is_joined_buffer(self):
+        """Test full text is derived from the segment buffer."""
+        table = SegmentTable()
+        table.append(0.0, 1.0, "  One   two ")
+        table.append(1.0, 2.0, "three")
+        assert table.full_text == "One two three"
+        table.append(2.0, 3.0, "four")
+        assert table.full_text == "One two three four"
+
+    def test_truncate_text_drops_trailing_segments(self):
+        """Test truncation trims the buffer and drops emptied segments."""
+        table = SegmentTable()
+        table.append(0.0, 1.0, "keep this")
+        table.append(1.0, 2.0, "and half of this")
+        table.append(2.0, 3.0, "drop me")
+        table.truncate_text(len("keep this and half"))
+
+        assert len(table) == 2
+        assert table.full_text == "keep this and half"
+        assert table.text(1) == "and half"
+
+    def test_truncate_keeps_leading_segments(self):
+        """Test dropping whole segments keeps the rest appendable."""
+        table = SegmentTable()
+        for i in range(4):
+            table.append(float(i), i + 1.0, f"segment {i}")
+        table.truncate(2)
+        table.append(9.0, 10.0, "after")
+        assert table.full_text == "segment 0 segment 1 after"
+        assert table.start(2) == 9.0
+
+    def test_float32_times_round_trip(self):
+        """Test float32 storage materializes to the original centiseconds."""
+        table = SegmentTable()
+        table.append(3661.07, 3662.13, "text")
+        assert table.to_dicts()[0] == {"id": 0, "start": 3661.07, "end": 3662.13, "text": "text"}
+
+    def test_words_are_spans_of_segment_text(self):
+        """Test words are located in the text buffer with their timings."""
+        table = SegmentTable()
+        table.append(0.0, 1.0, "First.")
+        table.append(1.0, 2.0, " Hello  world! ", words=[
+            (1.0, 1.4, " Hello", 0.9), (1.5, 2.0, " world!", 0.75)
+        ])
+
+        assert table.has_words
+        assert table.words(0) == []
+        assert [w[2] for w in table.words(1)] == ["Hello", "world!"]
+        assert table.to_dicts()[1]["words"][1] == {
+            "word": "world!", "start": 1.5, "end": 2.0, "probability": 0.75
+        }
+
+    def test_truncate_text_drops_trailing_words(self):
+        """Test truncation drops words cut off by the new length."""
+        table = SegmentTable()
+        table.append(0.0, 2.0, "one two three", words=[
+            (0.0, 0.5, "one", 1.0), (0.5, 1.0, "two", 1.0), (1.0, 2.0, "three", 1.0)
+        ])
+        table.truncate_text(len("one two th"))
+        assert [w[2] for w in table.words(0)] == ["one", "two"]
+
+    def test_words_round_trip_through_dicts(self):
+        """Test words survive validation from serialized segments."""
+        table = SegmentTable()
+        table.append(0.0, 1.0, "a b", words=[(0.0, 0.5, "a", 0.5), (0.5, 1.0, "b", 0.25)])
+        restored = SegmentTable.from_segments(TranscriptSegment(**row) for row in table.to_dicts())
+        assert restored.to_dicts() == table.to_dicts()
+
+    def test_confidence_columns(self):
+        """Test confidence is stored once present and survives serialization."""
+        table = SegmentTable()
+        table.append(0.0, 1.0, "before")
+        table.append(1.0, 2.0, "scored", confidence=(-0.25, 0.1, 1.5))
+        table.append(2.0, 3.0, "after")
+
+        assert table.confidence(0) is None and table.confidence(2) is None
+        assert table.confidence(1) == (-0.25, pytest.approx(0.1), 1.5)
+        rows = table.to_dicts()
+        assert "avg_logprob" not in rows[0]
+        assert rows[1]["compression_ratio"] == 1.5
+        restored = SegmentTable.from_segments(TranscriptSegment(**row) for row in rows)
+        assert restored.to_dicts() == rows
+        table.truncate(1)
+        assert table.to_dicts() == [{"id": 0, "start": 0.0, "end": 1.0, "text": "before"}]
+
+    def test_smaller_than_segment_objects(self):
+        """Test the table footprint is far below the object representation."""
+        import sys
+
+        segments = [
+            TranscriptSegment(id=i, start=i * 2.0, end=i * 2.0 + 2.0, text=f"Segment number {i} text.")
+            for i in range(1000)
+        ]
+        object_bytes = sum(
+            sys.getsizeof(s) + sys.getsizeof(s.__dict__) + sys.getsizeof(s.text)
+            for s in segments
+        )
+        table = SegmentTable.from_segments(segments)
+        assert table.nbytes * 3 < object_bytes
+
+
+class TestTranscriptionResult:
+    """Tests for TranscriptionResult serialization."""
+
+    def test_accepts_segment_list(self, sample_segments):
+        """Test a list of segments is converted to a table."""
+        result = TranscriptionResult(
+            task_id="t1", status=TaskStatus.COMPLETED, segments=sample_segments
+        )
+        assert isinstance(result.segments, SegmentTable)
+        assert len(result.segments) == len(sample_segments)
+
+    def test_dump_materializes_segments(self, sample_segments):
+        """Test segments and full_text appear in the serialized result."""
+        result = TranscriptionResult(
+            task_id="t1", status=TaskStatus.COMPLETED, segments=sample_segments
+        )
+        data = result.model_dump(mode="json")
+        assert data["segments"][2]["id"] == 2
+        assert data["segments"][2]["text"] == sample_segments[2].text
+        assert data["full_text"] == " ".join(s.text for s in sample_segments)
+
+    def test_empty_result_has_no_full_text(self):
+        """Test pending results report no full text."""
+        result = TranscriptionResult(task_id="t1", status=TaskStatus.PENDING)
+        assert result.full_text is None
+        assert result.model_dump()["segments"] == []
@@ -5,8 +5,14 @@ import pytest
 from unittest.mock import Mock, patch, AsyncMock, MagicMock
 import asyncio
 
+import numpy as np
+
 from services.whisper_service import WhisperService
+from services.job_queue import JobCancelled, TranscriptionJob
+from services.audio_pipeline import PcmStream
+from services.repetition import RepetitionDetector, trailing_repeat_cut
 from services.ollama_service import OllamaService
+from core.config import settings
 from models.schemas import TaskStatus
 
 
@@ -16,10 +22,10 @@ class TestWhisperService:
     def test_singleton_pattern(self):
         """Test WhisperService follows singleton pattern."""
         # Note: This test may load the model if not mocked
-        with patch.object(WhisperService, '_model', None):
+        with patch.object(WhisperService, 'engine', None):
             with patch.object(WhisperService, '_instance', None):
-                with patch('services.whisper_service.WhisperModel') as mock_model:
-                    mock_model.return_value = MagicMock()
+                with patch('services.whisper_service.create_engine') as mock_engine:
+                    mock_engine.return_value = MagicMock()
                     service1 = WhisperService()
                     service2 = WhisperService()
                     assert service1 is service2
@@ -57,6 +63,1124 @@ class TestWhisperService:
         assert result == "Hello"
 
 
+class TestRepetitionDetector:
+    """Tests for streaming repetition-loop detection."""
+
+    def test_normal_speech_is_not_flagged(self):
+        """Test varied text never triggers the detector."""
+        detector = RepetitionDetector()
+        sentences = [
+            "Good morning and welcome to the quarterly review.",
+            "Revenue grew faster than we expected this spring.",
+            "Most of that came from the new subscription tier.",
+            "Support tickets dropped after the onboarding redesign.",
+            "We still need to hire two more backend engineers.",
+            "Marketing wants a larger budget for the autumn campaign.",
+            "Legal signed off on the updated privacy policy.",
+            "Next quarter we focus on reliability and latency.",
+            "Questions can go in the shared document afterwards.",
+            "Thanks everyone, see you at the offsite in June.",
+        ] * 2
+        assert all(detector.feed(text, i) is None for i, text in enumerate(sentences))
+
+    def test_loop_reports_second_occurrence(self):
+        """Test a repeated phrase is flagged from its first repeat."""
+        detector = RepetitionDetector(ngram=3, max_repeats=3)
+        assert detector.feed("We start the meeting now.", 0) is None
+        assert detector.feed("Thank you for watching.", 1) is None
+        assert detector.feed("Thank you for watching.", 2) is None
+        assert detector.feed("Thank you for watching.", 3) == 2
+
+    def test_compression_ratio_catches_long_loops(self):
+        """Test highly compressible windows are flagged."""
+        detector = RepetitionDetector(ngram=4, max_repeats=50, window_words=200)
+        text = "la " * 30
+        results = [detector.feed(text, i) for i in range(4)]
+        assert any(r is not None for r in results)
+
+    def test_trailing_repeat_cut(self):
+        """Test repeated trailing phrases are cut in one pass."""
+        words = "one two three four five six seven eight nine ten thank you much thank you much".split()
+        assert trailing_repeat_cut(words) == len(words) - 3
+        assert trailing_repeat_cut(["short"]) == 1
+
+    def test_sequential_decode_restarts_past_loop(self):
+        """Test a mid-file loop is dropped and decoding restarts unconditioned."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        def seg(start, text):
+            return SimpleNamespace(start=start, end=start + 1.0, text=text, words=None)
+
+        looping = [seg(0.0, "Welcome everyone."), seg(1.0, "Let us begin.")]
+        looping += [seg(2.0 + i, "and so on and so on") for i in range(10)]
+        restarted = [seg(0.0, "Here is the real content."), seg(1.0, "Goodbye.")]
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=20.0)
+        job = TranscriptionJob(task_id="loop", audio_path="a.wav", language="en")
+        job.pcm = PcmStream.ready(np.zeros(20 * 16000, dtype=np.float32))
+        with patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.side_effect = [(iter(looping), info), (iter(restarted), info)]
+            result = whisper_service._transcribe_sync(job)
+
+        (restart_audio,), kwargs = mock_model.transcribe.call_args
+        assert kwargs["condition_on_previous_text"] is False
+        assert result.repetition_restarts == 1
+        assert result.full_text.count("and so on") <= 2
+        assert result.full_text.endswith("Here is the real content. Goodbye.")
+        restart_at = 20.0 - len(restart_audio) / 16000
+        assert list(result.segments)[-1][:2] == (restart_at + 1.0, restart_at + 2.0)
+
+
+class TestDecodeProfiles:
+    """Tests for decode profile selection."""
+
+    def test_default_profile(self):
+        """Test no profile resolves to the configured default."""
+        from core.config import settings
+        assert WhisperService.resolve_profile(None) == settings.DEFAULT_DECODE_PROFILE
+
+    def test_unknown_profile_rejected(self):
+        """Test unknown profile names raise ValueError."""
+        with pytest.raises(ValueError):
+            WhisperService.resolve_profile("turbo-max")
+
+    def test_profiles_tune_decoding(self):
+        """Test fast and accurate profiles produce different decode options."""
+        fast = WhisperService._decode_options("fast")
+        accurate = WhisperService._decode_options("accurate")
+        assert fast["beam_size"] < accurate["beam_size"]
+        assert fast["condition_on_previous_text"] is False
+        assert "vad_parameters" in fast
+
+    def test_result_records_real_time_factor(self):
+        """Test transcription results carry profile and real-time factor."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        segments = [
+            SimpleNamespace(start=0.0, end=5.0, text=" Hello there. ", words=None),
+            SimpleNamespace(start=5.0, end=10.0, text="General Kenobi.", words=None),
+        ]
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=10.0)
+        job = TranscriptionJob(task_id="task-1", audio_path="audio.wav", profile="fast")
+        job.pcm = PcmStream.ready(np.zeros(10 * 16000, dtype=np.float32))
+        with patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.return_value = (iter(segments), info)
+            result = whisper_service._transcribe_sync(job)
+
+        _, kwargs = mock_model.transcribe.call_args
+        assert kwargs["beam_size"] == 1
+        assert result.status == TaskStatus.COMPLETED
+        assert result.profile == "fast"
+        assert result.real_time_factor is not None
+        assert result.full_text == "Hello there. General Kenobi."
+        assert {"decode", "decode_wait", "inference", "cleanup"} <= set(result.timings)
+
+
+class TestLanguageDetection:
+    """Tests for language hints and the detection fast path."""
+
+    def test_resolve_language(self):
+        """Test hints are normalized and unknown codes rejected."""
+        assert WhisperService.resolve_language(" EN ") == "en"
+        assert WhisperService.resolve_language("yue") == "yue"
+        assert WhisperService.resolve_language("") is None
+        assert WhisperService.resolve_language(None) is None
+        with pytest.raises(ValueError):
+            WhisperService.resolve_language("klingon")
+
+    def test_hint_skips_detection(self):
+        """Test a language hint is passed through without detection."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        info = SimpleNamespace(language="de", language_probability=1.0, duration=5.0)
+        job = TranscriptionJob(task_id="task-1", audio_path="a.wav", language="de")
+        job.pcm = PcmStream.ready(np.zeros(5 * 16000, dtype=np.float32))
+        with patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.return_value = (iter([]), info)
+            result = whisper_service._transcribe_sync(job)
+
+        _, kwargs = mock_model.transcribe.call_args
+        assert kwargs["language"] == "de"
+        mock_model.detect_language.assert_not_called()
+        assert result.language_probability is None
+        assert "language_detection" not in result.timings
+
+    def test_detection_is_cached_by_content_hash(self):
+        """Test detection runs once per content hash and is recorded."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        sr = 16000
+        info = SimpleNamespace(language="fr", language_probability=1.0, duration=5.0)
+        results = []
+        with patch('services.whisper_service.get_speech_timestamps', return_value=[{"start": 0, "end": 2 * sr}]), \
+                patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.detect_language.return_value = ("fr", 0.91, [])
+            for task_id in ("t1", "t2"):
+                mock_model.transcribe.return_value = (iter([]), info)
+                job = TranscriptionJob(task_id=task_id, audio_path="a.wav", content_hash="lang-hash")
+                job.pcm = PcmStream.ready(np.zeros(5 * sr, dtype=np.float32))
+                results.append(whisper_service._transcribe_sync(job))
+
+        assert mock_model.detect_language.call_count == 1
+        window, = mock_model.detect_language.call_args[0]
+        assert len(window) == 30 * sr
+        _, kwargs = mock_model.transcribe.call_args
+        assert kwargs["language"] == "fr"
+        assert [r.language_probability for r in results] == [0.91, 0.91]
+        assert "language_detection" in results[0].timings
+
+    def test_detection_regions_spread_over_long_files(self):
+        """Test detection windows are sampled across the whole file."""
+        sr = 16000
+        regions = WhisperService._detection_regions(600 * sr)
+        assert len(regions) == 3
+        assert regions[0].start == 0
+        assert regions[-1].stop == 600 * sr
+        assert WhisperService._detection_regions(10 * sr) == [slice(0, 10 * sr)]
+
+
+class TestJobQueue:
+    """Tests for the transcription job queue."""
+
+    def test_jobs_resolve_with_handler_results(self):
+        """Test each job's future gets its handler result."""
+        from services.job_queue import JobQueue, TranscriptionJob
+
+        queue = JobQueue(lambda jobs: [job.task_id.upper() for job in jobs])
+        futures = [queue.submit(TranscriptionJob(task_id=f"t{i}", audio_path="x")) for i in range(3)]
+        assert [f.result(timeout=5) for f in futures] == ["T0", "T1", "T2"]
+
+    def test_batches_group_jobs_by_profile(self):
+        """Test a worker takes pending jobs sharing the head job's profile."""
+        import threading
+        from services.job_queue import JobQueue, TranscriptionJob
+
+        release = threading.Event()
+        batches = []
+
+        def handler(jobs):
+            release.wait(timeout=5)
+            batches.append([job.task_id for job in jobs])
+            return [None] * len(jobs)
+
+        queue = JobQueue(handler, max_batch=3)
+        first = queue.submit(TranscriptionJob(task_id="blocker", audio_path="x", profile="fast"))
+        while queue.pending():
+            pass
+        jobs = [
+            TranscriptionJob(task_id="a", audio_path="x", profile="fast"),
+            TranscriptionJob(task_id="b", audio_path="x", profile="accurate"),
+            TranscriptionJob(task_id="c", audio_path="x", profile="fast"),
+            TranscriptionJob(task_id="d", audio_path="x", profile="fast"),
+            TranscriptionJob(task_id="e", audio_path="x", profile="fast"),
+        ]
+        futures = [queue.submit(job) for job in jobs]
+        release.set()
+        first.result(timeout=5)
+        for future in futures:
+            future.result(timeout=5)
+
+        assert batches == [["blocker"], ["a", "c", "d"], ["b"], ["e"]]
+
+
+def write_wav(path, seconds, rate=44100, channels=2):
+    """Write a silent 16-bit PCM WAV file."""
+    import wave
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * channels * int(seconds * rate))
+    return str(path)
+
+
+class TestScheduling:
+    """Tests for priority classes, shortest-job-first and aging."""
+
+    def _queue(self, **kwargs):
+        from services.job_queue import JobQueue
+        return JobQueue(lambda jobs: [None] * len(jobs), class_penalties={"interactive": 0.0, "batch": 1800.0}, **kwargs)
+
+    def test_shortest_job_first_within_class(self):
+        """Test shorter jobs of the same class are served first."""
+        queue = self._queue()
+        queue._pending.extend([
+            TranscriptionJob(task_id="long", audio_path="x", duration=3600.0, priority="interactive"),
+            TranscriptionJob(task_id="short", audio_path="x", duration=20.0, priority="interactive"),
+            TranscriptionJob(task_id="unknown", audio_path="x", priority="interactive"),
+        ])
+        assert [job.task_id for job in queue.snapshot()] == ["short", "unknown", "long"]
+
+    def test_interactive_beats_batch(self):
+        """Test interactive work goes ahead of shorter batch work."""
+        queue = self._queue()
+        queue._pending.extend([
+            TranscriptionJob(task_id="batch", audio_path="x", duration=10.0, priority="batch"),
+            TranscriptionJob(task_id="voice-note", audio_path="x", duration=300.0, priority="interactive"),
+        ])
+        assert queue.snapshot()[0].task_id == "voice-note"
+
+    def test_aging_prevents_starvation(self):
+        """Test a long-waiting batch job overtakes fresh interactive work."""
+        import time
+
+        queue = self._queue(aging_rate=1.0)
+        old = TranscriptionJob(task_id="old-batch", audio_path="x", duration=600.0, priority="batch")
+        old.enqueued_at = time.time() - 3600
+        queue._pending.extend([
+            TranscriptionJob(task_id="fresh", audio_path="x", duration=60.0, priority="interactive"),
+            old,
+        ])
+        assert queue.snapshot()[0].task_id == "old-batch"
+
+    def test_estimates_follow_queue_order(self):
+        """Test wait estimates accumulate the work queued ahead."""
+        from services.whisper_service import whisper_service
+
+        jobs = [
+            TranscriptionJob(task_id="a", audio_path="x", duration=100.0),
+            TranscriptionJob(task_id="b", audio_path="x", duration=10.0),
+        ]
+        with patch.object(whisper_service._queue, 'snapshot', return_value=jobs), \
+                patch.object(whisper_service._queue, 'running', return_value=[]), \
+                patch.object(whisper_service, 'audio_seconds_processed', 200.0), \
+                patch.object(whisper_service, 'wall_seconds_busy', 50.0):
+            assert whisper_service.estimate("a") == (0.0, 25.0)
+            assert whisper_service.estimate("b") == (25.0, 27.5)
+            assert whisper_service.estimate("missing") is None
+
+    def test_probe_duration_reads_header(self, tmp_path):
+        """Test container duration is probed without decoding."""
+        from services.audio_processor import AudioProcessor
+
+        assert abs(AudioProcessor.probe_duration(write_wav(tmp_path / "a.wav", seconds=3)) - 3.0) < 0.05
+        (tmp_path / "junk.mp3").write_bytes(b"nope")
+        assert AudioProcessor.probe_duration(str(tmp_path / "junk.mp3")) is None
+
+
+class TestCancellation:
+    """Tests for cancelling queued and running jobs."""
+
+    def test_cancel_removes_queued_job(self):
+        """Test a queued job is dropped at once and never handled."""
+        import threading
+        from services.job_queue import JobQueue
+
+        release = threading.Event()
+        handled = []
+
+        def handler(jobs):
+            release.wait(timeout=5)
+            handled.extend(job.task_id for job in jobs)
+            return [None] * len(jobs)
+
+        queue = JobQueue(handler)
+        blocker = queue.submit(TranscriptionJob(task_id="blocker", audio_path="x"))
+        victim = queue.submit(TranscriptionJob(task_id="victim", audio_path="x"))
+        assert queue.cancel("victim").cancelled
+        with pytest.raises(JobCancelled):
+            victim.result(timeout=1)
+        release.set()
+        blocker.result(timeout=5)
+        assert handled == ["blocker"]
+        assert queue.cancel("unknown") is None
+
+    def test_running_job_stops_within_one_segment(self):
+        """Test cancelling mid-decode stops consuming segments."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        consumed = []
+
+        def segments():
+            for i in range(100):
+                consumed.append(i)
+                yield SimpleNamespace(start=float(i), end=i + 1.0, text=f"segment {i}", words=None)
+
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=100.0)
+        job = TranscriptionJob(task_id="c", audio_path="a.wav", language="en")
+        job.progress_callback = lambda **kwargs: job.cancel_event.set()
+        job.pcm = PcmStream.ready(np.zeros(16000, dtype=np.float32))
+        with patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.return_value = (segments(), info)
+            result = whisper_service._transcribe_sync(job)
+
+        assert result.status == TaskStatus.CANCELLED
+        assert len(consumed) == 2
+
+
+class TestDecodeStage:
+    """Tests for the pipelined decode/resample stage."""
+
+    def test_decode_blocks_resamples_to_16k_mono(self, tmp_path):
+        """Test container audio comes back as 16 kHz mono float32 blocks."""
+        from services.audio_pipeline import decode_blocks
+
+        path = write_wav(tmp_path / "stereo.wav", seconds=5)
+        blocks = list(decode_blocks(path, block_seconds=2))
+        total = sum(len(block) for block in blocks)
+
+        assert len(blocks) >= 2
+        assert all(block.dtype == np.float32 for block in blocks)
+        assert abs(total - 5 * 16000) < 1600
+
+    def test_prefetches_queued_jobs_in_order(self, tmp_path):
+        """Test pending jobs are decoded before a worker asks for them."""
+        from services.audio_pipeline import DecodeStage
+
+        class FakeQueue:
+            def __init__(self, jobs):
+                self.jobs = jobs
+
+            def snapshot(self):
+                return list(self.jobs)
+
+        jobs = [
+            TranscriptionJob(task_id=f"t{i}", audio_path=write_wav(tmp_path / f"{i}.wav", seconds=1 + i))
+            for i in range(2)
+        ]
+        stage = DecodeStage(FakeQueue(jobs), block_seconds=1, buffer_blocks=16)
+        stage.notify()
+        for job in jobs:
+            while job.pcm is None:
+                pass
+        audio, _ = stage.read(jobs[1])
+        assert abs(len(audio) - 2 * 16000) < 1600
+        assert jobs[1].pcm.decode_seconds > 0
+
+    def test_urgent_read_of_unqueued_job(self, tmp_path):
+        """Test a job that was never prefetched is decoded on demand."""
+        from services.audio_pipeline import DecodeStage
+
+        stage = DecodeStage(Mock(snapshot=lambda: []), block_seconds=1, buffer_blocks=2)
+        job = TranscriptionJob(task_id="t", audio_path=write_wav(tmp_path / "a.wav", seconds=4))
+        audio, waited = stage.read(job)
+        assert abs(len(audio) - 4 * 16000) < 1600
+        assert waited >= 0
+
+    def test_cancelled_prefetch_frees_buffer(self, tmp_path):
+        """Test a cancelled prefetch gives its buffered blocks back."""
+        import time
+        from services.audio_pipeline import DecodeStage
+
+        queued = TranscriptionJob(task_id="q", audio_path=write_wav(tmp_path / "q.wav", seconds=6))
+        stage = DecodeStage(Mock(snapshot=lambda: [queued]), block_seconds=1, buffer_blocks=2)
+        stage.notify()
+        while queued.pcm is None or queued.pcm.samples < 2 * 16000:
+            time.sleep(0.01)
+
+        queued.cancel_event.set()
+        stage.drop(queued)
+        deadline = time.time() + 5
+        while queued.pcm is not None and time.time() < deadline:
+            time.sleep(0.01)
+        assert queued.pcm is None
+
+        other = TranscriptionJob(task_id="o", audio_path=write_wav(tmp_path / "o.wav", seconds=3))
+        audio, _ = stage.read(other)
+        assert abs(len(audio) - 3 * 16000) < 1600
+
+    def test_read_reclaims_buffer_from_finished_prefetches(self, tmp_path):
+        """Test a job served ahead of prefetched ones isn't starved of buffer."""
+        import threading
+        import time
+        from services.audio_pipeline import DecodeStage
+
+        queued = [
+            TranscriptionJob(task_id=f"q{i}", audio_path=write_wav(tmp_path / f"q{i}.wav", seconds=2))
+            for i in range(2)
+        ]
+        stage = DecodeStage(Mock(snapshot=lambda: list(queued)), block_seconds=1, buffer_blocks=4)
+        stage.notify()
+        deadline = time.time() + 5
+        while time.time() < deadline and not (
+            all(job.pcm is not None and job.pcm.samples >= 2 * 16000 for job in queued)
+            and stage._current is None
+        ):
+            time.sleep(0.01)
+
+        # A shorter job jumps ahead of both prefetches
+        urgent = TranscriptionJob(task_id="u", audio_path=write_wav(tmp_path / "u.wav", seconds=2))
+        results = []
+        reader = threading.Thread(target=lambda: results.append(stage.read(urgent)), daemon=True)
+        reader.start()
+        reader.join(5)
+        assert results, "read of a job behind finished prefetches hung"
+        assert abs(len(results[0][0]) - 2 * 16000) < 1600
+
+        # The reclaimed prefetch is decoded again when its turn comes
+        for job in queued:
+            audio, _ = stage.read(job)
+            assert abs(len(audio) - 2 * 16000) < 1600
+
+    def test_decode_errors_reach_the_reader(self, tmp_path):
+        """Test an undecodable upload raises in the worker."""
+        from services.audio_pipeline import DecodeStage
+
+        bad = tmp_path / "bad.mp3"
+        bad.write_bytes(b"not audio at all")
+        stage = DecodeStage(Mock(snapshot=lambda: []))
+        with pytest.raises(Exception):
+            stage.read(TranscriptionJob(task_id="t", audio_path=str(bad)))
+
+
+class TestPcmCache:
+    """Tests for the memory-mapped decoded-PCM cache."""
+
+    def _put(self, cache, key, samples):
+        writer = cache.writer(key)
+        writer.write(np.full(samples, 0.5, dtype=np.float32))
+        writer.commit()
+
+    def test_entries_are_memory_mapped(self, tmp_path):
+        """Test cached PCM comes back as a read-only memory map."""
+        from services.pcm_cache import PcmCache
+
+        cache = PcmCache(tmp_path, max_bytes=1024 * 1024)
+        self._put(cache, "abc", 1000)
+        audio = cache.get("abc")
+
+        assert isinstance(audio, np.memmap)
+        assert len(audio) == 1000 and audio[0] == 0.5
+        assert not audio.flags.writeable
+        assert cache.get("missing") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru_eviction_respects_size_cap(self, tmp_path):
+        """Test the least recently used entry is evicted past the cap."""
+        from services.pcm_cache import PcmCache
+
+        cache = PcmCache(tmp_path, max_bytes=3 * 4000 * 4)
+        for key in ("a", "b", "c"):
+            self._put(cache, key, 4000)
+        cache.get("a")  # "b" is now least recently used
+        self._put(cache, "d", 4000)
+
+        assert "b" not in cache
+        assert all(key in cache for key in ("a", "c", "d"))
+        assert cache.size_bytes <= cache.max_bytes
+
+    def test_index_survives_restart(self, tmp_path):
+        """Test a new cache instance picks up existing entries."""
+        from services.pcm_cache import PcmCache
+
+        self._put(PcmCache(tmp_path, max_bytes=1 << 20), "abc", 10)
+        assert "abc" in PcmCache(tmp_path, max_bytes=1 << 20)
+
+    def test_decode_stage_fills_and_reuses_cache(self, tmp_path):
+        """Test a decode is written to the cache and later jobs skip decoding."""
+        from services.audio_pipeline import DecodeStage
+        from services.pcm_cache import PcmCache
+
+        cache = PcmCache(tmp_path / "cache", max_bytes=1 << 24)
+        stage = DecodeStage(Mock(snapshot=lambda: []), block_seconds=1, cache=cache)
+        path = write_wav(tmp_path / "a.wav", seconds=2)
+
+        first, _ = stage.read(TranscriptionJob(task_id="t1", audio_path=path, content_hash="h"))
+        assert "h" in cache
+        second, _ = stage.read(TranscriptionJob(task_id="t2", audio_path=None, content_hash="h"))
+        assert isinstance(second, np.memmap)
+        assert np.array_equal(first, second)
+
+
+class TestTaskJournal:
+    """Tests for the per-task segment journal and resume."""
+
+    def test_tasks_do_not_wait_on_each_others_fsync(self, tmp_path):
+        """Test a slow flush for one task doesn't block another task's writes."""
+        import os
+        import threading
+        from services.task_journal import TaskJournal
+
+        journal = TaskJournal(tmp_path)
+        journal.start("slow")
+        journal.start("fast")
+        slow_fd = journal._files["slow"][0].fileno()
+        in_fsync, release = threading.Event(), threading.Event()
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            if fd == slow_fd:
+                in_fsync.set()
+                release.wait(5)
+            real_fsync(fd)
+
+        with patch('services.task_journal.os.fsync', side_effect=fsync):
+            writer = threading.Thread(target=journal.append, args=("slow", 0.0, 1.0, "a"))
+            writer.start()
+            assert in_fsync.wait(5)
+            done = threading.Thread(target=journal.append, args=("fast", 0.0, 1.0, "b"))
+            done.start()
+            done.join(2)
+            assert not done.is_alive()
+            release.set()
+            writer.join(5)
+        journal.finish("slow")
+        journal.finish("fast")
+
+    def test_interrupted_task_round_trip(self, tmp_path):
+        """Test journaled segments and truncates survive, torn lines are skipped."""
+        from services.task_journal import TaskJournal
+
+        journal = TaskJournal(tmp_path)
+        journal.start("t1", audio_path="a.wav", profile="fast")
+        journal.append("t1", 0.0, 1.0, "Hello.", [(0.0, 1.0, " Hello.", 0.9)])
+        journal.append("t1", 1.0, 2.0, "loop")
+        journal.truncate("t1", 1)
+        journal.append("t1", 2.0, 3.0, "World.")
+        with open(journal.path_for("t1"), "a") as f:
+            f.write('{"type": "segm')
+
+        (header, segments), = TaskJournal(tmp_path).interrupted()
+        assert header["task_id"] == "t1" and header["profile"] == "fast"
+        assert list(segments) == [(0.0, 1.0, "Hello."), (2.0, 3.0, "World.")]
+        assert segments.words(0)[0][2] == "Hello."
+
+    def test_finished_and_open_tasks_are_not_interrupted(self, tmp_path):
+        """Test only journals left behind by another process are resumed."""
+        from services.task_journal import TaskJournal
+
+        journal = TaskJournal(tmp_path)
+        journal.start("done", audio_path="a.wav")
+        journal.finish("done")
+        journal.start("running", audio_path="b.wav")
+
+        assert not journal.path_for("done").exists()
+        assert journal.interrupted() == []
+        assert len(TaskJournal(tmp_path).interrupted()) == 1
+
+    def test_resume_decodes_after_last_segment(self, tmp_path):
+        """Test a resumed job skips journaled audio and offsets new segments."""
+        from types import SimpleNamespace
+        from models.segments import SegmentTable
+        from services.task_journal import TaskJournal
+        from services.whisper_service import whisper_service
+
+        resume = SegmentTable()
+        resume.append(0.0, 5.0, "Already decoded.")
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=15.0)
+        decoded = [SimpleNamespace(start=0.5, end=2.0, text=" The rest.", words=None)]
+        job = TranscriptionJob(task_id="resume", audio_path="a.wav", language="en", resume_segments=resume)
+        job.pcm = PcmStream.ready(np.zeros(20 * 16000, dtype=np.float32))
+        journal = TaskJournal(tmp_path)
+        journal.start("resume", audio_path="a.wav")
+        with patch.object(whisper_service, 'engine') as mock_model, \
+                patch.object(whisper_service, 'journal', journal):
+            mock_model.transcribe.return_value = (iter(decoded), info)
+            result = whisper_service._transcribe_sync(job)
+
+        (audio,), kwargs = mock_model.transcribe.call_args
+        assert len(audio) == 15 * 16000
+        assert kwargs["initial_prompt"] == "Already decoded."
+        assert list(result.segments) == [(0.0, 5.0, "Already decoded."), (5.5, 7.0, "The rest.")]
+        assert result.duration == 20.0
+        handle, _ = journal._files.pop("resume")
+        handle.close()
+        (_, journaled), = journal.interrupted()
+        assert list(journaled) == [(5.5, 7.0, "The rest.")]
+
+
+class TestTwoPass:
+    """Tests for two-pass refinement."""
+
+    def _draft(self, *bounds):
+        from models.segments import SegmentTable
+
+        table = SegmentTable()
+        for i, (start, end) in enumerate(bounds):
+            table.append(start, end, f"draft {i}")
+        return table
+
+    def test_windows_follow_draft_segments(self):
+        """Test windows end on segment boundaries and cover the whole file."""
+        draft = self._draft((0, 10), (10, 25), (25, 40), (40, 50))
+        with patch.object(settings, 'TWO_PASS_WINDOW_SECONDS', 30.0):
+            windows = WhisperService._refine_windows(draft, 55.0)
+
+        assert windows == [(2, 0.0, 25.0), (4, 25.0, 55.0)]
+        assert WhisperService._refine_windows(self._draft(), 8.0) == [(0, 0.0, 8.0)]
+
+    def test_refine_publishes_each_window(self):
+        """Test each refined window replaces its draft segments."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        draft = self._draft((0, 10), (10, 25), (25, 40))
+        published = []
+        job = TranscriptionJob(
+            task_id="refine", audio_path="a.wav", language="en", refine_segments=draft,
+            on_refined=lambda table, final, until: published.append((list(table), final, until))
+        )
+        job.pcm = PcmStream.ready(np.zeros(40 * 16000, dtype=np.float32))
+        info = SimpleNamespace(language="en", duration=None)
+        windows = [
+            [SimpleNamespace(start=1.0, end=24.0, text=" First part.", words=None)],
+            [SimpleNamespace(start=0.5, end=14.0, text=" Second part.", words=None)],
+        ]
+        with patch.object(settings, 'TWO_PASS_WINDOW_SECONDS', 30.0), \
+                patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.side_effect = [(iter(w), info) for w in windows]
+            result = whisper_service._refine_sync(job)
+
+        assert published[0] == ([(1.0, 24.0, "First part."), (25.0, 40.0, "draft 2")], 1, 25.0)
+        assert published[1][1:] == (2, 40.0)
+        assert list(result.segments) == [(1.0, 24.0, "First part."), (25.5, 39.0, "Second part.")]
+        assert result.decode_mode == "two-pass"
+        assert mock_model.transcribe.call_args.kwargs["initial_prompt"] == "First part."
+
+
+class TestAdaptiveDecoding:
+    """Tests for confidence-targeted re-decoding."""
+
+    def _segment(self, start, end, text, avg_logprob=-0.2):
+        from types import SimpleNamespace
+
+        return SimpleNamespace(
+            start=start, end=end, text=text, words=None,
+            avg_logprob=avg_logprob, no_speech_prob=0.05, compression_ratio=1.4
+        )
+
+    def test_low_confidence_ranges_merge_and_pad(self):
+        """Test adjacent low segments merge and padding stops at neighbours."""
+        from models.segments import SegmentTable
+
+        table = SegmentTable()
+        for start, end, avg_logprob in [(0, 4, -0.2), (4.2, 6, -1.5), (6, 8, -1.2), (8, 9, -0.1), (9.2, 12, -2.0)]:
+            table.append(start, end, "x", confidence=(avg_logprob, 0.05, 1.4))
+
+        with patch.object(settings, 'ADAPTIVE_PAD_SECONDS', 0.5):
+            ranges = WhisperService()._low_confidence_ranges(table, 12.5)
+        assert ranges == [(1, 3, 4.0, 8.0), (4, 5, 9.0, 12.5)]
+
+    def test_only_low_confidence_audio_is_redecoded(self):
+        """Test the stronger pass replaces only the weak stretch."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        first = [
+            self._segment(0.0, 5.0, "Clear speech."),
+            self._segment(5.0, 8.0, "mumble mumble", avg_logprob=-1.4),
+            self._segment(8.0, 12.0, "Clear again."),
+        ]
+        second = [self._segment(0.5, 2.5, "Hard words.", avg_logprob=-0.3)]
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=12.0)
+        job = TranscriptionJob(task_id="adaptive", audio_path="a.wav", language="en", adaptive=True)
+        job.pcm = PcmStream.ready(np.zeros(12 * 16000, dtype=np.float32))
+        with patch.object(settings, 'ADAPTIVE_PAD_SECONDS', 0.5), \
+                patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.side_effect = [(iter(first), info), (iter(second), info)]
+            result = whisper_service._transcribe_sync(job)
+
+        (audio,), kwargs = mock_model.transcribe.call_args
+        assert len(audio) == 3 * 16000
+        assert kwargs["initial_prompt"] == "Clear speech."
+        assert result.redecoded_seconds == 3.0
+        assert result.full_text == "Clear speech. Hard words. Clear again."
+        assert result.segments.to_dicts()[1]["avg_logprob"] == pytest.approx(-0.3)
+
+
+class TestThroughputMode:
+    """Tests for batched inference in throughput mode."""
+
+    def test_merge_speech_chunks_caps_clip_length(self):
+        """Test merged clips never exceed Whisper's 30 second window."""
+        sr = 16000
+        speech = [
+            {"start": 0, "end": 10 * sr},
+            {"start": 12 * sr, "end": 25 * sr},
+            {"start": 26 * sr, "end": 40 * sr},
+        ]
+        clips = WhisperService._merge_speech_chunks(speech)
+        assert clips == [(0, 25 * sr), (26 * sr, 40 * sr)]
+
+    def test_word_timestamps_are_opt_in(self):
+        """Test only jobs asking for word timestamps request them."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=2.0)
+        words = [
+            SimpleNamespace(start=0.0, end=0.4, word=" Hi", probability=0.99),
+            SimpleNamespace(start=0.5, end=1.0, word=" there.", probability=0.75),
+        ]
+        segment = SimpleNamespace(start=0.0, end=1.0, text=" Hi there.", words=words)
+        options = []
+        for word_timestamps in (False, True):
+            job = TranscriptionJob(task_id="w", audio_path="a.wav", language="en", word_timestamps=word_timestamps)
+            job.pcm = PcmStream.ready(np.zeros(2 * 16000, dtype=np.float32))
+            with patch.object(whisper_service, 'engine') as mock_model:
+                mock_model.transcribe.return_value = (iter([segment]), info)
+                result = whisper_service._transcribe_sync(job)
+            options.append(mock_model.transcribe.call_args[1]["word_timestamps"])
+
+        assert options == [False, True]
+        assert result.segments.words(0)[1][2] == "there."
+
+    def test_short_file_falls_back_to_sequential(self):
+        """Test files below the batching threshold use the sequential decoder."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        info = SimpleNamespace(language="en", language_probability=0.97, duration=5.0)
+        job = TranscriptionJob(task_id="task-1", audio_path="short.wav")
+        job.pcm = PcmStream.ready(np.zeros(5 * 16000, dtype=np.float32))
+        with patch('services.whisper_service.settings.WHISPER_THROUGHPUT_MODE', True), \
+                patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.transcribe.return_value = (iter([]), info)
+            result = whisper_service._transcribe_sync(job)
+
+        assert result.decode_mode == "sequential"
+        mock_model.transcribe_batched.assert_not_called()
+
+    def test_cross_job_batch_maps_segments_back(self):
+        """Test segments from a shared batch land in the right job."""
+        from types import SimpleNamespace
+        from services.whisper_service import whisper_service
+
+        sr = 16000
+        audio = {"a.wav": np.zeros(10 * sr, dtype=np.float32), "b.wav": np.zeros(20 * sr, dtype=np.float32)}
+        segments = [
+            SimpleNamespace(start=1.0, end=4.0, text=" first job ", words=None),
+            SimpleNamespace(start=12.0, end=15.0, text="second job", words=[
+                SimpleNamespace(start=12.0, end=13.0, word=" second", probability=0.9),
+                SimpleNamespace(start=13.0, end=15.0, word=" job", probability=0.8),
+            ]),
+        ]
+        jobs = [TranscriptionJob(task_id="a", audio_path="a.wav"), TranscriptionJob(task_id="b", audio_path="b.wav")]
+        for job in jobs:
+            job.pcm = PcmStream.ready(audio[job.audio_path])
+        with patch('services.whisper_service.get_speech_timestamps', return_value=[{"start": 0, "end": 5 * sr}]), \
+                patch.object(whisper_service, 'engine') as mock_model:
+            mock_model.detect_language.return_value = ("en", 0.99, [])
+            mock_model.transcribe_batched.return_value = (iter(segments), None)
+            results = whisper_service._run_jobs(jobs)
+
+        _, kwargs = mock_model.transcribe_batched.call_args
+        assert kwargs["clip_timestamps"] == [{"start": 0.0, "end": 5.0}, {"start": 10.0, "end": 15.0}]
+        assert [r.decode_mode for r in results] == ["batched-cross-job"] * 2
+        assert results[0].full_text == "first job"
+        assert results[1].full_text == "second job"
+        assert list(results[1].segments)[0][:2] == (2.0, 5.0)
+        assert [w[:3] for w in results[1].segments.words(0)] == [(2.0, 3.0, "second"), (3.0, 5.0, "job")]
+        assert results[0].throughput is not None
+
+
+def scripted_model(*hypotheses):
+    """Fake model whose successive transcribe() calls return word lists."""
+    from types import SimpleNamespace
+
+    def segments(words):
+        return [SimpleNamespace(words=[
+            SimpleNamespace(start=start, end=start + 0.4, word=f" {word}", probability=0.9)
+            for start, word in words
+        ])]
+
+    model = MagicMock()
+    model.transcribe.side_effect = [
+        (segments(words), SimpleNamespace(language="en")) for words in hypotheses
+    ]
+    return model
+
+
+class TestLiveTranscriber:
+    """Tests for live transcription with local agreement."""
+
+    def test_words_commit_once_two_decodes_agree(self):
+        """Test only words confirmed by consecutive decodes are finalized."""
+        from services.live_transcriber import LiveTranscriber
+
+        model = scripted_model(
+            [(0.0, "Hello"), (0.5, "world.")],
+            [(0.0, "Hello"), (0.5, "world."), (1.0, "How")],
+            [(0.0, "Hello"), (0.5, "world."), (1.0, "How"), (1.5, "are"), (2.0, "you?")],
+        )
+        session = LiveTranscriber(model, min_chunk_seconds=1.0)
+        session.insert_audio(np.zeros(16000, dtype=np.float32))
+        assert session.ready
+
+        finalized, provisional = session.process()
+        assert finalized == []
+        assert provisional[2] == "Hello world."
+
+        session.insert_audio(np.zeros(16000, dtype=np.float32))
+        finalized, provisional = session.process()
+        assert finalized == [0]
+        assert session.segments.text(0) == "Hello world."
+        assert provisional[2] == "How"
+        assert session.language == "en"
+
+        session.insert_audio(np.zeros(8000, dtype=np.float32))
+        assert session.finish() == [1]
+        _, kwargs = model.transcribe.call_args
+        assert kwargs["initial_prompt"] == "Hello world."
+        assert session.segments.full_text == "Hello world. How are you?"
+        assert session.segments.has_words
+
+    def test_window_is_trimmed_past_committed_words(self):
+        """Test the decode window never grows without bound."""
+        from services.live_transcriber import LiveTranscriber
+
+        model = scripted_model(*[[(0.0, "la")]] * 4)
+        session = LiveTranscriber(model, min_chunk_seconds=1.0, buffer_seconds=2.0)
+        for _ in range(4):
+            session.insert_audio(np.zeros(3 * 16000, dtype=np.float32))
+            session.process()
+        assert len(session._audio) <= 4 * 16000
+
+    def test_decoder_resamples_client_pcm(self):
+        """Test streamed PCM frames come out as 16 kHz mono float32."""
+        from services.audio_pipeline import LiveAudioDecoder
+
+        direct = LiveAudioDecoder("pcm_s16le", 16000, 1).decode(np.full(1600, 16384, dtype=np.int16).tobytes())
+        assert direct.dtype == np.float32 and len(direct) == 1600
+        assert direct[0] == 0.5
+
+        stereo = LiveAudioDecoder("pcm_f32le", 48000, 2)
+        total = sum(len(stereo.decode(np.zeros(2 * 4800, dtype=np.float32).tobytes())) for _ in range(10))
+        assert abs(total - 16000) < 400
+
+        with pytest.raises(ValueError):
+            LiveAudioDecoder("mp3")
+
+
+class TestAutotune:
+    """Tests for startup autotuning."""
+
+    def _measure(self, config, clip, model_name):
+        if config["WHISPER_COMPUTE_TYPE"] == "float32":
+            raise ValueError("unsupported")
+        threads, workers = config["WHISPER_CPU_THREADS"], config["TRANSCRIPTION_WORKERS"]
+        return {**config, "throughput": threads * workers, "latency": 1.0 / threads + workers}
+
+    def test_candidates_fit_cpu_count(self):
+        """Test no candidate oversubscribes the CPU."""
+        from services.autotune import candidate_configs
+
+        configs = candidate_configs(4, ["int8"])
+        assert all(c["WHISPER_CPU_THREADS"] * c["TRANSCRIPTION_WORKERS"] <= 4 for c in configs)
+        assert {"WHISPER_CPU_THREADS": 4, "TRANSCRIPTION_WORKERS": 1, "WHISPER_COMPUTE_TYPE": "int8"} in configs
+
+    def test_objective_selects_configuration(self):
+        """Test throughput and latency objectives pick different winners."""
+        from services.autotune import autotune
+
+        with patch('services.autotune.os.cpu_count', return_value=4):
+            fastest = autotune("latency", "tiny", 1.0, measure=self._measure)
+            busiest = autotune("throughput", "tiny", 1.0, ["int8"], measure=self._measure)
+
+        assert fastest["config"] == {
+            "WHISPER_CPU_THREADS": 4, "TRANSCRIPTION_WORKERS": 1, "WHISPER_COMPUTE_TYPE": "int8"
+        }
+        assert busiest["config"]["WHISPER_CPU_THREADS"] * busiest["config"]["TRANSCRIPTION_WORKERS"] == 4
+        assert all(r["WHISPER_COMPUTE_TYPE"] != "float32" for r in fastest["results"])
+        with pytest.raises(ValueError):
+            autotune("fastest", measure=self._measure)
+
+    def test_saved_result_fills_unset_settings(self, tmp_path):
+        """Test a saved result applies only where nothing was set explicitly."""
+        import os
+        from core.config import Settings, apply_autotune
+        from services.autotune import save
+
+        path = tmp_path / "autotune.json"
+        config = {"WHISPER_CPU_THREADS": 8, "TRANSCRIPTION_WORKERS": 2, "WHISPER_COMPUTE_TYPE": "float32"}
+        save({"model": "base", "cpu_count": os.cpu_count(), "config": config}, path)
+
+        tuned = Settings(AUTOTUNE_FILE=path, WHISPER_MODEL="base", WHISPER_CPU_THREADS=3)
+        assert apply_autotune(tuned) is not None
+        assert (tuned.WHISPER_CPU_THREADS, tuned.TRANSCRIPTION_WORKERS) == (3, 2)
+        assert tuned.WHISPER_COMPUTE_TYPE == "float32"
+
+        other_model = Settings(AUTOTUNE_FILE=path, WHISPER_MODEL="small")
+        assert apply_autotune(other_model) is None
+        assert other_model.TRANSCRIPTION_WORKERS == 1
+
+    def test_synthetic_clip(self):
+        """Test the benchmark clip is 16 kHz float32 audio."""
+        from services.autotune import synthetic_clip
+
+        clip = synthetic_clip(2.0)
+        assert clip.dtype == np.float32 and len(clip) == 32000
+        assert 0 < np.abs(clip).max() <= 0.3 + 1e-6
+
+
+class TestEngines:
+    """Tests for the pluggable ASR engines."""
+
+    def test_fake_engine_is_deterministic(self):
+        """Test repeated runs produce identical segments covering the audio."""
+        from services.engines import FakeEngine
+
+        engine = FakeEngine(rtf=0.0, segment_seconds=4.0)
+        audio = np.zeros(10 * 16000, dtype=np.float32)
+        first, info = engine.transcribe(audio, word_timestamps=True)
+        first = list(first)
+        second, _ = engine.transcribe(audio, word_timestamps=True)
+
+        assert info.duration == 10.0 and info.language == "en"
+        assert [(s.start, s.end) for s in first] == [(0.0, 4.0), (4.0, 8.0), (8.0, 10.0)]
+        assert [s.text for s in first] == [s.text for s in second]
+        assert first[0].words[-1].end == 4.0
+
+    def test_fake_engine_honours_clips_and_rtf(self):
+        """Test clip timestamps bound segments and decoding takes rtf time."""
+        import time
+        from services.engines import FakeEngine
+
+        engine = FakeEngine(rtf=0.05, segment_seconds=5.0)
+        audio = np.zeros(20 * 16000, dtype=np.float32)
+        started = time.perf_counter()
+        segments, _ = engine.transcribe_batched(
+            audio, batch_size=8, clip_timestamps=[{"start": 2.0, "end": 4.0}, {"start": 10.0, "end": 12.0}]
+        )
+        spans = [(s.start, s.end) for s in segments]
+
+        assert spans == [(2.0, 4.0), (10.0, 12.0)]
+        assert time.perf_counter() - started >= 4 * 0.05
+
+    def test_engine_selected_by_settings(self):
+        """Test ASR_ENGINE picks the engine and unknown names are rejected."""
+        from services.engines import FakeEngine, create_engine
+
+        with patch.object(settings, 'ASR_ENGINE', 'fake'):
+            assert isinstance(create_engine(), FakeEngine)
+        with patch.object(settings, 'ASR_ENGINE', 'missing'), pytest.raises(ValueError):
+            create_engine()
+
+    def test_incomplete_engine_fails_at_construction(self):
+        """Test an engine missing a required method can't be instantiated."""
+        from services.engines import AsrEngine
+
+        class HalfEngine(AsrEngine):
+            def transcribe(self, audio, **options):
+                return iter(()), None
+
+        with pytest.raises(TypeError):
+            HalfEngine()
+
+    def test_pipeline_runs_on_fake_engine(self):
+        """Test a job goes through the real pipeline with the fake engine."""
+        from services.engines import FakeEngine
+        from services.whisper_service import whisper_service
+
+        job = TranscriptionJob(task_id="fake", audio_path="a.wav", language="en", word_timestamps=True)
+        job.pcm = PcmStream.ready(np.zeros(12 * 16000, dtype=np.float32))
+        with patch.object(whisper_service, 'engine', FakeEngine(rtf=0.0, segment_seconds=5.0)):
+            result = whisper_service._transcribe_sync(job)
+
+        assert result.status == TaskStatus.COMPLETED
+        assert len(result.segments) == 3 and result.segments.has_words
+        assert result.duration == 12.0
+
+
+    def test_fake_text_does_not_trip_repetition_detection(self):
+        """Test a long fake transcription finishes without loop restarts."""
+        from services.engines import FakeEngine
+        from services.whisper_service import whisper_service
+
+        job = TranscriptionJob(task_id="fake-long", audio_path="a.wav", language="en")
+        job.pcm = PcmStream.ready(np.zeros(300 * 16000, dtype=np.float32))
+        with patch.object(whisper_service, 'engine', FakeEngine(rtf=0.0, segment_seconds=5.0)), \
+                patch.object(settings, 'REPETITION_DETECTION', True):
+            result = whisper_service._transcribe_sync(job)
+
+        assert result.status == TaskStatus.COMPLETED
+        assert result.repetition_restarts == 0
+        assert len(result.segments) == 60
+
+class TestTaskTimings:
+    """Tests for per-task timing breakdowns."""
+
+    def test_transcribe_stamps_lifecycle(self, tmp_path):
+        """Test a transcription records when it was queued, started and finished."""
+        from services.whisper_service import whisper_service
+
+        path = tmp_path / "timed.wav"
+        write_wav(path, 12)
+        result = asyncio.run(whisper_service.transcribe(str(path), "timed", language="en"))
+
+        assert result.status == TaskStatus.COMPLETED
+        assert result.enqueued_at <= result.started_at <= result.first_segment_at <= result.finished_at
+        assert {"queue_wait", "decode", "inference", "cleanup"} <= set(result.timings)
+
+    def test_timing_log_retains_and_aggregates(self, tmp_path):
+        """Test records survive in the file and summarize per stage."""
+        from services.timing_log import TimingLog, aggregate
+
+        log = TimingLog(tmp_path / "timings.jsonl", keep=2)
+        for i in range(3):
+            log.record({
+                "task_id": f"t{i}", "status": "completed", "stages": {"inference": float(i + 1)},
+                "real_time_factor": 0.1 * (i + 1), "time_to_first_segment": None
+            })
+        log.record({"task_id": "failed", "status": "failed", "stages": {"inference": 99.0}})
+        with open(log.path, "a") as f:
+            f.write('{"task_id": "torn"')
+
+        assert log.get("t0") is None and log.get("t2")["stages"] == {"inference": 3.0}
+        summary = aggregate(log.read())
+        assert summary["tasks"] == 3
+        assert summary["stages"]["inference"]["p50"] == 2.0
+        assert summary["stages"]["inference"]["max"] == 3.0
+        assert "time_to_first_segment" not in summary
+
+
+class TestProfiler:
+    """Tests for on-demand profiling sessions."""
+
+    def test_session_samples_chosen_threads_until_done(self, tmp_path):
+        """Test a task-bound session samples only its threads and stops with the task."""
+        import threading
+        import time
+        from services.profiler import ProfileSession
+
+        done = threading.Event()
+
+        def busy_target():
+            while not done.is_set():
+                sum(range(1000))
+
+        def bystander():
+            done.wait()
+
+        worker = threading.Thread(target=busy_target, name="target-worker")
+        other = threading.Thread(target=bystander, name="bystander")
+        worker.start()
+        other.start()
+        session = ProfileSession(
+            tmp_path, seconds=30, interval=0.005, memory=True,
+            threads=lambda: {worker.ident}, until=done.is_set
+        )
+        session.start()
+        time.sleep(0.2)
+        done.set()
+        session.join(5)
+        worker.join()
+        other.join()
+
+        assert session.status == "finished" and session.samples > 0
+        stacks = (session.directory / "cpu.collapsed").read_text().splitlines()
+        assert stacks and all(line.startswith("target-worker;") for line in stacks)
+        assert any("busy_target" in line for line in stacks)
+        assert (session.directory / "memory.tracemalloc").exists()
+        assert "Traced memory" in (session.directory / "memory.txt").read_text()
+
+    def test_no_cost_when_idle(self, tmp_path):
+        """Test nothing runs or traces before a session starts."""
+        import threading
+        import tracemalloc
+        from services.profiler import Profiler
+
+        Profiler(tmp_path / "profiles")
+
+        assert not tracemalloc.is_tracing()
+        assert not (tmp_path / "profiles").exists()
+        assert "profiler" not in {thread.name for thread in threading.enumerate()}
+
+
 class TestOllamaService:
     """Tests for OllamaService."""
 
@@ -5,7 +5,7 @@ import { ProgressBar } from './components/ProgressBar';
 import { TranscriptViewer } from './components/TranscriptViewer';
 import { SummaryPanel } from './components/SummaryPanel';
 import { ExportButtons } from './components/ExportButtons';
-import { uploadAudio, getStatus, getResult, TranscriptionResult, ProgressUpdate } from './services/api';
+import { uploadAudio, getStatus, getResult, cancelTask, TranscriptionResult, ProgressUpdate } from './services/api';
 
 type AppState = 'idle' | 'uploading' | 'processing' | 'completed' | 'error';
 
@@ -39,9 +39,15 @@ function App() {
   // Poll for progress when processing
   useEffect(() => {
     if (state === 'processing' && taskId) {
+      let version: number | undefined;
       const pollStatus = async () => {
         try {
-          const statusData = await getStatus(taskId);
+          // Long-poll once the server has given us a version to wait past
+          const statusData = await getStatus(
+            taskId,
+            version === undefined ? undefined : { since: version, wait: 25 }
+          );
+          version = statusData.version;
           setProgress(statusData);
 
           if (statusData.status === 'completed') {
@@ -50,14 +56,15 @@ function App() {
             setResult(resultData);
             setState('completed');
             return; // Stop polling
-          } else if (statusData.status === 'failed') {
+          } else if (statusData.status === 'failed' || statusData.status === 'cancelled') {
             setError(statusData.message || 'Transcription failed');
             setState('error');
             return; // Stop polling
           }
 
-          // Continue polling
-          pollingRef.current = setTimeout(pollStatus, 1500);
+          // Continue polling; a long-poll already waited for the change,
+          // but keep a floor so fast decodes don't turn into a request loop
+          pollingRef.current = setTimeout(pollStatus, version === undefined ? 1500 : 1000);
         } catch (err) {
           // Continue polling on error (server might be busy)
           pollingRef.current = setTimeout(pollStatus, 2000);
@@ -76,6 +83,20 @@ function App() {
     }
   }, [state, taskId]);
 
+  // Cancel the running transcription
+  const handleCancel = async () => {
+    if (!taskId) return;
+    if (pollingRef.current) {
+      clearTimeout(pollingRef.current);
+    }
+    try {
+      await cancelTask(taskId);
+    } catch {
+      // Task already finished or was removed; nothing left to stop
+    }
+    handleReset();
+  };
+
   // Reset to start new transcription
   const handleReset = () => {
     if (pollingRef.current) {
@@ -156,12 +177,22 @@ function App() {
 
         {/* Processing state */}
         {state === 'processing' && (
-          <ProgressBar
-            progress={progress?.progress || 0}
-            status={progress?.status || 'processing'}
-            message={progress?.message || 'Starting transcription...'}
-            filename={filename}
-          />
+          <div className="space-y-4">
+            <ProgressBar
+              progress={progress?.progress || 0}
+              status={progress?.status || 'processing'}
+              message={progress?.message || 'Starting transcription...'}
+              filename={filename}
+            />
+            <div className="text-center">
+              <button
+                onClick={handleCancel}
+                className="px-6 py-2 rounded-lg bg-slate-700 hover:bg-slate-600 text-slate-200 transition-colors"
+              >
+                Cancel
+              </button>
+            </div>
+          </div>
         )}
 
         {/* Completed state - show results */}
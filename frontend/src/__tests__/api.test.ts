@@ -3,6 +3,7 @@ import {
   uploadAudio,
   getStatus,
   getResult,
+  cancelTask,
   generateSummary,
   checkOllamaHealth,
   getExportUrl
@@ -73,6 +74,18 @@ describe('API Service', () => {
       expect(global.fetch).toHaveBeenCalledWith('/api/status/test-123')
     })
 
+    it('should long-poll past a known version', async () => {
+      global.fetch = vi.fn().mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve({ task_id: 'test-123', status: 'processing', progress: 60, message: '', version: 4 })
+      })
+
+      const result = await getStatus('test-123', { since: 3, wait: 25 })
+
+      expect(result.version).toBe(4)
+      expect(global.fetch).toHaveBeenCalledWith('/api/status/test-123?since=3&wait=25')
+    })
+
     it('should throw on status fetch failure', async () => {
       global.fetch = vi.fn().mockResolvedValueOnce({
         ok: false
@@ -82,6 +95,20 @@ describe('API Service', () => {
     })
   })
 
+  describe('cancelTask', () => {
+    it('should send a DELETE for the task', async () => {
+      global.fetch = vi.fn().mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve({ task_id: 'test-123', status: 'cancelled', message: 'Transcription cancelled' })
+      })
+
+      const result = await cancelTask('test-123')
+
+      expect(result.status).toBe('cancelled')
+      expect(global.fetch).toHaveBeenCalledWith('/api/task/test-123', { method: 'DELETE' })
+    })
+  })
+
   describe('getResult', () => {
     it('should return transcription result', async () => {
       const mockResult = {
@@ -5,17 +5,24 @@ export interface TranscriptSegment {
   start: number;
   end: number;
   text: string;
+  avg_logprob?: number;
+  no_speech_prob?: number;
+  compression_ratio?: number;
 }
 
 export interface TranscriptionResult {
   task_id: string;
-  status: 'pending' | 'processing' | 'completed' | 'failed';
+  status: 'pending' | 'processing' | 'completed' | 'failed' | 'cancelled';
   progress: number;
   message: string;
   language?: string;
   duration?: number;
   segments: TranscriptSegment[];
   full_text?: string;
+  transcript_stage?: 'draft' | 'refining' | 'final';
+  final_segments?: number;
+  refined_until?: number;
+  redecoded_seconds?: number;
 }
 
 export interface UploadResponse {
@@ -36,6 +43,30 @@ export interface ProgressUpdate {
   progress: number;
   message: string;
   current_segment?: number;
+  estimated_wait?: number;
+  estimated_completion?: number;
+  transcript_stage?: 'draft' | 'refining' | 'final';
+  final_segments?: number;
+  refined_until?: number;
+  version?: number;
+}
+
+export interface TaskTimings {
+  task_id: string;
+  status: string;
+  profile?: string;
+  decode_mode?: string;
+  audio_duration?: number;
+  created_at: string;
+  enqueued_at?: string;
+  started_at?: string;
+  first_segment_at?: string;
+  finished_at?: string;
+  time_to_first_segment?: number;
+  total_seconds?: number;
+  processing_time?: number;
+  real_time_factor?: number;
+  stages: Record<string, number>;
 }
 
 // Upload audio file
@@ -57,8 +88,14 @@ export async function uploadAudio(file: File): Promise<UploadResponse> {
 }
 
 // Get transcription status
-export async function getStatus(taskId: string): Promise<ProgressUpdate> {
-  const response = await fetch(`${API_BASE}/status/${taskId}`);
+// With `since` (a previous version) and `wait` seconds, the server holds
+// the request until the task changes instead of answering at once
+export async function getStatus(
+  taskId: string,
+  longPoll?: { since: number; wait: number }
+): Promise<ProgressUpdate> {
+  const query = longPoll ? `?since=${longPoll.since}&wait=${longPoll.wait}` : '';
+  const response = await fetch(`${API_BASE}/status/${taskId}${query}`);
 
   if (!response.ok) {
     throw new Error('Failed to get status');
@@ -67,6 +104,18 @@ export async function getStatus(taskId: string): Promise<ProgressUpdate> {
   return response.json();
 }
 
+// Cancel a queued or running transcription
+export async function cancelTask(taskId: string): Promise<{ task_id: string; status: string; message: string }> {
+  const response = await fetch(`${API_BASE}/task/${taskId}`, { method: 'DELETE' });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Failed to cancel task');
+  }
+
+  return response.json();
+}
+
 // Get transcription result
 export async function getResult(taskId: string): Promise<TranscriptionResult> {
   const response = await fetch(`${API_BASE}/result/${taskId}`);
@@ -79,6 +128,18 @@ export async function getResult(taskId: string): Promise<TranscriptionResult> {
   return response.json();
 }
 
+// Get where a task's time went (upload, queue, decode stages)
+export async function getTimings(taskId: string): Promise<TaskTimings> {
+  const response = await fetch(`${API_BASE}/tasks/${taskId}/timings`);
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Failed to get timings');
+  }
+
+  return response.json();
+}
+
 // Generate summary
 export async function generateSummary(
   taskId: string,